@@ -1,12 +1,20 @@
 import os
-import wave
+import io
 import tempfile
 import shutil
+import subprocess
 import base64
-from pydub import AudioSegment
-from typing import Optional, Tuple, Union
+import numpy as np
+from contextlib import nullcontext
+from typing import Optional, Sequence, Tuple, Union
 from mutagen import File as MutagenFile
 from mutagen.id3 import ID3, TIT2, TALB, TPE1, TPE2, COMM, TCOM, TCON, TDRC, TRCK, TPOS, TYER
+from Lsb_Engine import Lsb_Engine
+from Job_Control import Job_Control, Job_Cancelled
+from Workspace import Workspace
+from Memory_File import Memory_File
+from Scatter_Index import Scatter_Index
+from Wav_Pcm import Wav_Pcm
 
 
 class Audio_Hider:
@@ -24,24 +32,121 @@ class Audio_Hider:
         '.ogg': 'ogg',    # OGG Vorbis
         '.wma': 'asf'     # Windows Media Audio
     }
+
+    # Accepted like every hider's, but the output is always a WAV holding the
+    # carrier's own samples, so no profile changes it
+    ENCODER_PROFILES = ('fast', 'balanced', 'smallest')
+    # WAV codec ffmpeg decodes to, per bytes per sample (see _pcm_layout())
+    PCM_CODECS = {1: 'pcm_u8', 2: 'pcm_s16le', 3: 'pcm_s24le', 4: 'pcm_s32le'}
+    # Frames copied at a time by the streaming path
+    STREAM_FRAMES = 64 * 1024
     
-    def __init__(self, host_file, hidden_data):
+    def __init__(self, host_file, hidden_data, control=None, workspace=None, encoder_profile='balanced',
+                 output=None, decode_cache=None, streaming=False, scatter_key=None,
+                 channel_bits: Optional[Sequence[int]] = None):
         """
         Initialize the Audio_Hider with host file and data to hide.
+
+        The data goes into the least significant bit of each sample (see
+        Wav_Pcm), whatever the sample width and encoding, so a carrier holds
+        one bit per sample of every channel with a bit budget.
         
         Args:
             host_file: File object containing the host audio file info
             hidden_data: Data to hide in the audio file
+            control: Optional Job_Control for progress reporting and cancellation
+            workspace: Optional Workspace for temp files and outputs; a private
+                one is created (and cleaned up after each call) if omitted
+            encoder_profile: 'fast', 'balanced' or 'smallest'; has no effect on
+                audio, which is always written as uncompressed WAV
+            output: Optional writable binary file object; hide_data() then writes
+                the stego WAV there instead of to the output directory
+            decode_cache: Optional Decode_Cache; repeated jobs on the same
+                carrier then skip decoding it (ffmpeg for compressed formats)
+            streaming: Copy the WAV through in blocks, holding only the frames
+                that take the data (chosen by Memory_Governor for large carriers);
+                ignored when scattering
+            scatter_key: Key from Scatter_Index.key_for(); the data is then
+                spread over the whole PCM in a keyed order
+            channel_bits: Bits each sample of a channel takes, per channel
+                (1, or 0 to leave the channel untouched, e.g. LFE); by
+                default every channel takes one bit per sample. Extraction
+                needs the same budget.
+
+        Raises:
+            ValueError: If the encoder profile is unknown or the channel budgets are invalid
         """
+        if encoder_profile not in self.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {encoder_profile}")
+        if channel_bits is not None and (any(bits not in (0, 1) for bits in channel_bits) or not any(channel_bits)):
+            raise ValueError(f"Channel bit budgets must be 0 or 1, with at least one 1: {list(channel_bits)}")
         self.host_file = host_file
         self.hidden_data = hidden_data
-        self.temp_path = "temp_files/"
-        self.output_path = "output_files/"
-        self.end_marker = "#END_OF_MESSAGE#"
-        
-        # Create necessary directories if they don't exist
-        os.makedirs(self.temp_path, exist_ok=True)
-        os.makedirs(self.output_path, exist_ok=True)
+        self.control = control or Job_Control()
+        self.encoder_profile = encoder_profile
+        self.workspace = workspace or Workspace()
+        self._owns_workspace = workspace is None
+        self.output_path = self.workspace.output_path
+        self.output = output
+        self.decode_cache = decode_cache
+        self.streaming = streaming and scatter_key is None
+        self.scatter_key = scatter_key
+        self.channel_bits = None if channel_bits is None else list(channel_bits)
+
+    @classmethod
+    def hide_bytes(cls, carrier, hidden_data, extension, output=None, **options):
+        """
+        Hide data in audio held in memory.
+
+        WAV carriers never touch the filesystem; other formats are decoded by
+        ffmpeg through pipes. The result is always WAV.
+
+        Args:
+            carrier: Audio as bytes, memoryview or a readable binary file object
+            hidden_data: Data to hide
+            extension: Audio format, e.g. 'wav' or 'flac'
+            output: Optional writable binary file object for the stego WAV
+            **options: Passed to the constructor (control, encoder_profile...)
+
+        Returns:
+            bytes: The stego WAV, or output itself if one was given
+        """
+        sink = output if output is not None else io.BytesIO()
+        cls(Memory_File(carrier, extension), hidden_data, output=sink, **options).hide_data()
+        return output if output is not None else sink.getvalue()
+
+    @classmethod
+    def extract_bytes(cls, carrier, extension, **options):
+        """Extract hidden data from audio held in memory (see hide_bytes())."""
+        return cls(Memory_File(carrier, extension), b'', **options).extract_data()
+
+    def _cached_pcm(self):
+        """(frames, {'fmt': fmt chunk as hex}) of the carrier from the decode cache, or None."""
+        if self.decode_cache is None or self.host_file.file_path is None:
+            return None
+        return self.decode_cache.get(self.host_file.file_path, 'wav')
+
+    def _store_pcm(self, wav, frames):
+        if self.decode_cache is not None and self.host_file.file_path is not None:
+            self.decode_cache.put(self.host_file.file_path, 'wav', np.frombuffer(frames, dtype=np.uint8),
+                                  {'fmt': wav.fmt.hex()})
+
+    @staticmethod
+    def _open_wav(source):
+        """Context manager over a WAV path or file object (file objects are left open)."""
+        return open(source, 'rb') if isinstance(source, str) else nullcontext(source)
+
+    def _read_wav(self, source) -> Tuple[Wav_Pcm, bytearray]:
+        """Read all samples of a WAV path or file object: (format, writable sample bytes)."""
+        with self._open_wav(source) as src:
+            wav, frame_count = Wav_Pcm.read_header(src)
+            return wav, bytearray(src.read(frame_count * wav.frame_bytes))
+
+    def _carrier_source(self):
+        """Path of the carrier, or a BytesIO over it when it is held in memory."""
+        if self.host_file.file_path is None:
+            return self.host_file.open()
+        return self.host_file.file_path
     
     def _get_file_extension(self, file_path) -> str:
         """Get the lowercase file extension with leading dot."""
@@ -59,99 +164,175 @@ class Audio_Hider:
             return ''
     
     def _get_format_from_extension(self, file_path: str) -> Optional[str]:
-        """Get the format string for pydub based on file extension."""
+        """Format name of a supported extension, or None if it is not supported."""
         ext = self._get_file_extension(file_path)
         return self.SUPPORTED_FORMATS.get(ext)
     
-    def _convert_to_wav(self, input_path: str) -> str:
-        """Convert any supported audio format to WAV for processing."""
-        if self._get_file_extension(input_path) == '.wav':
-            return input_path
-            
-        output_path = os.path.join(self.temp_path, 'temp_audio.wav')
-        audio_format = self._get_format_from_extension(input_path)
-        print(audio_format)
-        print(input_path)
-        
-        if not audio_format:
-            raise ValueError(f"Unsupported audio format: {input_path}")
-            
-        audio = AudioSegment.from_file(input_path, format=audio_format)
-        audio.export(output_path, format='wav')
-        return output_path
-    
-    def _convert_from_wav(self, wav_path: str, output_path: str) -> None:
-        """Convert WAV back to the original format with high quality settings.
-        
+    def _decode_to_wav(self, output_path: Optional[str] = None):
+        """
+        Decode the carrier to WAV at its own bit depth (see _pcm_layout()).
+
+        ffmpeg runs through Job_Control.run_subprocess(), so cancelling the
+        job kills a long decode. In-memory carriers are piped through it.
+
         Args:
-            wav_path: Path to the source WAV file
-            output_path: Path where to save the converted file
+            output_path: WAV path to write, or None to get the WAV in memory
+
+        Returns:
+            str | io.BytesIO: output_path, or the decoded WAV
+
+        Raises:
+            ValueError: If the format is not supported or ffmpeg cannot decode it
+            RuntimeError: If ffmpeg is not installed
         """
-        target_format = self._get_format_from_extension(output_path)
-        
-        if not target_format:
-            raise ValueError(f"Unsupported output format: {output_path}")
-            
-        audio = AudioSegment.from_wav(wav_path)
-        
-        # Common export parameters for all formats
-        export_params = {
-            'format': target_format,
-            'parameters': ['-y']  # Overwrite output file if it exists
-        }
-    
-        # Special handling for different formats
-        if target_format == 'adts':  # AAC
-            export_params.update({
-                'codec': 'aac',
-                'bitrate': '320k',
-                'parameters': ['-profile:a', 'aac_he_v2', '-q:a', '0']
-            })
-        elif target_format == 'mp3':
-            export_params.update({
-                'codec': 'libmp3lame',
-                'bitrate': '320k',
-                'parameters': ['-q:a', '0', '-joint_stereo', '0']
-            })
-        elif target_format == 'ipod':  # ALAC
-            export_params.update({
-                'codec': 'alac',
-                'parameters': ['-compression_level', '0']
-            })
-        elif target_format == 'flac':
-            export_params.update({
-                'codec': 'flac',
-                'compression_level': '8'
-            })
-        elif target_format == 'aiff':
-            export_params.update({
-                'codec': 'pcm_s16be',  # 16-bit big-endian PCM
-                'bitrate': '1411k'  # CD quality
-            })
-        elif target_format == 'wav':
-            export_params.update({
-                'codec': 'pcm_s16le',  # 16-bit little-endian PCM
-                'bitrate': '1411k'  # CD quality
-            })
-        
-        # For DSD, we'll still need to handle it specially
-        if target_format == 'dsf':
-            # DSD is a special case, we'll convert to WAV first then use external tools
-            temp_wav = os.path.join(self.temp_path, 'temp_dsd.wav')
-            audio.export(temp_wav, format='wav')
-            # Here you would typically call an external tool to convert WAV to DSD
-            # For now, we'll just copy the WAV file as a placeholder
-            shutil.copy2(temp_wav, output_path)
-            print("Warning: DSD output is not fully implemented. Output is WAV format.")
-            return
-        
-        # Export with the appropriate parameters
+        if not self._get_format_from_extension(self.host_file):
+            raise ValueError(f"Unsupported audio format: {self.host_file.file_name}")
+        if not shutil.which('ffmpeg'):
+            raise RuntimeError(f"ffmpeg is needed to decode {self.host_file.file_name}")
+        codec = self.PCM_CODECS.get(self._pcm_layout()[2], 'pcm_s16le')
+        if self.host_file.file_path is None:
+            source, carrier = ['-i', 'pipe:0'], self.host_file.file_content
+        else:
+            source, carrier = ['-nostdin', '-i', self.host_file.file_path], None
+        command = (['ffmpeg', '-v', 'error', '-y'] + source +
+                   ['-vn', '-map_metadata', '-1', '-acodec', codec, '-f', 'wav', output_path or 'pipe:1'])
         try:
-            audio.export(output_path, **export_params)
-        except Exception as e:
-            # Fallback to default export if high-quality export fails
-            print(f"Warning: High-quality export failed, falling back to default settings: {str(e)}")
-            audio.export(output_path, format=target_format)
+            result = self.control.run_subprocess(command, input=carrier)
+        except subprocess.CalledProcessError as e:
+            raise ValueError(f"ffmpeg could not decode {self.host_file.file_name}: "
+                             f"{e.stderr.decode(errors='replace').strip()}") from e
+        return output_path if output_path is not None else io.BytesIO(result.stdout)
+    
+    def _pcm_layout(self) -> Tuple[int, int, int]:
+        """
+        Shape of the carrier as PCM: (frames, channels, bytes per sample).
+
+        WAV files are measured exactly from their header; other formats are
+        estimated from their duration and bit depth (16 bits if unknown),
+        which is what they are decoded to before embedding.
+        """
+        source = self._carrier_source()
+        if self._get_file_extension(self.host_file) == '.wav':
+            with self._open_wav(source) as src:
+                wav, frame_count = Wav_Pcm.read_header(src)
+            return frame_count, wav.channels, wav.sample_width
+        info = MutagenFile(source).info
+        sample_width = -(-(getattr(info, 'bits_per_sample', 0) or 16) // 8)
+        return int(info.length * info.sample_rate), getattr(info, 'channels', 2), sample_width
+
+    def _channel_mask(self, channels: int) -> Optional[np.ndarray]:
+        """Which channels take bits, or None if all of them do.
+
+        Raises:
+            ValueError: If channel_bits does not have one budget per channel
+        """
+        if self.channel_bits is None:
+            return None
+        if len(self.channel_bits) != channels:
+            raise ValueError(f"Got {len(self.channel_bits)} channel bit budgets for {channels} channels")
+        mask = np.array(self.channel_bits, dtype=bool)
+        return None if mask.all() else mask
+
+    def _sample_count(self, frame_count: int, channels: int) -> int:
+        """Number of samples that take a payload bit."""
+        mask = self._channel_mask(channels)
+        return frame_count * (channels if mask is None else int(mask.sum()))
+
+    def _frames_for(self, count: int, channels: int) -> int:
+        """Number of leading frames that hold the first count bits of sequential embedding."""
+        mask = self._channel_mask(channels)
+        return -(-count // (channels if mask is None else int(mask.sum())))
+
+    def _positions(self, frame_count: int, channels: int, count: int) -> Optional[np.ndarray]:
+        """
+        Where the first count payload bits go.
+
+        Returns:
+            np.ndarray | None: Indices into the interleaved sample LSBs (see
+                Wav_Pcm.lsb_view()), or None if the bits simply fill the
+                first count samples
+        """
+        mask = self._channel_mask(channels)
+        used = np.arange(channels) if mask is None else np.flatnonzero(mask)
+        if self.scatter_key is not None:
+            # Keyed order of the usable samples only, so no slot is wasted on a skipped channel
+            index = Scatter_Index.positions((frame_count, len(used)), self.scatter_key, 0, count)
+        elif mask is None:
+            return None
+        else:
+            index = np.arange(count, dtype=np.int64)
+        # Ordinal among the usable samples -> interleaved sample index
+        return index // len(used) * channels + used[index % len(used)]
+
+    def _embed_samples(self, wav: Wav_Pcm, frames: bytearray, frame_count: int) -> None:
+        """
+        Embed the length-prefixed data in the sample LSBs of frames, in place.
+
+        Args:
+            wav: Sample format of frames
+            frames: Leading sample bytes of the carrier (all of them when
+                scattering)
+            frame_count: Frames in the whole carrier
+
+        Raises:
+            ValueError: If the audio file is too small to hide the data
+        """
+        needed = (Lsb_Engine.LENGTH.size + len(self.hidden_data)) * 8
+        available = self._sample_count(frame_count, wav.channels)
+        if needed > available:
+            raise ValueError(f"Audio file is too small to hide the data. Needed: {needed // 8} bytes, "
+                             f"Available: {available // 8} bytes")
+        Lsb_Engine.embed(wav.lsb_view(frames), self.hidden_data,
+                         positions=self._positions(frame_count, wav.channels, needed))
+
+    def _extract_samples(self, wav: Wav_Pcm, read_frames, frame_count: int) -> bytes:
+        """
+        Extract the length-prefixed data from the sample LSBs.
+
+        Args:
+            wav: Sample format of the carrier
+            read_frames: Callable taking a frame count n and returning at
+                least the first n frames' sample bytes
+            frame_count: Frames in the whole carrier
+        """
+        def read_values(count):
+            positions = self._positions(frame_count, wav.channels, count)
+            if positions is None:
+                return wav.lsb_view(read_frames(self._frames_for(count, wav.channels)))
+            last = int(positions.max()) // wav.channels + 1 if len(positions) else 0
+            return wav.lsb_view(read_frames(last))[positions]
+
+        return Lsb_Engine.extract_prefix(read_values, self._sample_count(frame_count, wav.channels))
+
+    def capacity(self) -> Optional[int]:
+        """Number of payload bytes this carrier can hold (see _pcm_layout())."""
+        frame_count, channels, _ = self._pcm_layout()
+        return Lsb_Engine.capacity(self._sample_count(frame_count, channels))
+
+    def memory_estimate(self) -> Tuple[int, int]:
+        """
+        Estimated peak memory of hiding in (or extracting from) this carrier.
+
+        Returns:
+            tuple: (in-memory path, streaming path) in bytes
+        """
+        frame_count, channels, sample_width = self._pcm_layout()
+        frame_bytes = channels * sample_width
+        pcm = frame_count * frame_bytes
+        needed = (Lsb_Engine.LENGTH.size + len(self.hidden_data or b'')) * 8
+        block = (self.STREAM_FRAMES + self._frames_for(needed, channels)) * frame_bytes
+        if self._get_file_extension(self.host_file) == '.wav':
+            # The samples as read and their writable copy
+            estimate = 2 * pcm, block
+        else:
+            # ffmpeg decodes compressed formats in full on either path
+            estimate = 3 * pcm, pcm + block
+        if self.scatter_key is not None:
+            # No streaming path, plus the positions of the payload bits (8 bytes
+            # each, a few times over while generated and mapped to samples)
+            scatter = estimate[0] + 32 * needed
+            return scatter, scatter
+        return estimate
 
     def convert_data_to_binary(self, data: Union[str, bytes]) -> str:
         """Convert data to binary string.
@@ -174,59 +355,94 @@ class Audio_Hider:
         chars = [bits[i:i + 8] for i in range(0, len(bits), 8)]
         return ''.join(chr(int(b, 2)) for b in chars)
 
-    def _encode_audio(self, input_path: str, output_path: str) -> None:
+    def _encode_audio(self, input_path: str, output_path: str, cached=None) -> None:
         """
         Encode hidden data into the audio file using LSB steganography.
         
         Args:
-            input_path: Path to the input audio file
-            output_path: Path to save the steganographic audio file
+            input_path: Path of the carrier as WAV (see _decode_to_wav()), or a WAV file object
+            output_path: Path of the stego WAV, or a writable binary file
+                object that receives it
+            cached: Decoded carrier from _cached_pcm(); input_path is then not read
             
         Raises:
             ValueError: If the audio file is too small to hide the data
         """
-        # Convert to WAV if needed
-        wav_path = self._convert_to_wav(input_path)
-        
-        # Add null terminator to mark end of data
-        if isinstance(self.hidden_data, str):
-            data_with_marker = self.hidden_data + '\x00'
-        else:
-            data_with_marker = self.hidden_data + b'\x00'
-            
-        bits = self.convert_data_to_binary(data_with_marker)
-        
-        # Process the WAV file
-        with wave.open(wav_path, 'rb') as audio:
-            params = audio.getparams()
-            frames = bytearray(list(audio.readframes(audio.getnframes())))
-        
-        # Check if audio is large enough to hide the data
-        if len(bits) > len(frames):
-            raise ValueError(f"Audio file is too small to hide the data. "
-                           f"Needed: {len(bits)} bytes, Available: {len(frames)} bytes")
-        
-        # Embed the data in the LSB of each sample
-        for i, bit in enumerate(bits):
-            # Clear the LSB and set it to our data bit
-            frames[i] = (frames[i] & 0xFE) | int(bit)
-        
-        # Save as WAV first
-        temp_wav = os.path.join(self.temp_path, 'temp_encoded.wav')
-        with wave.open(temp_wav, 'wb') as out_audio:
-            out_audio.setparams(params)
-            out_audio.writeframes(bytes(frames))
-        
-        # Convert back to original format if needed
-        if self._get_file_extension(input_path) != '.wav':
-            self._convert_from_wav(temp_wav, output_path)
+        if cached is None and self.streaming:
+            self._encode_stream(input_path, output_path)
+            return
+
+        if cached is not None:
+            with self.control.trace('decode', cached=True) as span:
+                wav = Wav_Pcm(bytes.fromhex(cached[1]['fmt']))
+                frames = bytearray(cached[0])
+                span.set(bytes=len(frames))
         else:
-            shutil.copy2(temp_wav, output_path)
-            
-        # Clean up temporary WAV file
-        if os.path.exists(temp_wav):
-            os.remove(temp_wav)
+            with self.control.trace('decode') as span:
+                wav, frames = self._read_wav(input_path)
+                span.set(bytes=len(frames))
+            self._store_pcm(wav, frames)
+
+        # Embed the length-prefixed data in the LSB of each sample
+        self.control.check()
+        with self.control.span('embed', bytes=len(self.hidden_data)):
+            self._embed_samples(wav, frames, len(frames) // wav.frame_bytes)
+
+        # The output is always a WAV in the carrier's own sample format: the
+        # samples are never re-encoded, whether they came from the decode
+        # cache, a decoded compressed file or a WAV
+        self.control.check()
+        with self.control.span('encode', bytes=len(frames)):
+            if not isinstance(output_path, str):
+                wav.write(output_path, frames)
+                return
+
+            temp_wav = self.workspace.temp_path('encoded', '.wav')
+            with open(temp_wav, 'wb') as out_audio:
+                wav.write(out_audio, frames)
+            os.replace(temp_wav, output_path)
     
+    def _encode_stream(self, wav_source, output) -> None:
+        """
+        Embed the data while copying a WAV block by block.
+
+        Only the leading frames whose sample LSBs take the data are
+        modified; the rest is copied through STREAM_FRAMES at a time.
+
+        Args:
+            wav_source: WAV path or file object
+            output: Path or writable binary file object for the stego WAV
+
+        Raises:
+            ValueError: If the audio file is too small to hide the data
+        """
+        output_context = open(output, 'wb') if isinstance(output, str) else nullcontext(output)
+        with self._open_wav(wav_source) as src, output_context as dst:
+            wav, frame_count = Wav_Pcm.read_header(src)
+            needed = (Lsb_Engine.LENGTH.size + len(self.hidden_data)) * 8
+            head_frames = min(frame_count, self._frames_for(needed, wav.channels))
+            with self.control.trace('decode', streaming=True) as span:
+                head = bytearray(src.read(head_frames * wav.frame_bytes))
+                span.set(bytes=len(head))
+
+            self.control.check()
+            with self.control.span('embed', bytes=len(self.hidden_data)):
+                self._embed_samples(wav, head, frame_count)
+
+            with self.control.span('encode', streaming=True) as span:
+                dst.write(wav.header(frame_count))
+                dst.write(head)
+                remaining = (frame_count - head_frames) * wav.frame_bytes
+                while remaining:
+                    self.control.check()
+                    block = src.read(min(remaining, self.STREAM_FRAMES * wav.frame_bytes))
+                    if not block:
+                        raise ValueError("Truncated WAV sample data")
+                    dst.write(block)
+                    remaining -= len(block)
+                dst.write(wav.padding(frame_count))
+                span.set(bytes=frame_count * wav.frame_bytes)
+
     def _hide_in_metadata(self, input_path: str, output_path: str) -> bool:
         """
         Hide data in the audio file's metadata.
@@ -298,104 +514,99 @@ class Audio_Hider:
             
         return None
 
-    def hide_data(self) -> None:
+    def hide_data(self) -> str:
         """
         Hide data in the host audio file and save to the output location.
+
+        Returns:
+            str: Path of the steganographic output file
         """
-        temp_input_wav = os.path.join(self.temp_path, "temp_input.wav")
-        temp_output_wav = os.path.join(self.temp_path, "temp_output.wav")
+        try:
+            if self.output is not None:
+                return self._hide_in_memory()
 
-        # Convert to WAV if needed
-        if self.host_file.file_extension.lower() in ['mp3', 'aac', 'm4a', 'flac', 'alac', 'aif', 'aiff', 'dsf', 'pcm']:
-            audio_format = self._get_format_from_extension(self.host_file.file_path)
-            if audio_format:
-                AudioSegment.from_file(self.host_file.file_path, format=audio_format).export(temp_input_wav, format="wav")
-            else:
-                temp_input_wav = self.host_file.file_path
-        else:
+            temp_output_wav = self.workspace.temp_path('output', '.wav')
+
+            # Convert to WAV if needed
             temp_input_wav = self.host_file.file_path
+            cached = self._cached_pcm()
+            with self.control.span('decode'):
+                if cached is None and self.host_file.file_extension.lower() != 'wav':
+                    temp_input_wav = self._decode_to_wav(self.workspace.temp_path('input', '.wav'))
 
-        # Encode the data into the WAV file
-        self._encode_audio(temp_input_wav, temp_output_wav)
+            # Encode the data into the WAV file
+            self._encode_audio(temp_input_wav, temp_output_wav, cached=cached)
 
-        # Determine output path
-        base_name = os.path.splitext(self.host_file.file_name)[0]
-        output_file = os.path.join(self.output_path, f"{base_name}_stego.wav")
-        
-        # Move the output file to the final location
-        if os.path.exists(output_file):
-            os.remove(output_file)
-        os.rename(temp_output_wav, output_file)
-
-        # Clean up temporary files
-        for f in [temp_input_wav]:
-            if os.path.exists(f) and f != self.host_file.file_path:
-                try:
-                    os.remove(f)
-                except PermissionError:
-                    pass
+            # Move the output file to the final location
+            self.control.check()
+            base_name = os.path.splitext(self.host_file.file_name)[0]
+            with self.control.span('write', bytes=os.path.getsize(temp_output_wav)):
+                return self.workspace.commit(temp_output_wav, f"{base_name}_stego.wav")
+        finally:
+            if self._owns_workspace:
+                self.workspace.cleanup()
+
+    def _hide_in_memory(self):
+        """hide_data() for in-memory outputs: the WAV is built in BytesIO, not in scratch files."""
+        source = self._carrier_source()
+        if self.host_file.file_extension.lower() != 'wav':
+            with self.control.span('decode'):
+                # ffmpeg reads the carrier from stdin and writes the WAV to stdout
+                source = self._decode_to_wav()
+        self._encode_audio(source, self.output)
+        return self.output
     
-    def extract_data(self) -> str:
+    def extract_data(self) -> bytes:
         """
         Extract hidden data from the steganographic audio file.
         
         Returns:
-            str: The extracted hidden data
+            bytes: The extracted hidden data
         """
-        os.makedirs(self.temp_path, exist_ok=True)
-        temp_wav = os.path.join(self.temp_path, "temp_decode.wav")
-        used_temp = False
+        if self.streaming and self.host_file.file_extension.lower() == 'wav':
+            return self.peek_data()
 
-        # Convert to WAV if needed
-        if self.host_file.file_extension.lower() in ['mp3', 'aac', 'm4a', 'flac', 'alac', 'aif', 'aiff', 'dsf', 'pcm']:
-            audio_format = self._get_format_from_extension(self.host_file.file_path)
-            if audio_format:
-                AudioSegment.from_file(self.host_file.file_path, format=audio_format).export(temp_wav, format="wav")
-                used_temp = True
-            else:
-                temp_wav = self.host_file.file_path
-        else:
-            temp_wav = self.host_file.file_path
+        temp_wav = self._carrier_source()
+        used_temp = False
 
         try:
+            # Convert to WAV if needed
+            self.control.report('decode')
+            cached = self._cached_pcm()
+            if cached is None and self.host_file.file_extension.lower() != 'wav':
+                with self.control.trace('decode'):
+                    if self.host_file.file_path is None:
+                        temp_wav = self._decode_to_wav()
+                    else:
+                        temp_wav = self._decode_to_wav(self.workspace.temp_path('decode', '.wav'))
+                        used_temp = True
+
             # Try to extract from metadata first for lossy formats
             if self.host_file.file_extension.lower() in ['mp3', 'aac', 'm4a']:
-                metadata_data = self._extract_from_metadata(temp_wav if used_temp else self.host_file.file_path)
+                metadata_data = self._extract_from_metadata(temp_wav if used_temp else self._carrier_source())
                 if metadata_data:
                     return metadata_data
                 print("No data found in metadata, trying LSB extraction")
             
             # Read the WAV file
-            with wave.open(temp_wav, 'rb') as audio:
-                frames = bytearray(list(audio.readframes(audio.getnframes())))
-            
-            # Extract LSBs - one bit per sample
-            bits = []
-            data = bytearray()
-            
-            for byte in frames:
-                # Get LSB of current byte
-                bits.append(str(byte & 1))
-                
-                # If we have at least 8 bits, process them
-                if len(bits) >= 8:
-                    # Convert 8 bits to a byte
-                    byte_str = ''.join(bits[:8])
-                    byte_val = int(byte_str, 2)
-                    data.append(byte_val)
-                    bits = bits[8:]
-                    
-                    # Check for end marker
-                    if data.endswith(self.end_marker.encode('utf-8')):
-                        # Remove the end marker before returning
-                        return data[:-len(self.end_marker)].decode('utf-8', errors='replace')
-            
-            # If we get here, we didn't find the end marker
-            if data:
-                return data.decode('utf-8', errors='replace')
-                
-            return ""
-            
+            self.control.check()
+            if cached is not None:
+                wav = Wav_Pcm(bytes.fromhex(cached[1]['fmt']))
+                frames = cached[0]
+            else:
+                with self.control.trace('decode') as span:
+                    wav, frames = self._read_wav(temp_wav)
+                    span.set(bytes=len(frames))
+                self._store_pcm(wav, frames)
+
+            # Extract the length-prefixed data from the sample LSBs
+            with self.control.span('extract') as span:
+                data = self._extract_samples(wav, lambda count: frames, len(frames) // wav.frame_bytes)
+                span.set(bytes=len(data))
+            return data
+
+        except Job_Cancelled:
+            raise
         except Exception as e:
             raise RuntimeError(f"Failed to extract data from audio: {str(e)}")
         finally:
@@ -405,7 +616,34 @@ class Audio_Hider:
                     os.remove(temp_wav)
                 except PermissionError:
                     pass
+            if self._owns_workspace:
+                self.workspace.cleanup()
     
+    def peek_data(self) -> bytes:
+        """
+        Extract hidden data, reading only the WAV frames that hold it.
+
+        Other formats (and scattered data, which may sit anywhere in the
+        PCM) have to be decoded in full and go through extract_data().
+
+        Returns:
+            bytes: The extracted hidden data
+        """
+        if self.host_file.file_extension.lower() != 'wav' or self.scatter_key is not None:
+            return self.extract_data()
+        with self._open_wav(self._carrier_source()) as src:
+            wav, frame_count = Wav_Pcm.read_header(src)
+            start = src.tell()
+
+            def read_frames(count):
+                src.seek(start)
+                return src.read(count * wav.frame_bytes)
+
+            with self.control.span('extract', partial=True) as span:
+                data = self._extract_samples(wav, read_frames, frame_count)
+                span.set(bytes=len(data))
+        return data
+
     @staticmethod
     def is_supported_format(file_path: str) -> bool:
         """
@@ -0,0 +1,298 @@
+import os
+import json
+from objects.File import File
+from Chunk import Chunk
+from Job_Control import Job_Control
+from Workspace import Workspace
+
+
+class Batch_Scheduler:
+    """Hides a batch of files in a pool of carriers, one pass per carrier.
+
+    The secrets of a manifest are packed into the carriers of a directory:
+    each secret becomes one job split into as few chunks as capacity allows,
+    and a carrier can take chunks of several jobs, stored back to back (see
+    Chunk.parse_all). Every used carrier is then decoded, embedded into and
+    encoded exactly once, with carriers processed in parallel, longest
+    predicted first.
+
+    Packing is first-fit decreasing: secrets are placed largest first, into
+    carriers that are already in use before any new one is opened. A new
+    carrier is the cheapest one that takes the rest of the secret, or else
+    the one with the most capacity per unit of predicted work.
+    """
+
+    # Predicted seconds per MB of carrier for one decode/embed/encode pass
+    CATEGORY_COST = {
+        'image': 0.05,
+        'audio': 0.02,
+        'video': 1.0,
+    }
+    # Predicted seconds per carrier regardless of size (probe, open, commit)
+    PASS_COST = 0.01
+    # Don't split a secret into chunks smaller than this
+    MIN_CHUNK_BYTES = 64
+
+    def __init__(self, runner=None):
+        """
+        Args:
+            runner: Runner providing the hiders, settings and worker count (default: a new Runner)
+        """
+        if runner is None:
+            from Runner import Runner
+            runner = Runner()
+        self.runner = runner
+
+    @staticmethod
+    def load_manifest(manifest_path):
+        """
+        Read the secrets of a batch manifest.
+
+        The manifest is a JSON list of paths (or of {"path": ...} objects), or
+        an object holding that list under "secrets". Relative paths are taken
+        relative to the manifest.
+
+        Returns:
+            list[str]: Secret file paths
+
+        Raises:
+            ValueError: If the manifest has no secrets
+        """
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            manifest = manifest.get('secrets', [])
+        base = os.path.dirname(os.path.abspath(manifest_path))
+        secrets = []
+        for entry in manifest:
+            path = entry['path'] if isinstance(entry, dict) else entry
+            secrets.append(os.path.join(base, path))
+        if not secrets:
+            raise ValueError("Manifest lists no secrets")
+        return secrets
+
+    def predicted_time(self, carrier_file):
+        """Predicted seconds for one embedding pass over a carrier."""
+        size_mb = os.path.getsize(carrier_file.file_path) / (1024 * 1024)
+        return self.PASS_COST + self.CATEGORY_COST.get(carrier_file.category, 1.0) * size_mb
+
+    def probe(self, carrier_dir, control=None):
+        """
+        Measure every supported carrier of a directory.
+
+        Returns:
+            list[dict]: 'file' (File), 'capacity' (bytes, None for no fixed
+                limit) and 'cost' (predicted seconds) per carrier, in name order
+        """
+        control = control or Job_Control()
+        carrier_files = []
+        for name in sorted(os.listdir(carrier_dir)):
+            path = os.path.join(carrier_dir, name)
+            if not os.path.isfile(path):
+                continue
+            carrier_file = File(path)
+            carrier_file.categorize()
+            if self.runner.get_hider_class(carrier_file.category) is None:
+                print(f"Skipping unsupported file type: {carrier_file.category}")
+                continue
+            carrier_files.append(carrier_file)
+
+        def probe_carrier(i):
+            carrier_file = carrier_files[i]
+            with control.for_carrier(i, len(carrier_files), carrier_file.file_path).span('probe') as span:
+                try:
+                    capacity = self.runner.make_hider(carrier_file, b'').capacity()
+                except Exception as e:
+                    print(f"Warning: Cannot use {carrier_file.file_path} as a carrier: {e}")
+                    return None
+                span.set(bytes=capacity)
+            return {'file': carrier_file, 'capacity': capacity, 'cost': self.predicted_time(carrier_file)}
+
+        return [entry for entry in self.runner._map_carriers(probe_carrier, len(carrier_files)) if entry]
+
+    @staticmethod
+    def _plain_size(room, overhead, segment_size):
+        """Largest plaintext slice whose chunk fits in room bytes."""
+        from Encrypter import Encrypter
+        room -= overhead
+        if room <= 0:
+            return 0
+        if segment_size is None or room == float('inf'):
+            return room
+        return Encrypter.plain_size(room, segment_size)
+
+    def plan(self, secret_paths, carriers, segment_size=None):
+        """
+        Assign slices of the secrets to carriers.
+
+        Args:
+            secret_paths: Files to hide, one job each
+            carriers: Entries from probe()
+            segment_size: Segment size of the Encrypter the chunks will be
+                sealed with, or None if they are not encrypted
+
+        Returns:
+            dict: carrier index -> list of (secret index, offset, length)
+                slices, in the order they are stored
+
+        Raises:
+            ValueError: If the carriers cannot hold all the secrets
+        """
+        from Encrypter import Encrypter
+        params_size = Encrypter.PARAMS.size if segment_size is not None else 0
+
+        def stored_size(length):
+            return length if segment_size is None else Encrypter.sealed_size(length, segment_size)
+        free = [entry['capacity'] if entry['capacity'] is not None else float('inf') for entry in carriers]
+        assignments = {}
+        sizes = [os.path.getsize(path) for path in secret_paths]
+
+        for secret in sorted(range(len(secret_paths)), key=lambda i: sizes[i], reverse=True):
+            name = os.path.basename(secret_paths[secret])
+            offset = 0
+            while True:
+                remaining = sizes[secret] - offset
+                overhead = Chunk.overhead(name if offset == 0 else '', params_size)
+                needed = overhead + stored_size(remaining)
+                minimum = overhead + stored_size(min(remaining, self.MIN_CHUNK_BYTES))
+
+                def usable(i):
+                    return free[i] >= minimum
+
+                used = [i for i in assignments if usable(i)]
+                if used:
+                    # Fill the open carrier with the most room first
+                    carrier = max(used, key=lambda i: free[i])
+                else:
+                    unused = [i for i in range(len(carriers)) if i not in assignments and usable(i)]
+                    if not unused:
+                        raise ValueError(f"Carriers are too small: {remaining} bytes of "
+                                         f"{secret_paths[secret]} do not fit")
+                    fitting = [i for i in unused if free[i] >= needed]
+                    if fitting:
+                        carrier = min(fitting, key=lambda i: carriers[i]['cost'])
+                    else:
+                        carrier = max(unused, key=lambda i: free[i] / carriers[i]['cost'])
+
+                length = min(remaining, self._plain_size(free[carrier], overhead, segment_size))
+                stored = overhead + stored_size(length)
+                free[carrier] -= stored
+                assignments.setdefault(carrier, []).append((secret, offset, length))
+                offset += length
+                if offset >= sizes[secret]:
+                    break
+        return assignments
+
+    def _build_chunks(self, secret_paths, assignments, job_ids, encrypter):
+        """Serialize every carrier's chunks; returns carrier index -> payload bytes."""
+        # Chunk ids follow the order of the slices within each secret
+        pieces = {}
+        for carrier, slices in assignments.items():
+            for secret, offset, length in slices:
+                pieces.setdefault(secret, []).append((offset, length, carrier))
+        stored = {}
+        for secret, secret_pieces in pieces.items():
+            secret_pieces.sort()
+            name = os.path.basename(secret_paths[secret])
+            with open(secret_paths[secret], 'rb') as f:
+                for chunk_id, (offset, length, carrier) in enumerate(secret_pieces):
+                    f.seek(offset)
+                    content = f.read(length)
+                    chunk = Chunk(job_ids[secret], chunk_id, offset, content,
+                                  file_name=name if chunk_id == 0 else '',
+                                  is_last=chunk_id == len(secret_pieces) - 1)
+                    if encrypter is not None:
+                        params, ciphertext = encrypter.encrypt(content, chunk.associated_data())
+                        chunk = Chunk(job_ids[secret], chunk_id, offset, ciphertext, file_name=chunk.file_name,
+                                      is_last=chunk.is_last, length=length, params=params)
+                    stored[(carrier, secret, offset)] = chunk.to_bytes()
+        return {
+            carrier: b''.join(stored[(carrier, secret, offset)] for secret, offset, _ in slices)
+            for carrier, slices in assignments.items()
+        }
+
+    def describe(self, secret_paths, carriers, assignments):
+        """JSON-serializable summary of a plan."""
+        return {
+            'carriers': [
+                {
+                    'carrier': carriers[i]['file'].file_path,
+                    'category': carriers[i]['file'].category,
+                    'capacity_bytes': carriers[i]['capacity'],
+                    'predicted_seconds': round(carriers[i]['cost'], 3),
+                    'chunks': [{'secret': secret_paths[secret], 'offset': offset, 'length': length}
+                               for secret, offset, length in assignments[i]],
+                }
+                for i in sorted(assignments, key=lambda i: carriers[i]['cost'], reverse=True)
+            ],
+            'unused': [entry['file'].file_path for i, entry in enumerate(carriers) if i not in assignments],
+        }
+
+    def run(self, manifest_path, carrier_dir, password=None, control=None, plan_only=False):
+        """
+        Hide every secret of a manifest in the carriers of a directory.
+
+        Args:
+            manifest_path: Batch manifest (see load_manifest())
+            carrier_dir: Directory of carrier files
+            password: If given, chunk payloads are encrypted (one key for the whole batch)
+            control: Optional Job_Control for progress events and cancellation
+            plan_only: Return the plan without embedding anything
+
+        Returns:
+            dict: The plan (see describe()) plus, unless plan_only, 'outputs'
+                (produced stego files) and 'jobs' (secret path -> job id hex)
+
+        Raises:
+            ValueError: If the carriers cannot hold all the secrets, or the
+                runner scatters and no password was given
+        """
+        secret_paths = self.load_manifest(manifest_path)
+        control = control or Job_Control()
+        total = sum(os.path.getsize(path) for path in secret_paths)
+        with control.trace('job', operation='batch', bytes=total, secrets=len(secret_paths)):
+            scatter_key = self.runner._scatter_key(password)
+            carriers = self.probe(carrier_dir, control)
+            with control.span('prepare', bytes=total):
+                # Chunk sizes don't depend on the key, so a plan needs no KDF run
+                from Encrypter import Encrypter
+                encrypter = self.runner._make_encrypter(password) if password and not plan_only else None
+                if encrypter is not None:
+                    segment_size = encrypter.segment_size
+                else:
+                    segment_size = Encrypter.DEFAULT_SEGMENT_SIZE if password else None
+                assignments = self.plan(secret_paths, carriers, segment_size)
+            result = self.describe(secret_paths, carriers, assignments)
+            if plan_only:
+                return result
+
+            job_ids = [os.urandom(16) for _ in secret_paths]
+            with control.span('prepare', bytes=total):
+                payloads = self._build_chunks(secret_paths, assignments, job_ids, encrypter)
+            # Longest predicted pass first, so the slow carriers don't finish last
+            order = sorted(assignments, key=lambda i: carriers[i]['cost'], reverse=True)
+            streaming, workers = self.runner._memory_plan([carriers[i]['file'] for i in order],
+                                                          [payloads[i] for i in order], control, scatter_key)
+
+            with Workspace(self.runner.output_path) as workspace:
+                def hide_carrier(n):
+                    control.check()
+                    carrier_file = carriers[order[n]]['file']
+                    carrier_control = control.for_carrier(n, len(order), carrier_file.file_path)
+                    hider = self.runner.make_hider(carrier_file, payloads[order[n]], control=carrier_control,
+                                                   workspace=workspace, streaming=streaming[n],
+                                                   scatter_key=scatter_key)
+                    output_file = hider.hide_data()
+                    carrier_control.report('done', 1.0, output=output_file)
+                    return output_file
+
+                outputs = self.runner._map_carriers(hide_carrier, len(order), max_workers=workers)
+
+            result['outputs'] = outputs
+            result['jobs'] = {path: job_ids[i].hex() for i, path in enumerate(secret_paths)}
+            if self.runner.verify_outputs:
+                verified = self.runner.verify(outputs, control=control, password=password)
+                errors = {path: error for path, error in verified['files'].items() if error}
+                if errors or not verified['complete']:
+                    raise RuntimeError(f"Output verification failed: {errors or 'chunks are missing'}")
+            return result
@@ -0,0 +1,132 @@
+import struct
+import zlib
+
+
+class Chunk:
+    """A slice of the hidden file as it is stored inside one carrier.
+
+    Binary layout (big-endian):
+        magic, version, flags, job id, chunk id, offset, length,
+        payload size, payload crc32, name length, params length,
+        file name, encryption params, payload
+
+    ``offset`` and ``length`` describe the plaintext slice of the hidden file.
+    ``payload`` holds the stored bytes, which is ciphertext for encrypted
+    chunks, so ``payload_size`` can differ from ``length``.
+    """
+
+    MAGIC = b'STGC'
+    VERSION = 1
+    FLAG_LAST = 0x01
+    FLAG_ENCRYPTED = 0x02
+    HEADER = struct.Struct('>4sBB16sIQIIIHH')
+    IDENTITY = struct.Struct('>16sIQ')
+
+    def __init__(self, job_id: bytes, chunk_id: int, offset: int, payload: bytes,
+                 file_name: str = '', is_last: bool = False, length: int = None,
+                 params: bytes = b'', crc32: int = None):
+        """
+        Args:
+            job_id: 16-byte identifier shared by all chunks of one job
+            chunk_id: Position of the chunk within the job
+            offset: Offset of the plaintext slice within the hidden file
+            payload: Stored bytes (plaintext or ciphertext)
+            file_name: Name of the hidden file, only stored in the first chunk
+            is_last: Whether this is the final chunk of the job
+            length: Plaintext length, defaults to len(payload)
+            params: Encryption parameter block, empty for plaintext chunks
+            crc32: CRC of the payload, computed if omitted
+        """
+        self.job_id = job_id
+        self.chunk_id = chunk_id
+        self.offset = offset
+        self.payload = payload
+        self.file_name = file_name
+        self.is_last = is_last
+        self.length = len(payload) if length is None else length
+        self.params = params
+        self.crc32 = zlib.crc32(payload) if crc32 is None else crc32
+
+    @property
+    def is_encrypted(self) -> bool:
+        return bool(self.params)
+
+    def associated_data(self) -> bytes:
+        """Chunk identity that is authenticated alongside encrypted payloads."""
+        return self.IDENTITY.pack(self.job_id, self.chunk_id, self.offset)
+
+    def check_crc(self) -> bool:
+        return zlib.crc32(self.payload) == self.crc32
+
+    def to_bytes(self) -> bytes:
+        name = self.file_name.encode('utf-8')
+        flags = (self.FLAG_LAST if self.is_last else 0) | (self.FLAG_ENCRYPTED if self.params else 0)
+        header = self.HEADER.pack(
+            self.MAGIC, self.VERSION, flags, self.job_id, self.chunk_id, self.offset,
+            self.length, len(self.payload), self.crc32, len(name), len(self.params)
+        )
+        return b''.join([header, name, self.params, self.payload])
+
+    @classmethod
+    def overhead(cls, file_name: str = '', params_size: int = 0) -> int:
+        """Bytes a chunk takes on top of its payload."""
+        return cls.HEADER.size + len(file_name.encode('utf-8')) + params_size
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Chunk':
+        """
+        Parse a chunk from the start of data.
+
+        Raises:
+            ValueError: If data does not hold a complete, intact chunk
+        """
+        return cls._parse(data, 0)[0]
+
+    @classmethod
+    def parse_all(cls, data: bytes) -> list['Chunk']:
+        """
+        Parse every chunk stored back to back in data.
+
+        A carrier filled by Batch_Scheduler holds chunks of several jobs in a
+        row; carriers written by Runner.run() hold a single one.
+
+        Raises:
+            ValueError: If the first chunk is not complete and intact, or a
+                later chunk that starts with the magic is damaged
+        """
+        chunks = []
+        pos = 0
+        while True:
+            chunk, pos = cls._parse(data, pos)
+            chunks.append(chunk)
+            if data[pos:pos + len(cls.MAGIC)] != cls.MAGIC:
+                return chunks
+
+    @classmethod
+    def _parse(cls, data, start):
+        """Parse the chunk at data[start:] and return (chunk, end offset)."""
+        if len(data) - start < cls.HEADER.size:
+            raise ValueError("Data too short for a chunk header")
+        (magic, version, flags, job_id, chunk_id, offset, length,
+         payload_size, crc32, name_len, params_len) = cls.HEADER.unpack_from(data, start)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a chunk: bad magic")
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported chunk version: {version}")
+
+        pos = start + cls.HEADER.size
+        end = pos + name_len + params_len + payload_size
+        if len(data) < end:
+            raise ValueError("Chunk is truncated")
+        file_name = bytes(data[pos:pos + name_len]).decode('utf-8', errors='replace')
+        pos += name_len
+        params = bytes(data[pos:pos + params_len])
+        pos += params_len
+        payload = bytes(data[pos:end])
+
+        chunk = cls(job_id, chunk_id, offset, payload, file_name=file_name,
+                    is_last=bool(flags & cls.FLAG_LAST), length=length,
+                    params=params, crc32=crc32)
+        if not chunk.check_crc():
+            raise ValueError(f"CRC mismatch in chunk {chunk_id}")
+        return chunk, end
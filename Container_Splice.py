@@ -0,0 +1,306 @@
+import io
+import zlib
+import struct
+
+
+class Container_Splice:
+    """Store data in an image container without touching its pixel data.
+
+    The payload is written as private chunks/segments by rewriting only the
+    container's chunk list; compressed image data is copied through byte for
+    byte, so there is no decode, no re-encode and no generation loss:
+
+        PNG:  private ancillary 'stGc' chunks, placed before the first IDAT
+        JPEG: APP15 segments tagged 'STEGO\\0', placed after the existing APPn
+              segments (JFIF/EXIF stay first)
+        WebP: a 'stGc' RIFF chunk at the end; simple (VP8/VP8L) files get a
+              VP8X header, which is what allows extra chunks
+
+    Extraction reads chunk/segment headers only and stops before the image
+    data (PNG, JPEG) or seeks over it (WebP). Hiding again replaces any
+    payload already present. All methods work on binary file objects.
+    """
+
+    FORMATS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'webp': 'webp'}
+
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    # Lowercase 1st/2nd letters: ancillary and private; lowercase 4th: safe to copy
+    PNG_CHUNK_TYPE = b'stGc'
+    PNG_MAX_CHUNK = 0x7FFFFFFF
+
+    JPEG_MARKER = 0xEF  # APP15
+    JPEG_IDENTIFIER = b'STEGO\x00'
+    JPEG_MAX_PIECE = 0xFFFF - 2 - len(JPEG_IDENTIFIER)
+    # Markers without a length field
+    JPEG_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+
+    WEBP_CHUNK_TYPE = b'stGc'
+    WEBP_ALPHA_FLAG = 0x10
+
+    COPY_BLOCK = 1024 * 1024
+
+    @classmethod
+    def supports(cls, extension):
+        return extension.lower().lstrip('.') in cls.FORMATS
+
+    @classmethod
+    def _format(cls, extension):
+        fmt = cls.FORMATS.get(extension.lower().lstrip('.'))
+        if fmt is None:
+            raise ValueError(f"Container embedding is not supported for .{extension}")
+        return fmt
+
+    @classmethod
+    def hide(cls, src, dst, payload, extension):
+        """
+        Copy the container from src to dst with the payload spliced in.
+
+        Args:
+            src: Readable binary file object positioned at the start of the image
+            dst: Writable binary file object
+            payload: Bytes to store
+            extension: Image file extension ('png', 'jpg', 'jpeg' or 'webp')
+
+        Raises:
+            ValueError: If the format is unsupported or the container is malformed
+        """
+        payload = bytes(payload)
+        getattr(cls, f'_hide_{cls._format(extension)}')(src, dst, payload)
+
+    @classmethod
+    def extract(cls, src, extension):
+        """
+        Read a spliced payload from the container headers.
+
+        Returns:
+            bytes | None: The payload, or None if the container holds none
+
+        Raises:
+            ValueError: If the format is unsupported or the container is malformed
+        """
+        return getattr(cls, f'_extract_{cls._format(extension)}')(src)
+
+    @staticmethod
+    def _read_exact(src, size):
+        data = src.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated image container")
+        return data
+
+    @classmethod
+    def _copy(cls, src, dst, size=None):
+        """Copy size bytes (or everything left) from src to dst."""
+        while size is None or size > 0:
+            block = src.read(cls.COPY_BLOCK if size is None else min(size, cls.COPY_BLOCK))
+            if not block:
+                if size is not None:
+                    raise ValueError("Truncated image container")
+                return
+            dst.write(block)
+            if size is not None:
+                size -= len(block)
+
+    @classmethod
+    def _skip(cls, src, size):
+        try:
+            src.seek(size, io.SEEK_CUR)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            while size > 0:
+                block = src.read(min(size, cls.COPY_BLOCK))
+                if not block:
+                    raise ValueError("Truncated image container")
+                size -= len(block)
+
+    # PNG
+
+    @classmethod
+    def _png_chunk(cls, chunk_type, data):
+        crc = zlib.crc32(data, zlib.crc32(chunk_type))
+        return struct.pack('>I4s', len(data), chunk_type) + data + struct.pack('>I', crc)
+
+    @classmethod
+    def _hide_png(cls, src, dst, payload):
+        if cls._read_exact(src, 8) != cls.PNG_SIGNATURE:
+            raise ValueError("Not a PNG file")
+        dst.write(cls.PNG_SIGNATURE)
+        inserted = False
+        while True:
+            header = cls._read_exact(src, 8)
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == cls.PNG_CHUNK_TYPE:
+                # Drop a payload from an earlier run
+                cls._skip(src, length + 4)
+                continue
+            if not inserted and chunk_type in (b'IDAT', b'IEND'):
+                for start in range(0, max(len(payload), 1), cls.PNG_MAX_CHUNK):
+                    dst.write(cls._png_chunk(cls.PNG_CHUNK_TYPE, payload[start:start + cls.PNG_MAX_CHUNK]))
+                inserted = True
+            dst.write(header)
+            cls._copy(src, dst, length + 4)
+            if chunk_type == b'IEND':
+                return
+
+    @classmethod
+    def _extract_png(cls, src):
+        if cls._read_exact(src, 8) != cls.PNG_SIGNATURE:
+            raise ValueError("Not a PNG file")
+        pieces = []
+        while True:
+            header = src.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            # Payload chunks always precede the image data
+            if chunk_type in (b'IDAT', b'IEND'):
+                break
+            if chunk_type != cls.PNG_CHUNK_TYPE:
+                cls._skip(src, length + 4)
+                continue
+            data = cls._read_exact(src, length)
+            crc, = struct.unpack('>I', cls._read_exact(src, 4))
+            if zlib.crc32(data, zlib.crc32(chunk_type)) != crc:
+                raise ValueError("Hidden PNG chunk is corrupted (CRC mismatch)")
+            pieces.append(data)
+        return b''.join(pieces) if pieces else None
+
+    # JPEG
+
+    @classmethod
+    def _jpeg_segments(cls, payload):
+        segments = []
+        for start in range(0, max(len(payload), 1), cls.JPEG_MAX_PIECE):
+            data = cls.JPEG_IDENTIFIER + payload[start:start + cls.JPEG_MAX_PIECE]
+            segments.append(struct.pack('>BBH', 0xFF, cls.JPEG_MARKER, len(data) + 2) + data)
+        return b''.join(segments)
+
+    @classmethod
+    def _jpeg_marker(cls, src):
+        """Read the next marker byte, skipping fill bytes."""
+        if cls._read_exact(src, 1) != b'\xff':
+            raise ValueError("Malformed JPEG: expected a marker")
+        marker = cls._read_exact(src, 1)[0]
+        while marker == 0xFF:
+            marker = cls._read_exact(src, 1)[0]
+        return marker
+
+    @classmethod
+    def _hide_jpeg(cls, src, dst, payload):
+        if cls._read_exact(src, 2) != b'\xff\xd8':
+            raise ValueError("Not a JPEG file")
+        dst.write(b'\xff\xd8')
+        segments = cls._jpeg_segments(payload)
+        inserted = False
+        while True:
+            marker = cls._jpeg_marker(src)
+            if not inserted and not 0xE0 <= marker <= 0xEF:
+                dst.write(segments)
+                inserted = True
+            if marker in cls.JPEG_STANDALONE:
+                dst.write(bytes((0xFF, marker)))
+                continue
+            if marker == 0xD9:  # EOI
+                dst.write(b'\xff\xd9')
+                return
+            length_bytes = cls._read_exact(src, 2)
+            length, = struct.unpack('>H', length_bytes)
+            data = cls._read_exact(src, length - 2)
+            if marker == cls.JPEG_MARKER and data.startswith(cls.JPEG_IDENTIFIER):
+                # Drop a payload from an earlier run
+                continue
+            dst.write(bytes((0xFF, marker)) + length_bytes + data)
+            if marker == 0xDA:  # SOS: the rest is entropy-coded data
+                cls._copy(src, dst)
+                return
+
+    @classmethod
+    def _extract_jpeg(cls, src):
+        if cls._read_exact(src, 2) != b'\xff\xd8':
+            raise ValueError("Not a JPEG file")
+        pieces = []
+        while True:
+            marker = cls._jpeg_marker(src)
+            if marker in cls.JPEG_STANDALONE:
+                continue
+            if marker in (0xD9, 0xDA):
+                break
+            length, = struct.unpack('>H', cls._read_exact(src, 2))
+            if marker == cls.JPEG_MARKER:
+                data = cls._read_exact(src, length - 2)
+                if data.startswith(cls.JPEG_IDENTIFIER):
+                    pieces.append(data[len(cls.JPEG_IDENTIFIER):])
+            else:
+                cls._skip(src, length - 2)
+        return b''.join(pieces) if pieces else None
+
+    # WebP
+
+    @classmethod
+    def _webp_chunks(cls, src):
+        """Return [(fourcc, data offset, size)] for every chunk, seeking over the data."""
+        header = cls._read_exact(src, 12)
+        if header[:4] != b'RIFF' or header[8:] != b'WEBP':
+            raise ValueError("Not a WebP file")
+        riff_end = 8 + struct.unpack('<I', header[4:8])[0]
+        chunks = []
+        position = 12
+        while position + 8 <= riff_end:
+            chunk_header = src.read(8)
+            if len(chunk_header) < 8:
+                break
+            fourcc, size = struct.unpack('<4sI', chunk_header)
+            chunks.append((fourcc, position + 8, size))
+            padded = size + (size & 1)
+            src.seek(padded, io.SEEK_CUR)
+            position += 8 + padded
+        return chunks
+
+    @classmethod
+    def _webp_canvas(cls, fourcc, data):
+        """(width, height, has_alpha) from the start of a VP8/VP8L bitstream."""
+        if fourcc == b'VP8 ':
+            if data[3:6] != b'\x9d\x01\x2a':
+                raise ValueError("Malformed WebP VP8 bitstream")
+            width, height = struct.unpack('<HH', data[6:10])
+            return width & 0x3FFF, height & 0x3FFF, False
+        if fourcc == b'VP8L':
+            if data[0] != 0x2F:
+                raise ValueError("Malformed WebP VP8L bitstream")
+            bits, = struct.unpack('<I', data[1:5])
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, bool(bits >> 28 & 1)
+        raise ValueError(f"Unexpected first WebP chunk: {fourcc!r}")
+
+    @classmethod
+    def _hide_webp(cls, src, dst, payload):
+        start = src.tell()
+        chunks = cls._webp_chunks(src)
+        if not chunks:
+            raise ValueError("WebP file has no chunks")
+        kept = [chunk for chunk in chunks if chunk[0] != cls.WEBP_CHUNK_TYPE]
+
+        prefix = b''
+        if kept[0][0] != b'VP8X':
+            # Simple format: extra chunks are only allowed in the extended format
+            src.seek(start + kept[0][1])
+            width, height, alpha = cls._webp_canvas(kept[0][0], cls._read_exact(src, 10))
+            vp8x = struct.pack('<B3x', cls.WEBP_ALPHA_FLAG if alpha else 0)
+            vp8x += (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+            prefix = struct.pack('<4sI', b'VP8X', len(vp8x)) + vp8x
+
+        pad = b'\x00' if len(payload) & 1 else b''
+        suffix = struct.pack('<4sI', cls.WEBP_CHUNK_TYPE, len(payload)) + payload + pad
+        body_size = sum(8 + size + (size & 1) for _, _, size in kept)
+        dst.write(b'RIFF' + struct.pack('<I', 4 + len(prefix) + body_size + len(suffix)) + b'WEBP')
+        dst.write(prefix)
+        for fourcc, offset, size in kept:
+            src.seek(start + offset - 8)
+            cls._copy(src, dst, 8 + size + (size & 1))
+        dst.write(suffix)
+
+    @classmethod
+    def _extract_webp(cls, src):
+        start = src.tell()
+        for fourcc, offset, size in cls._webp_chunks(src):
+            if fourcc == cls.WEBP_CHUNK_TYPE:
+                src.seek(start + offset)
+                return cls._read_exact(src, size)
+        return None
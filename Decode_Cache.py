@@ -0,0 +1,141 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+import numpy as np
+from Workspace import Workspace
+
+
+class Decode_Cache:
+    """Bounded cache of decoded carriers (pixel rasters, PCM frames).
+
+    Entries are .npy files under root, on tmpfs by default, and are
+    returned as read-only memory-mapped arrays. Any process using the same
+    root (Worker_Service workers, a GUI session, later CLI runs) attaches
+    to the same pages instead of decoding the carrier again or holding its
+    own copy.
+
+    An entry is keyed by (kind, absolute path, size, mtime), so rewriting a
+    carrier invalidates it. Each entry also keeps a small JSON dict of
+    decoder metadata (e.g. WAV parameters). Entries are evicted least
+    recently used first once they exceed max_bytes.
+    """
+
+    def __init__(self, root=None, max_bytes=1024 ** 3):
+        """
+        Args:
+            root: Cache directory (default: stego-decoded on tmpfs if available)
+            max_bytes: Total size above which old entries are evicted
+        """
+        self.root = root or os.path.join(Workspace.default_temp_root(), 'stego-decoded')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, path, kind):
+        stat = os.stat(path)
+        identity = f"{kind}\0{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def get(self, path, kind):
+        """
+        Look up the decoded form of a carrier.
+
+        Args:
+            path: Carrier path
+            kind: What was decoded, e.g. 'pixels' or 'pcm'
+
+        Returns:
+            tuple | None: (read-only array, metadata dict), or None on a miss
+        """
+        key = self._key(path, kind)
+        array_path = os.path.join(self.root, key + '.npy')
+        try:
+            array = np.load(array_path, mmap_mode='r')
+            with open(os.path.join(self.root, key + '.json')) as f:
+                metadata = json.load(f)
+            os.utime(array_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return array, metadata
+
+    def put(self, path, kind, array, metadata=None):
+        """
+        Store the decoded form of a carrier.
+
+        Returns:
+            tuple: (read-only memory-mapped array, metadata), or (array,
+                metadata) unchanged if it is larger than the whole cache
+        """
+        metadata = metadata or {}
+        if array.nbytes > self.max_bytes:
+            return array, metadata
+        key = self._key(path, kind)
+        os.makedirs(self.root, exist_ok=True)
+        # Metadata first: readers only look for it once the array is in place
+        staging = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}")
+        with open(staging + '.json', 'w') as f:
+            json.dump(metadata, f)
+        os.replace(staging + '.json', os.path.join(self.root, key + '.json'))
+        target = np.lib.format.open_memmap(staging + '.npy', mode='w+', dtype=array.dtype, shape=array.shape)
+        target[...] = array
+        target.flush()
+        del target
+        array_path = os.path.join(self.root, key + '.npy')
+        os.replace(staging + '.npy', array_path)
+        self.evict()
+        return np.load(array_path, mmap_mode='r'), metadata
+
+    def _entries(self):
+        """Return [(last use, size, key)] for every entry."""
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return entries
+        for name in names:
+            if name.startswith('.') or not name.endswith('.npy'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+        return entries
+
+    def size(self):
+        """Total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes.
+
+        Processes that still have an evicted array mapped keep it until they
+        drop it; the memory is released after that.
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                for suffix in ('.npy', '.json'):
+                    try:
+                        os.remove(os.path.join(self.root, key + suffix))
+                    except OSError:
+                        pass
+                total -= size
+
+    def clear(self):
+        for _, _, key in self._entries():
+            for suffix in ('.npy', '.json'):
+                try:
+                    os.remove(os.path.join(self.root, key + suffix))
+                except OSError:
+                    pass
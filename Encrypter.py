@@ -1,59 +1,251 @@
 import os
-from cryptography.fernet import Fernet
-import base64
-import json
+import struct
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
 
 class Encrypter:
-    def __init__(self, password: str):
+    """Segmented AEAD encryption for chunk payloads.
+
+    The payload is cut into fixed-size segments that are sealed independently
+    (STREAM construction), so segments can be encrypted and decrypted in
+    parallel. Each segment nonce is ``nonce_prefix || counter || last_flag``,
+    which stops segments from being reordered, dropped or truncated.
+    """
+
+    CIPHER_CHACHA20 = 1
+    CIPHER_AESGCM = 2
+    CIPHERS = {
+        CIPHER_CHACHA20: ChaCha20Poly1305,
+        CIPHER_AESGCM: AESGCM,
+    }
+
+    # KDF id 1 is reserved; chunks are only ever sealed with scrypt
+    KDF_SCRYPT = 2
+    # scrypt (log2 n, r, p): n=2**15, r=8 uses 32 MiB per derivation
+    DEFAULT_KDF_PARAMS = (15, 8, 1)
+    KEY_CACHE_SIZE = 32
+
+    # Process-wide cache of derived keys. Forked worker processes inherit it;
+    # spawned ones can be primed with prime_key_cache().
+    _key_cache = OrderedDict()
+    _key_cache_lock = threading.Lock()
+
+    TAG_SIZE = 16
+    SALT_SIZE = 16
+    NONCE_PREFIX_SIZE = 7
+    DEFAULT_SEGMENT_SIZE = 64 * 1024
+    # Below this many segments the thread hand-off costs more than it saves
+    PARALLEL_THRESHOLD = 4
+
+    # cipher, kdf, kdf params (3 bytes), salt, nonce prefix, segment size
+    PARAMS = struct.Struct(f'>BBBBB{SALT_SIZE}s{NONCE_PREFIX_SIZE}sI')
+
+    def __init__(self, password: str, salt: bytes = None, cipher: int = CIPHER_CHACHA20,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE, max_workers: int = None,
+                 kdf: int = KDF_SCRYPT, kdf_params: tuple = None):
         """
         Initialize the encrypter with a password.
-        The password is used to derive a key for encryption/decryption.
+
+        Args:
+            password: Password the key is derived from
+            salt: Salt for key derivation. A random salt is generated if omitted.
+            cipher: One of CIPHER_CHACHA20 or CIPHER_AESGCM
+            segment_size: Plaintext bytes per sealed segment
+            max_workers: Threads used for segment encryption/decryption
+            kdf: KDF id from the parameter block; only KDF_SCRYPT is supported
+            kdf_params: scrypt (log2 n, r, p), defaults to DEFAULT_KDF_PARAMS
+
+        Raises:
+            ValueError: If the cipher or KDF is not supported, or the salt has the wrong size
         """
+        if cipher not in self.CIPHERS:
+            raise ValueError(f"Unsupported cipher id: {cipher}")
         self.password = password
-        # Derive a 32-byte key from the password using SHA-256
-        key = hashlib.sha256(password.encode()).digest()
-        # Convert to URL-safe base64-encoded bytes
-        self.fernet_key = base64.urlsafe_b64encode(key)
-        self.fernet = Fernet(self.fernet_key)
-        self.START_MARKER = b"STEGO_ENC_START"
-        self.END_MARKER = b"STEGO_ENC_END"
-    
-    def encrypt_data(self, data: dict) -> bytes:
-        """
-        Encrypt the data dictionary into a binary format with markers.
-        """
-        # Convert dictionary to JSON string then to bytes
-        json_data = json.dumps(data).encode('utf-8')
-        # Encrypt the data
-        encrypted = self.fernet.encrypt(json_data)
-        # Add markers and return
-        return self.START_MARKER + encrypted + self.END_MARKER
-    
-    def decrypt_data(self, encrypted_data: bytes) -> dict:
-        """
-        Decrypt the binary data back to a dictionary.
-        """
-        # Find the markers
-        start_idx = encrypted_data.find(self.START_MARKER)
-        if start_idx == -1:
-            raise ValueError("Start marker not found in encrypted data")
-            
-        end_idx = encrypted_data.find(self.END_MARKER, start_idx)
-        if end_idx == -1:
-            raise ValueError("End marker not found in encrypted data")
-            
-        # Extract the encrypted data between markers
-        encrypted = encrypted_data[start_idx + len(self.START_MARKER):end_idx]
-        
-        # Decrypt and parse JSON
+        self.salt = salt if salt is not None else os.urandom(self.SALT_SIZE)
+        if len(self.salt) != self.SALT_SIZE:
+            raise ValueError(f"Salt must be {self.SALT_SIZE} bytes")
+        self.cipher = cipher
+        self.segment_size = segment_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if kdf != self.KDF_SCRYPT:
+            raise ValueError(f"Unsupported KDF id: {kdf}")
+        self.kdf = kdf
+        self.kdf_params = tuple(kdf_params or self.DEFAULT_KDF_PARAMS)
+        self.key = self.derive_key(password, self.salt, self.kdf, self.kdf_params)
+        self.aead = self.CIPHERS[cipher](self.key)
+
+    @staticmethod
+    def _run_kdf(password: bytes, salt: bytes, kdf: int, kdf_params: tuple) -> bytes:
+        log2_n, r, p = kdf_params
+        return Scrypt(salt=salt, length=32, n=2 ** log2_n, r=r, p=p).derive(password)
+
+    @classmethod
+    def derive_key(cls, password: str, salt: bytes, kdf: int = KDF_SCRYPT,
+                   kdf_params: tuple = DEFAULT_KDF_PARAMS) -> bytes:
+        """
+        Derive a 32-byte key, reusing the process-wide cache when possible.
+
+        The cache is keyed by a hash of the password (the password itself is
+        never stored), the salt and the KDF parameters, and holds at most
+        KEY_CACHE_SIZE entries in least-recently-used order.
+        """
+        password_bytes = password.encode('utf-8')
+        cache_key = (hashlib.sha256(password_bytes).digest(), salt, kdf, tuple(kdf_params))
+        with cls._key_cache_lock:
+            key = cls._key_cache.get(cache_key)
+            if key is not None:
+                cls._key_cache.move_to_end(cache_key)
+                return key
+
+        key = cls._run_kdf(password_bytes, salt, kdf, tuple(kdf_params))
+
+        with cls._key_cache_lock:
+            cls._key_cache[cache_key] = key
+            cls._key_cache.move_to_end(cache_key)
+            while len(cls._key_cache) > cls.KEY_CACHE_SIZE:
+                cls._key_cache.popitem(last=False)
+        return key
+
+    @classmethod
+    def export_key_cache(cls) -> list:
+        """Snapshot of the key cache, e.g. to pass to a worker pool initializer."""
+        with cls._key_cache_lock:
+            return list(cls._key_cache.items())
+
+    @classmethod
+    def prime_key_cache(cls, entries: list) -> None:
+        """Load entries produced by export_key_cache() into this process."""
+        with cls._key_cache_lock:
+            for cache_key, key in entries:
+                cls._key_cache[cache_key] = key
+            while len(cls._key_cache) > cls.KEY_CACHE_SIZE:
+                cls._key_cache.popitem(last=False)
+
+    @classmethod
+    def clear_key_cache(cls) -> None:
+        with cls._key_cache_lock:
+            cls._key_cache.clear()
+
+    @classmethod
+    def sealed_size(cls, plain_size: int, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+        """Ciphertext size for plain_size bytes, without needing a key (e.g. for planning)."""
+        segments = max(1, -(-plain_size // segment_size))
+        return plain_size + segments * cls.TAG_SIZE
+
+    @classmethod
+    def plain_size(cls, sealed_room: int, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+        """Largest plaintext whose ciphertext fits in sealed_room bytes (inverse of sealed_size())."""
+        if sealed_room <= cls.TAG_SIZE:
+            return 0
+        size = sealed_room * segment_size // (segment_size + cls.TAG_SIZE)
+        while size > 0 and cls.sealed_size(size, segment_size) > sealed_room:
+            size -= 1
+        return size
+
+    def encrypted_size(self, plain_size: int) -> int:
+        """Size of the ciphertext produced for a plaintext of plain_size bytes."""
+        return self.sealed_size(plain_size, self.segment_size)
+
+    def _nonce(self, nonce_prefix: bytes, index: int, last: bool) -> bytes:
+        return nonce_prefix + struct.pack('>IB', index, 1 if last else 0)
+
+    def _map_segments(self, func, segments):
+        if len(segments) < self.PARALLEL_THRESHOLD or self.max_workers == 1:
+            return [func(item) for item in segments]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(func, segments))
+
+    def encrypt(self, data: bytes, associated_data: bytes = b'') -> tuple[bytes, bytes]:
+        """
+        Encrypt data into raw binary ciphertext.
+
+        Args:
+            data: Plaintext bytes
+            associated_data: Authenticated but unencrypted context (e.g. chunk identity)
+
+        Returns:
+            tuple: (params, ciphertext) where params is the packed parameter
+                block that has to travel with the ciphertext
+        """
+        nonce_prefix = os.urandom(self.NONCE_PREFIX_SIZE)
+        view = memoryview(data)
+        size = self.segment_size
+        count = max(1, -(-len(view) // size))
+        segments = [(i, view[i * size:(i + 1) * size]) for i in range(count)]
+
+        def seal(item):
+            index, segment = item
+            nonce = self._nonce(nonce_prefix, index, index == count - 1)
+            return self.aead.encrypt(nonce, bytes(segment), associated_data)
+
+        ciphertext = b''.join(self._map_segments(seal, segments))
+        return self.pack_params(nonce_prefix), ciphertext
+
+    def decrypt(self, params: bytes, ciphertext: bytes, associated_data: bytes = b'') -> bytes:
+        """
+        Decrypt ciphertext produced by encrypt().
+
+        Args:
+            params: Parameter block returned by encrypt()
+            ciphertext: Raw ciphertext
+            associated_data: The associated data used during encryption
+
+        Returns:
+            bytes: The plaintext
+
+        Raises:
+            ValueError: If the parameters don't match or authentication fails
+        """
+        fields = self.unpack_params(params)
+        if (fields['cipher'], fields['kdf'], fields['kdf_params'], fields['salt'], fields['segment_size']) != \
+                (self.cipher, self.kdf, self.kdf_params, self.salt, self.segment_size):
+            raise ValueError("Encryption parameters do not match this encrypter")
+
+        nonce_prefix = fields['nonce_prefix']
+        view = memoryview(ciphertext)
+        size = self.segment_size + self.TAG_SIZE
+        count = max(1, -(-len(view) // size))
+        segments = [(i, view[i * size:(i + 1) * size]) for i in range(count)]
+
+        def open_segment(item):
+            index, segment = item
+            nonce = self._nonce(nonce_prefix, index, index == count - 1)
+            return self.aead.decrypt(nonce, bytes(segment), associated_data)
+
         try:
-            decrypted = self.fernet.decrypt(encrypted)
-            return json.loads(decrypted.decode('utf-8'))
+            return b''.join(self._map_segments(open_segment, segments))
         except Exception as e:
-            raise ValueError(f"Decryption failed: {str(e)}")
-    
-    @staticmethod
-    def generate_key() -> str:
-        """Generate a new encryption key"""
-        return Fernet.generate_key().decode('utf-8')
+            raise ValueError(f"Decryption failed: {type(e).__name__}") from e
+
+    def pack_params(self, nonce_prefix: bytes) -> bytes:
+        """Pack the cipher, KDF and segment parameters for a chunk header."""
+        return self.PARAMS.pack(self.cipher, self.kdf, *self.kdf_params,
+                                self.salt, nonce_prefix, self.segment_size)
+
+    @classmethod
+    def unpack_params(cls, params: bytes) -> dict:
+        """Unpack a parameter block written by pack_params()."""
+        if len(params) != cls.PARAMS.size:
+            raise ValueError("Invalid encryption parameter block")
+        cipher, kdf, p1, p2, p3, salt, nonce_prefix, segment_size = cls.PARAMS.unpack(params)
+        return {
+            'cipher': cipher,
+            'kdf': kdf,
+            'kdf_params': (p1, p2, p3),
+            'salt': salt,
+            'nonce_prefix': nonce_prefix,
+            'segment_size': segment_size,
+        }
+
+    @classmethod
+    def from_params(cls, password: str, params: bytes, **kwargs) -> 'Encrypter':
+        """Create an encrypter matching the parameter block stored in a chunk header."""
+        fields = cls.unpack_params(params)
+        return cls(password, salt=fields['salt'], cipher=fields['cipher'],
+                   segment_size=fields['segment_size'], kdf=fields['kdf'],
+                   kdf_params=fields['kdf_params'], **kwargs)
@@ -18,6 +18,12 @@ class File_Handeler:
         file.add_content(content)
         return file
 
-    def load_files(self):
+    def load_files(self, load_content=True):
+        """Create a File for every entry of the source directory.
+
+        Args:
+            load_content: Also read each file into memory (file_content)
+        """
         for file_path in os.listdir(self.source_path):
-            self.files.append(self.create_file_object(self.source_path + "/" + file_path))
\ No newline at end of file
+            path = self.source_path + "/" + file_path
+            self.files.append(self.create_file_object(path) if load_content else File(path))
\ No newline at end of file
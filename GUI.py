@@ -1,11 +1,15 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
 from Runner import Runner
+from Job_Control import Job_Control, Job_Cancelled
+import queue
 import os
 
 class GUI:
     SUPPORTED_HIDDEN_TYPES = ['.txt', '.md', '.py', '.html', '.css', '.js', '.json', '.xml', '.csv', '.log']
     SUPPORTED_CARRIER_TYPES = ['.wav', '.mp3', '.mp4', '.png', '.tiff', '.gif', '.bmp']
+    POLL_INTERVAL_MS = 100
 
     def __init__(self, master, runner):
         self.master = master
@@ -20,6 +24,12 @@ class GUI:
         self.lock_states = {}  # Track lock state for each file
         self._updating = False
 
+        # Jobs run on a background thread; their progress events come back
+        # through this queue and are drained on the Tk thread with after()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        self.control = None
+
         hidden_frame = tk.LabelFrame(master, text="Hidden File", padx=10, pady=10)
         hidden_frame.pack(fill="x", padx=10, pady=5)
 
@@ -27,6 +37,11 @@ class GUI:
         tk.Entry(hidden_frame, textvariable=self.hidden_file_var, width=60, state="readonly").pack(side="left", padx=5)
         tk.Button(hidden_frame, text="Browse", command=self.load_hidden_file).pack(side="left", padx=5)
 
+        # Optional password: when set, chunks are encrypted before hiding
+        self.password_var = tk.StringVar()
+        tk.Label(hidden_frame, text="Password:").pack(side="left", padx=(10, 2))
+        tk.Entry(hidden_frame, textvariable=self.password_var, width=16, show="*").pack(side="left", padx=5)
+
 
 
         carrier_frame = tk.LabelFrame(master, text="Carrier Files", padx=10, pady=10)
@@ -37,12 +52,24 @@ class GUI:
 
         tk.Button(carrier_frame, text="Add Carrier File", command=self.add_carrier_file).pack(pady=5)
 
+        progress_frame = tk.Frame(master)
+        progress_frame.pack(fill="x", padx=10)
+
+        self.status_var = tk.StringVar(value="Idle")
+        self.progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", mode="determinate", maximum=100)
+        self.progress_bar.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        tk.Label(progress_frame, textvariable=self.status_var, width=40, anchor="w").pack(side="left")
+
         button_frame = tk.Frame(master)
         button_frame.pack(fill="x", pady=10)
 
-        tk.Button(button_frame, text="Run Steganography", command=self.run_steganography).pack(side="right", padx=10)
-        tk.Button(button_frame, text="Extract", command=self.extract_data).pack(side="right", padx=10)
-        tk.Button(button_frame, text="Quit", command=self.master.quit).pack(side="right")
+        self.run_button = tk.Button(button_frame, text="Run Steganography", command=self.run_steganography)
+        self.run_button.pack(side="right", padx=10)
+        self.extract_button = tk.Button(button_frame, text="Extract", command=self.extract_data)
+        self.extract_button.pack(side="right", padx=10)
+        self.cancel_button = tk.Button(button_frame, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(side="right", padx=10)
+        tk.Button(button_frame, text="Quit", command=self.quit).pack(side="right")
 
     def load_hidden_file(self):
         file_path = filedialog.askopenfilename(title="Select file to hide")
@@ -243,6 +270,78 @@ class GUI:
                     self.sliders[f].set(new_val)
                     self.percent_labels[f].config(text=f"{new_val:.0f}%")
 
+    def _set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        self.run_button.config(state=state)
+        self.extract_button.config(state=state)
+        self.cancel_button.config(state="normal" if busy else "disabled")
+
+    def _start_job(self, task, on_success, failure_message):
+        """Run task(control) on the background executor and follow its progress."""
+        self.control = Job_Control(progress=self.events.put)
+        self._set_busy(True)
+        self.progress_bar["value"] = 0
+        self.status_var.set("Starting...")
+        future = self.executor.submit(task, self.control)
+        future.add_done_callback(
+            lambda f: self.events.put({'stage': '_finished', 'future': f,
+                                       'on_success': on_success, 'failure_message': failure_message})
+        )
+        self.master.after(self.POLL_INTERVAL_MS, self._poll_events)
+
+    def _poll_events(self):
+        """Drain progress events on the Tk thread."""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event['stage'] == '_finished':
+                self._finish_job(event)
+                return
+            self._show_progress(event)
+        self.master.after(self.POLL_INTERVAL_MS, self._poll_events)
+
+    def _show_progress(self, event):
+        total = event.get('carrier_total') or 0
+        if not total or event.get('carrier') is None:
+            self.status_var.set(event['stage'].capitalize() + "...")
+            return
+        fraction = event.get('fraction') or 0.0
+        overall = (event['carrier_index'] + fraction) / total
+        self.progress_bar["value"] = overall * 100
+        name = os.path.basename(event['carrier'])
+        percent = f" ({fraction:.0%})" if event.get('fraction') is not None and event['stage'] != 'done' else ""
+        self.status_var.set(f"{event['carrier_index'] + 1}/{total} {name}: {event['stage']}{percent}")
+
+    def _finish_job(self, event):
+        self._set_busy(False)
+        self.control = None
+        try:
+            result = event['future'].result()
+        except Job_Cancelled:
+            self.status_var.set("Cancelled")
+            return
+        except Exception as e:
+            self.status_var.set("Failed")
+            messagebox.showerror("Error", f"{event['failure_message']}: {str(e)}")
+            import traceback
+            traceback.print_exception(e)
+            return
+        self.progress_bar["value"] = 100
+        self.status_var.set("Done")
+        event['on_success'](result)
+
+    def cancel_job(self):
+        if self.control is not None:
+            self.status_var.set("Cancelling...")
+            self.control.cancel()
+
+    def quit(self):
+        self.cancel_job()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.master.quit()
+
     def run_steganography(self):
         hidden_file = self.hidden_file_var.get()
         if not hidden_file:
@@ -252,36 +351,35 @@ class GUI:
             messagebox.showerror("Error", "Please add at least one carrier file.")
             return
 
-        try:
-            carriers_data = [(f, int(round(self.sliders[f].get()))) for f in self.carrier_files]
-            self.runner.run(hidden_file, carriers_data)
-            messagebox.showinfo("Success", "Data hidden successfully in carrier files!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to hide data: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        carriers_data = [(f, int(round(self.sliders[f].get()))) for f in self.carrier_files]
+        password = self.password_var.get() or None
+        self._start_job(
+            lambda control: self.runner.run(hidden_file, carriers_data, password=password, control=control),
+            lambda result: messagebox.showinfo("Success", "Data hidden successfully in carrier files!"),
+            "Failed to hide data"
+        )
+
+    def _extraction_done(self, result):
+        if result:
+            messagebox.showinfo("Success", f"File extracted successfully to:\n{result}")
+        else:
+            messagebox.showerror("Error", "Failed to extract data. Please check the console for details.")
 
     def extract_data(self):
         """Handle the extraction of hidden data from carrier files."""
-        try:
-            # Let the user select the directory containing carrier files
-            input_dir = filedialog.askdirectory(
-                title="Select directory containing carrier files",
-                mustexist=True
-            )
-            
-            if not input_dir:  # User cancelled
-                return
-                
-            # Call the runner's extract method to handle the extraction
-            result = self.runner.extract(input_dir)
-            
-            if result:
-                messagebox.showinfo("Success", f"File extracted successfully to:\n{result}")
-            else:
-                messagebox.showerror("Error", "Failed to extract data. Please check the console for details.")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred during extraction: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        # Let the user select the directory containing carrier files
+        input_dir = filedialog.askdirectory(
+            title="Select directory containing carrier files",
+            mustexist=True
+        )
+
+        if not input_dir:  # User cancelled
+            return
+
+        # Run the extraction in the background
+        password = self.password_var.get() or None
+        self._start_job(
+            lambda control: self.runner.extract(input_dir, password=password, control=control),
+            self._extraction_done,
+            "An error occurred during extraction"
+        )
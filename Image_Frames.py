@@ -0,0 +1,199 @@
+import threading
+import numpy as np
+from PIL import Image, ImageSequence, GifImagePlugin
+from Scatter_Index import Scatter_Index
+from Pixel_Modes import Pixel_Modes
+
+
+class Image_Frames:
+    """Every frame (page) of an image as arrays the LSB engine can write to.
+
+    Multi-page TIFFs and animated GIFs/PNGs are decoded frame by frame with
+    ImageSequence, and save() writes all frames back with their durations.
+    Frames are kept fully composited, so each one is written whole, in its
+    own mode (see Pixel_Modes): every channel value takes a bit.
+
+    Palette images (GIF) get palette-safe embedding: the frames are mapped
+    onto one shared palette in which indices 2k and 2k+1 hold the same
+    colour, so writing a bit into an index LSB never changes what is shown.
+    That leaves room for 128 colours (127 plus a transparent index 255 if
+    any pixel is transparent); images with more are first reduced to that
+    many. Transparent pixels carry no data.
+    """
+
+    # Transparent pixels of palette frames
+    TRANSPARENT_INDEX = 255
+    # GIF frames only keep their palette indices when all of them share the
+    # global palette and Pillow is told not to convert them to RGB; the
+    # loading strategy is module-wide, so it is switched under a lock
+    _strategy_lock = threading.Lock()
+
+    def __init__(self, frames, infos, palette=None, transparency=None):
+        """
+        Args:
+            frames: One array per frame: (height, width) palette indices or
+                (height, width, channels) values (see Pixel_Modes)
+            infos: Pillow info dict per frame (duration, loop, compression...)
+            palette: Shared RGB palette (768 bytes) of palette frames
+            transparency: Index of transparent pixels in palette frames, if any
+        """
+        self.frames = frames
+        self.infos = infos
+        self.palette = palette
+        self.transparency = transparency
+
+    @classmethod
+    def load(cls, image, palette_safe=False):
+        """
+        Decode every frame of an image for embedding.
+
+        Args:
+            image: Opened Pillow image
+            palette_safe: Map the frames onto a paired palette (for formats
+                that can only store palette images)
+        """
+        infos = []
+        frames = []
+        for frame in ImageSequence.Iterator(image):
+            infos.append(dict(frame.info))
+            if frame.mode not in ('P', 'PA'):
+                # Counting TIFF pages leaves the palette of a later page set
+                frame.palette = None
+            if palette_safe:
+                frames.append(np.array(frame.convert('RGBA')))
+                continue
+            if Pixel_Modes.is_wide(frame):
+                print(f"Warning: Page {len(frames)} has 16-bit colour, reducing it to 8 bits")
+            frames.append(Pixel_Modes.to_array(frame))
+        if not palette_safe:
+            return cls(frames, infos)
+        return cls._paired(frames, infos)
+
+    @classmethod
+    def _paired(cls, rgba_frames, infos):
+        """Map RGBA frames onto a palette of identical index pairs."""
+        opaque = [frame[..., 3] > 0 for frame in rgba_frames]
+        transparency = cls.TRANSPARENT_INDEX if not all(mask.all() for mask in opaque) else None
+        limit = 127 if transparency is not None else 128
+        colours = np.concatenate([frame[mask][:, :3] for frame, mask in zip(rgba_frames, opaque)])
+
+        keys = (colours[:, 0].astype(np.uint32) << 16) | (colours[:, 1].astype(np.uint32) << 8) | colours[:, 2]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        if len(unique) <= limit:
+            table = np.stack([(unique >> 16) & 0xFF, (unique >> 8) & 0xFF, unique & 0xFF], axis=1).astype(np.uint8)
+        else:
+            print(f"Warning: Image has {len(unique)} colours, reducing to {limit} for palette-safe embedding")
+            strip = Image.fromarray(colours.reshape(1, -1, 3))
+            quantized = strip.quantize(colors=limit, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+            inverse = np.array(quantized).reshape(-1)
+            table = np.array(quantized.getpalette()[:limit * 3], dtype=np.uint8).reshape(-1, 3)
+
+        palette = np.zeros((256, 3), dtype=np.uint8)
+        palette[0:2 * len(table):2] = table
+        palette[1:2 * len(table):2] = table
+        frames = []
+        start = 0
+        for frame, mask in zip(rgba_frames, opaque):
+            indices = np.full(mask.shape, cls.TRANSPARENT_INDEX, dtype=np.uint8)
+            count = int(mask.sum())
+            indices[mask] = inverse[start:start + count].astype(np.uint8) * 2
+            start += count
+            frames.append(indices)
+        return cls(frames, infos, palette.tobytes(), transparency)
+
+    @classmethod
+    def load_indices(cls, image):
+        """
+        Decode every frame of a stego palette image without touching its indices.
+
+        Frames that Pillow cannot keep as indices (local palettes, so not
+        written by save()) come back as RGB.
+        """
+        with cls._strategy_lock:
+            strategy = GifImagePlugin.LOADING_STRATEGY
+            GifImagePlugin.LOADING_STRATEGY = GifImagePlugin.LoadingStrategy.RGB_AFTER_DIFFERENT_PALETTE_ONLY
+            try:
+                infos = []
+                frames = []
+                for frame in ImageSequence.Iterator(image):
+                    infos.append(dict(frame.info))
+                    frames.append(np.array(frame) if frame.mode == 'P' else Pixel_Modes.to_array(frame))
+            finally:
+                GifImagePlugin.LOADING_STRATEGY = strategy
+        transparency = infos[0].get('transparency') if frames[0].ndim == 2 else None
+        return cls(frames, infos, transparency=transparency)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def slots(self, index, scatter_key=None):
+        """
+        Where frame index takes payload bits.
+
+        Args:
+            index: Frame index
+            scatter_key: Key from Scatter_Index.key_for(), for a keyed order
+
+        Returns:
+            tuple: (flat writable view of the frame, number of values that
+                take bits, callable mapping a count n to the indices into
+                the view of the first n of them, or None to use the view
+                from the start)
+        """
+        frame = self.frames[index]
+        flat = frame.reshape(-1)
+        usable = None
+        if frame.ndim == 2 and self.transparency is not None:
+            # Palette indices: one bit per pixel, transparent pixels excluded
+            usable = np.flatnonzero(flat != self.transparency)
+            if len(usable) == len(flat):
+                usable = None
+
+        if usable is None:
+            if scatter_key is None:
+                return flat, len(flat), None
+            return flat, len(flat), lambda count: Scatter_Index.positions(frame.shape, scatter_key, 0, count)
+        if scatter_key is None:
+            return flat, len(usable), lambda count: usable[:count]
+        return flat, len(usable), lambda count: usable[Scatter_Index.positions(usable.shape, scatter_key, 0, count)]
+
+    def images(self):
+        """The frames as Pillow images."""
+        images = []
+        for frame in self.frames:
+            if frame.ndim == 2:
+                image = Image.fromarray(frame, 'P')
+                image.putpalette(self.palette)
+            else:
+                image = Pixel_Modes.to_image(frame)
+            images.append(image)
+        return images
+
+    def save(self, fp, image_format, **params):
+        """
+        Write all frames, losslessly, in image_format.
+
+        Args:
+            fp: Path or writable binary file object
+            image_format: Pillow format name, e.g. 'GIF' or 'TIFF'
+            **params: Extra save options (e.g. PNG compress_level)
+        """
+        images = self.images()
+        first = self.infos[0]
+        if len(images) > 1:
+            params.update(save_all=True, append_images=images[1:])
+            durations = [info.get('duration') for info in self.infos]
+            if all(duration is not None for duration in durations):
+                params['duration'] = durations
+            if 'loop' in first:
+                params['loop'] = first['loop']
+        if image_format == 'GIF':
+            params.update(palette=self.palette, optimize=False)
+            if self.transparency is not None:
+                # Frames are whole, so restore to the (transparent) background between them
+                params.update(transparency=self.transparency, disposal=2)
+            else:
+                params['disposal'] = 1
+        elif image_format == 'TIFF' and first.get('compression') not in (None, 'jpeg', 'tiff_jpeg'):
+            params['compression'] = first['compression']
+        images[0].save(fp, format=image_format, **params)
@@ -1,208 +1,544 @@
 import os
+import io
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, PngImagePlugin, JpegImagePlugin, GifImagePlugin, BmpImagePlugin, TiffImagePlugin, WebPImagePlugin
 from PIL.ExifTags import TAGS
+from Lsb_Engine import Lsb_Engine
+from Container_Splice import Container_Splice
+from Png_Rows import Png_Rows
+from Image_Frames import Image_Frames
+from Pixel_Modes import Pixel_Modes
+from Job_Control import Job_Control
+from Workspace import Workspace
+from Memory_File import Memory_File
+from Scatter_Index import Scatter_Index
 
 class Image_Hider:
-    def __init__(self, host_file, hidden_data):
+    # Pillow PNG save options per encoder profile (zlib effort; optimize adds
+    # extra compression passes)
+    ENCODER_PROFILES = {
+        'fast': {'compress_level': 1, 'optimize': False},
+        'balanced': {'compress_level': 6, 'optimize': False},
+        'smallest': {'compress_level': 9, 'optimize': True},
+    }
+    # 'lsb' hides in pixel LSBs; 'container' splices the data into the file's
+    # chunk list (see Container_Splice). Lossy formats always use 'container'.
+    EMBEDDINGS = ('lsb', 'container')
+    # LSB embedding and extraction run on row bands (and the frames of
+    # multi-frame images) in parallel, NumPy releases the GIL; payloads
+    # spanning fewer than MIN_BAND_VALUES channel values per band are
+    # handled in one piece
+    BAND_THREADS = os.cpu_count() or 1
+    MIN_BAND_VALUES = 1 << 20
+    # Formats whose images can hold several frames or pages (animated GIF
+    # and PNG, multi-page TIFF); the data then spans all of them
+    MULTI_FRAME_FORMATS = ('gif', 'png', 'tif', 'tiff')
+    # Formats that only store palette images: the data goes in palette
+    # indices instead (see Image_Frames), even for a single frame
+    PALETTE_FORMATS = ('gif',)
+
+    def __init__(self, host_file, hidden_data, control=None, workspace=None, encoder_profile='balanced',
+                 embedding='lsb', output=None, decode_cache=None, streaming=False, scatter_key=None):
+        if encoder_profile not in self.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {encoder_profile}")
+        if embedding not in self.EMBEDDINGS:
+            raise ValueError(f"Unknown image embedding: {embedding}")
         self.host_file = host_file
         self.hidden_data = hidden_data
-        self.output_path = "output_files/"
+        self.control = control or Job_Control()
+        self.encoder_profile = encoder_profile
+        self.workspace = workspace or Workspace()
+        self._owns_workspace = workspace is None
+        self.output_path = self.workspace.output_path
+        # Writable binary file object; when set, hide_data() writes the stego
+        # image there instead of committing it to the output directory
+        self.output = output
+        # Optional Decode_Cache shared across jobs: repeated jobs on the same
+        # carrier skip decoding the image
+        self.decode_cache = decode_cache
+        # Low-memory path (chosen by Memory_Governor): only the rows that hold
+        # the data are copied out of the image, and extraction reads the top
+        # rows only (see peek_data())
+        self.streaming = streaming and scatter_key is None
+        # Key from Scatter_Index.key_for(): the data is spread over the whole
+        # image in a keyed order instead of filling the top rows
+        self.scatter_key = scatter_key
         self.working_image = None
         self.is_lossy = self.is_lossy_format()
+        self.use_container = self.is_lossy or embedding == 'container'
+        if self.use_container and not Container_Splice.supports(self.host_file.file_extension):
+            print(f"Warning: Container embedding is not supported for .{self.host_file.file_extension}, using LSB")
+            self.use_container = False
         self.load_image()
+        # 16-bit colour images are decoded and encoded with OpenCV (see
+        # Pixel_Modes), which has no streaming path either; the pixels are
+        # kept in wide_pixels once embedded
+        self.wide = not self.use_container and Pixel_Modes.is_wide(self.working_image)
+        self.wide_pixels = None
+        # Multi-frame and palette carriers go through Image_Frames, which has
+        # no streaming path; frames are decoded on first use
+        extension = self.host_file.file_extension.lower()
+        self.use_frames = not self.use_container and (
+            extension in self.PALETTE_FORMATS or
+            (extension in self.MULTI_FRAME_FORMATS and getattr(self.working_image, 'n_frames', 1) > 1))
+        if self.use_frames:
+            self.wide = False
+        if self.use_frames or self.wide:
+            self.streaming = False
+        self.frames = None
+
+    @classmethod
+    def hide_bytes(cls, carrier, hidden_data, extension, output=None, **options):
+        """
+        Hide data in an image held in memory, without touching the filesystem.
+
+        Args:
+            carrier: Image as bytes, memoryview or a readable binary file object
+            hidden_data: Data to hide
+            extension: Image format, e.g. 'png'
+            output: Optional writable binary file object for the stego image
+            **options: Passed to the constructor (control, encoder_profile, embedding...)
+
+        Returns:
+            bytes: The stego image, or output itself if one was given
+        """
+        sink = output if output is not None else io.BytesIO()
+        cls(Memory_File(carrier, extension), hidden_data, output=sink, **options).hide_data()
+        return output if output is not None else sink.getvalue()
+
+    @classmethod
+    def extract_bytes(cls, carrier, extension, **options):
+        """Extract hidden data from an image held in memory (see hide_bytes())."""
+        return cls(Memory_File(carrier, extension), b'', **options).extract_data()
 
     def is_lossy_format(self):
         """Check if the image format is lossy."""
         lossy_extensions = {'jpg', 'jpeg', 'webp'}
         return self.host_file.file_extension.lower() in lossy_extensions
 
-    def convert_data_to_binary(self, data=None):
-        """Convert text to list of binary strings, 8 bits per character.
-        
-        Args:
-            data: The data to convert. If None, uses self.hidden_data
-            
-        Returns:
-            list: List of 8-bit binary strings
-        """
-        if data is None:
-            data = self.hidden_data
-        if isinstance(data, str):
-            return [format(ord(char), '08b') for char in data]
-        elif isinstance(data, bytes):
-            return [format(byte, '08b') for byte in data]
-        else:
-            raise ValueError("Data must be string or bytes")
+    def _data_bytes(self):
+        """Return the hidden data as bytes."""
+        if isinstance(self.hidden_data, str):
+            return self.hidden_data.encode('utf-8')
+        return bytes(self.hidden_data)
+
+    def _open_carrier(self):
+        """Binary file object over the carrier, in memory or on disk."""
+        if self.host_file.file_path is None:
+            return self.host_file.open()
+        return open(self.host_file.file_path, 'rb')
 
     def load_image(self):
-        os.makedirs(self.output_path, exist_ok=True)
-        self.working_image = Image.open(self.host_file.file_path)
+        source = self.host_file.file_path or self.host_file.open()
+        self.working_image = Image.open(source)
         return self.working_image
 
-    def output_image(self):
-        output_file_path = os.path.join(self.output_path, self.host_file.file_name)
-        if self.is_lossy:
-            # For lossy formats, ensure we save with the same quality and other parameters
-            self.working_image.save(output_file_path, quality=95, optimize=True, 
-                                 exif=self.working_image.info.get('exif', b''))
-        else:
-            # For lossless formats, preserve all metadata
-            self.working_image.save(output_file_path, optimize=True)
-        return output_file_path
-
-    def modify_pixel(self, pix):
-        """Modify pixel data using LSB steganography for lossless formats."""
-        # Add end marker to the data
-        data_with_marker = self.hidden_data + '\x00'  # Null byte as end marker
-        datalist = self.convert_data_to_binary(data_with_marker)
-        lendata = len(datalist)
-        imdata = iter(pix)
-        
-        # Process pixels in chunks of 3 (RGB)
-        for i in range(0, len(datalist), 3):
-            # Get next 3 bytes (24 bits) or remaining data
-            chunk = datalist[i:i+3]
-            
-            # Get next 3 pixels (9 values, but we'll use 8 bits per 3 pixels)
+    def capacity(self):
+        """Number of payload bytes this carrier can hold, or None if there is no fixed limit."""
+        if self.use_container:
+            return None
+        if self.use_frames:
+            frames = self._load_frames()
+            return Lsb_Engine.capacity(sum(self._slot_sizes(self._frame_slots(frames))))
+        width, height = self.working_image.size
+        return Lsb_Engine.capacity(width * height * Pixel_Modes.channels(self.working_image))
+
+    def memory_estimate(self):
+        """
+        Estimated peak memory of hiding in (or extracting from) this carrier.
+
+        Returns:
+            tuple: (in-memory path, streaming path) in bytes
+        """
+        data_size = len(self._data_bytes())
+        if self.use_container:
+            # The image is copied through in blocks either way
+            return 2 * data_size, 2 * data_size
+        width, height = self.working_image.size
+        values = width * height * Pixel_Modes.channels(self.working_image)
+        value_size = 2 if self.wide or self.working_image.mode.startswith('I;16') else 1
+        decoded = values * value_size
+        if self.use_frames:
+            # Every decoded frame (RGBA while palette frames are mapped), its
+            # array and the image rebuilt from it, plus the positions when scattering
+            in_memory = getattr(self.working_image, 'n_frames', 1) * width * height * 4 * 3
+            if self.scatter_key is not None:
+                in_memory += 16 * (data_size + Lsb_Engine.LENGTH.size) * 8
+            return in_memory, in_memory
+        # The carrier file is read into memory for OpenCV
+        in_memory = 3 * decoded + (self.host_file.file_size if self.wide else 0)
+        if self.scatter_key is not None:
+            # Plus the positions of the payload bits (8 bytes each, twice while
+            # generated); no streaming path
+            in_memory += 16 * (data_size + Lsb_Engine.LENGTH.size) * 8
+        if self.scatter_key is not None or self.wide:
+            return in_memory, in_memory
+        band = self._band_rows(data_size) * width * Pixel_Modes.channels(self.working_image) * value_size
+        # Decoded image, its numpy copy and the image rebuilt from it; when
+        # streaming, the decoded image and the band
+        return in_memory, decoded + 2 * band
+
+    def _band_rows(self, data_size):
+        """Number of top rows whose channel LSBs hold data_size bytes of payload."""
+        width, height = self.working_image.size
+        bits = (Lsb_Engine.LENGTH.size + data_size) * 8
+        return max(1, min(height, -(-bits // (width * Pixel_Modes.channels(self.working_image)))))
+
+    def _embed_band(self):
+        """Embed the data in the top rows of the image, in place, without a full numpy copy."""
+        mode = Pixel_Modes.native_mode(self.working_image)
+        if self.working_image.mode != mode:
+            self.working_image = self.working_image.convert(mode)
+        width, _ = self.working_image.size
+        rows = self._band_rows(len(self._data_bytes()))
+        with self.control.span('decode', streaming=True) as span:
+            band = Pixel_Modes.to_array(self.working_image.crop((0, 0, width, rows)))
+            span.set(bytes=band.nbytes, rows=rows)
+        self.control.check()
+        with self.control.span('embed', bytes=len(self._data_bytes())):
             try:
-                pixels = []
-                for _ in range(3):  # Get 3 pixels (9 values)
-                    pixels.extend(next(imdata)[:3])
-                
-                # Modify LSBs of first 8 values
-                for j in range(min(8, len(chunk) * 8)):
-                    byte_idx = j // 8
-                    bit_idx = 7 - (j % 8)  # Most significant bit first
-                    
-                    if byte_idx < len(chunk) and len(chunk[byte_idx]) > 0:
-                        bit = chunk[byte_idx][bit_idx]
-                        # Set LSB to match data bit
-                        if bit == '1':
-                            pixels[j] |= 1
-                        else:
-                            pixels[j] &= ~1
-                
-                # Ensure last bit of last pixel in chunk indicates if more data follows
-                if i + 3 >= len(datalist):
-                    pixels[-1] |= 1  # End of message
-                else:
-                    pixels[-1] &= ~1  # More data follows
-                
-                # Yield the modified pixels
-                for k in range(0, 9, 3):
-                    yield tuple(pixels[k:k+3])
-                    
-            except StopIteration:
-                # Handle case where we run out of pixels
+                self.modify_pixels(band)
+            except ValueError:
+                raise ValueError("Image too small to hide the data")
+            self.working_image.paste(Pixel_Modes.to_image(band), (0, 0))
+
+    def _save_image(self, target):
+        """Encode the working image (or all frames) to a path or file object."""
+        settings = self.ENCODER_PROFILES[self.encoder_profile]
+        # Pillow cannot guess the format from a file object
+        image_format = Image.registered_extensions()['.' + self.host_file.file_extension.lower()]
+        if self.wide_pixels is not None:
+            import cv2
+            params = [cv2.IMWRITE_PNG_COMPRESSION, settings['compress_level']] if image_format == 'PNG' else []
+            ok, encoded = cv2.imencode('.' + self.host_file.file_extension.lower(), self.wide_pixels, params)
+            if not ok:
+                raise RuntimeError(f"Cannot encode 16-bit {image_format} image")
+            if isinstance(target, str):
+                encoded.tofile(target)
+            else:
+                target.write(encoded.tobytes())
+        elif self.frames is not None:
+            self.frames.save(target, image_format, **(settings if image_format == 'PNG' else {}))
+        else:
+            self.working_image.save(target, format=image_format,
+                                    compress_level=settings['compress_level'], optimize=settings['optimize'])
+
+    def output_image(self):
+        if self.output is not None:
+            with self.control.span('encode', profile=self.encoder_profile):
+                self._save_image(self.output)
+            return self.output
+
+        # Save to a scratch file first so the output appears atomically
+        temp_path = self.workspace.temp_path('image', os.path.splitext(self.host_file.file_name)[1])
+        try:
+            with self.control.span('encode', profile=self.encoder_profile) as span:
+                self._save_image(temp_path)
+                span.set(bytes=os.path.getsize(temp_path))
+            self.control.check()
+            with self.control.span('write', bytes=os.path.getsize(temp_path)):
+                return self.workspace.commit(temp_path, self.host_file.file_name)
+        finally:
+            if self._owns_workspace:
+                self.workspace.cleanup()
+
+    def _pixel_array(self):
+        """Return the image as a (height, width, channels) array (see Pixel_Modes).
+
+        With a decode cache the array may be a read-only memory map.
+        """
+        if self.decode_cache is None or self.host_file.file_path is None:
+            return self._decode_pixels()
+        cached = self.decode_cache.get(self.host_file.file_path, 'pixels')
+        if cached is None:
+            cached = self.decode_cache.put(self.host_file.file_path, 'pixels', self._decode_pixels())
+        return cached[0]
+
+    def _decode_pixels(self):
+        if not self.wide:
+            return Pixel_Modes.to_array(self.working_image)
+        import cv2
+        with self._open_carrier() as src:
+            pixels = cv2.imdecode(np.frombuffer(src.read(), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if pixels is None:
+            raise ValueError(f"Cannot decode 16-bit image: {self.host_file.file_name}")
+        return pixels.reshape(pixels.shape[:2] + (-1,))
+
+    def _bands(self, first, last, align):
+        """Split the value range [first, last) into bands whose inner boundaries are multiples of align."""
+        count = max(1, min(self.BAND_THREADS, (last - first) // self.MIN_BAND_VALUES))
+        step = -(-(last - first) // count)
+        step = max(align, -(-step // align) * align)
+        return [(start, min(start + step, last)) for start in range(first, last, step)]
+
+    def _map_parallel(self, func, items):
+        """Call func on every item (band or frame) on up to BAND_THREADS threads; results in order."""
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.BAND_THREADS, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def _scatter_index(self, pixels, first, last):
+        """Flat indices into a pixel array of the scattered values first to last."""
+        return Scatter_Index.positions(pixels.shape, self.scatter_key, first, last)
+
+    def modify_pixels(self, pixels):
+        """Embed the hidden data in the LSBs of every channel of a pixel array.
+
+        Bands of the flattened array are embedded in parallel, each with its
+        own slice of the payload bits. With a scatter key the bits go to the
+        keyed positions instead, split into bands the same way.
+
+        Args:
+            pixels: C-contiguous array of shape (height, width, channels)
+                (see Pixel_Modes), modified in place
+        """
+        framed = Lsb_Engine.frame(self._data_bytes())
+        if len(framed) * 8 > pixels.size:
+            raise ValueError(f"Carrier too small to hide the data. Needed: {len(framed)} bytes, "
+                             f"Available: {pixels.size // 8} bytes")
+        flat = pixels.reshape(-1)
+
+        def embed_band(band):
+            first, last = band
+            if self.scatter_key is not None:
+                # Positions are distinct, so bands never write the same value
+                Lsb_Engine.embed_at(flat, framed, first, self._scatter_index(pixels, first, last))
+            else:
+                Lsb_Engine.embed_at(flat[first:last], framed, first)
+
+        self._map_parallel(embed_band, self._bands(0, len(framed) * 8, 8))
+
+    def _extract_pixels(self, pixels):
+        """Extract framed data from the channel LSBs of a pixel array, reading bands in parallel."""
+        flat = np.ascontiguousarray(pixels).reshape(-1)
+        value_count = len(flat)
+        header_values = Lsb_Engine.LENGTH.size * 8
+        if value_count < header_values:
+            return b''
+
+        def read_band(band):
+            first, last = band
+            if self.scatter_key is not None:
+                values = flat[self._scatter_index(pixels, first, last)]
+            else:
+                values = flat[first:last]
+            return Lsb_Engine.read_bytes(values, 0, (last - first) // 8)
+
+        (length,) = Lsb_Engine.LENGTH.unpack(read_band((0, header_values)))
+        if length > Lsb_Engine.capacity(value_count):
+            return b''
+        # Bands start on byte boundaries so that each one yields whole bytes
+        bands = self._bands(header_values, header_values + length * 8, 8)
+        return b''.join(self._map_parallel(read_band, bands))
+
+    def _load_frames(self):
+        """Decode all frames for embedding (once per hider)."""
+        if self.frames is None:
+            palette_safe = self.host_file.file_extension.lower() in self.PALETTE_FORMATS
+            self.frames = Image_Frames.load(self.working_image, palette_safe=palette_safe)
+        return self.frames
+
+    def _frame_slots(self, frames):
+        """(flat frame, size, locate) per frame, see Image_Frames.slots()."""
+        return self._map_parallel(lambda i: frames.slots(i, self.scatter_key), list(range(len(frames))))
+
+    @staticmethod
+    def _slot_sizes(slots):
+        return [size for _, size, _ in slots]
+
+    def _hide_frames(self):
+        """Embed the data across all frames: frame 0 takes the first bits, and so on.
+
+        Frames are embedded in parallel, each with its own bit offset into the payload.
+        """
+        with self.control.span('decode') as span:
+            frames = self._load_frames()
+            span.set(bytes=sum(frame.nbytes for frame in frames.frames), frames=len(frames))
+        self.control.check()
+        framed = Lsb_Engine.frame(self._data_bytes())
+        with self.control.span('embed', bytes=len(self._data_bytes()), frames=len(frames)):
+            slots = self._frame_slots(frames)
+            sizes = self._slot_sizes(slots)
+            if sum(sizes) < len(framed) * 8:
                 raise ValueError("Image too small to hide the data")
-            
-    def hide_in_metadata(self):
-        """Hide data in image metadata for lossy formats."""
+            offsets = np.cumsum([0] + sizes[:-1])
+            used = [i for i in range(len(frames)) if offsets[i] < len(framed) * 8]
+
+            def embed_frame(i):
+                flat, size, locate = slots[i]
+                count = min(size, len(framed) * 8 - int(offsets[i]))
+                Lsb_Engine.embed_at(flat, framed, int(offsets[i]), None if locate is None else locate(count))
+
+            self._map_parallel(embed_frame, used)
+        self.control.check()
+        return self.output_image()
+
+    def _extract_frames(self):
+        """Extract data embedded by _hide_frames(), gathering only the values it occupies."""
+        with self.control.span('decode') as span:
+            if self.host_file.file_extension.lower() in self.PALETTE_FORMATS:
+                frames = Image_Frames.load_indices(self.working_image)
+            else:
+                frames = Image_Frames.load(self.working_image)
+            span.set(bytes=sum(frame.nbytes for frame in frames.frames), frames=len(frames))
+        with self.control.span('extract', frames=len(frames)) as span:
+            slots = self._frame_slots(frames)
+            sizes = self._slot_sizes(slots)
+
+            def read_values(count):
+                counts = []
+                for size in sizes:
+                    counts.append(min(size, count))
+                    count -= counts[-1]
+                    if not count:
+                        break
+
+                def gather(i):
+                    flat, _, locate = slots[i]
+                    return flat[:counts[i]] if locate is None else flat[locate(counts[i])]
+
+                return np.concatenate(self._map_parallel(gather, list(range(len(counts)))))
+
+            data = Lsb_Engine.extract_prefix(read_values, sum(sizes))
+            span.set(bytes=len(data))
+        return data
+
+    def hide_in_container(self):
+        """Splice the data into the file's chunk/segment list, copying the image data through.
+
+        Returns:
+            str: The output path (or the output stream, if one was given)
+        """
+        if self.output is not None:
+            with self.control.span('embed', bytes=len(self._data_bytes()), embedding='container'):
+                with self._open_carrier() as src:
+                    Container_Splice.hide(src, self.output, self._data_bytes(), self.host_file.file_extension)
+            return self.output
+
+        temp_path = self.workspace.temp_path('image', os.path.splitext(self.host_file.file_name)[1])
         try:
-            # Create a copy of the existing metadata
-            metadata = {}
-            if hasattr(self.working_image, 'info'):
-                metadata = self.working_image.info.copy()
-            
-            # Use a custom tag to store our hidden data
-            metadata['hidden_data'] = self.hidden_data
-            
-            # For JPEG, we can also use EXIF data
-            if self.host_file.file_extension.lower() in ['jpg', 'jpeg']:
-                exif_data = self.working_image.info.get('exif', b'')
-                if exif_data:
-                    # If there's existing EXIF data, keep it
-                    metadata['exif'] = exif_data
-            
-            # Update the image info
-            self.working_image.info = metadata
-            return True
-            
-        except Exception as e:
-            print(f"Error hiding data in metadata: {str(e)}")
-            return False
+            with self.control.span('embed', bytes=len(self._data_bytes()), embedding='container'):
+                with self._open_carrier() as src, open(temp_path, 'wb') as dst:
+                    Container_Splice.hide(src, dst, self._data_bytes(), self.host_file.file_extension)
+            self.control.check()
+            with self.control.span('write', bytes=os.path.getsize(temp_path)):
+                return self.workspace.commit(temp_path, self.host_file.file_name)
+        finally:
+            if self._owns_workspace:
+                self.workspace.cleanup()
 
     def hide_data(self):
-        if self.is_lossy:
-            # For lossy formats, use metadata hiding
-            if not self.hide_in_metadata():
-                raise Exception("Failed to hide data in image metadata")
-        else:
-            # For lossless formats, use LSB steganography
-            w, h = self.working_image.size
-            x, y = 0, 0
-
-            for pixel in self.modify_pixel(self.working_image.getdata()):
-                self.working_image.putpixel((x, y), pixel)
-                x += 1
-                if x >= w:
-                    x = 0
-                    y += 1
-                if y >= h:
-                    break
+        if self.use_container:
+            # No decode: lossy formats would lose LSBs on re-encode anyway
+            return self.hide_in_container()
+
+        # For lossless formats, use LSB steganography
+        if self.use_frames:
+            return self._hide_frames()
+        if self.streaming:
+            self._embed_band()
+            self.control.check()
+            return self.output_image()
+
+        with self.control.span('decode') as span:
+            pixels = self._pixel_array()
+            if not pixels.flags.writeable:
+                pixels = np.array(pixels)
+            span.set(bytes=pixels.nbytes)
+        self.control.check()
+        with self.control.span('embed', bytes=len(self._data_bytes())):
+            try:
+                self.modify_pixels(pixels)
+            except ValueError:
+                raise ValueError("Image too small to hide the data")
+            if self.wide:
+                self.wide_pixels = pixels
+            else:
+                info = self.working_image.info
+                self.working_image = Pixel_Modes.to_image(pixels)
+                self.working_image.info = info
 
         # Save the modified image
+        self.control.check()
         return self.output_image()
 
+    def _extract_container(self):
+        """Return the payload spliced into the container, or None if there is none."""
+        if not Container_Splice.supports(self.host_file.file_extension):
+            return None
+        # This reads the container headers only
+        try:
+            with self.control.span('extract', embedding='container') as span:
+                with self._open_carrier() as src:
+                    data = Container_Splice.extract(src, self.host_file.file_extension)
+                span.set(bytes=len(data) if data is not None else 0)
+            return data
+        except ValueError as e:
+            print(f"Error reading hidden container chunk: {str(e)}")
+            return None
+
+    def _extract_lsb(self):
+        if self.use_frames:
+            return self._extract_frames()
+        with self.control.span('decode') as span:
+            pixels = self._pixel_array()
+            span.set(bytes=pixels.nbytes)
+        with self.control.span('extract') as span:
+            data = self._extract_pixels(pixels)
+            span.set(bytes=len(data))
+        return data
+
     def extract_data(self):
         """Extract hidden data from the image.
-        
+
         Returns:
-            str: The extracted data, or empty string if no data found.
+            bytes: The extracted data, or empty bytes if no data found.
         """
-        # First try to extract from metadata (for lossy formats)
+        if self.streaming:
+            return self.peek_data()
+
+        # First look for a spliced chunk
+        data = self._extract_container()
+        if data is not None:
+            return data
         if self.is_lossy:
-            try:
-                # Check for our custom metadata
-                if hasattr(self.working_image, 'info') and 'hidden_data' in self.working_image.info:
-                    return self.working_image.info['hidden_data']
-                
-                # For JPEG, also check EXIF data
-                if self.host_file.file_extension.lower() in ['jpg', 'jpeg'] and 'exif' in self.working_image.info:
-                    # In a real implementation, you would parse the EXIF data here
-                    # This is a simplified version
-                    exif_data = self.working_image.info['exif']
-                    # Look for hidden data in EXIF (this is a placeholder)
-                    # You would need to implement proper EXIF parsing
-                    pass
-            except Exception as e:
-                print(f"Error extracting from metadata: {str(e)}")
-        
-        # If not found in metadata or not a lossy format, try LSB extraction
-        imgdata = iter(self.working_image.getdata())
-        bits = ''
-        data = bytearray()
-        
-        try:
-            while True:
-                # Read 3 pixels (9 values)
-                pixels = []
-                for _ in range(3):
-                    pixels.extend(next(imgdata)[:3])
-                
-                # Extract LSBs from first 8 values (1 bit per value)
-                for j in range(8):
-                    bits += '1' if (pixels[j] & 1) else '0'
-                    
-                    # If we have a complete byte, process it
-                    if len(bits) >= 8:
-                        byte = int(bits[:8], 2)
-                        data.append(byte)
-                        bits = bits[8:]
-                        
-                        # Check for null terminator
-                        if byte == 0:
-                            # Remove the null terminator before returning
-                            return data[:-1].decode('utf-8', errors='replace')
-                
-                # Check if this is the last chunk
-                if pixels[-1] & 1:
-                    break
-                    
-        except StopIteration:
-            pass  # End of image data
-            
-        # If we get here, we didn't find a null terminator
-        if data:
-            return data.decode('utf-8', errors='replace')
-        return ""
+            return b''
+
+        # Not found in the container, try LSB extraction
+        return self._extract_lsb()
+
+    def peek_data(self):
+        """Extract hidden data, decoding only the part of the image that holds it.
+
+        Container payloads come from the chunk headers and PNG pixel payloads
+        from the top rows only (see Png_Rows); other images, including
+        multi-frame ones, and scattered payloads are fully decoded as in
+        extract_data().
+
+        Returns:
+            bytes: The extracted data, or empty bytes if no data found.
+        """
+        data = self._extract_container()
+        if data is not None:
+            return data
+        if self.is_lossy:
+            return b''
+        if self.host_file.file_extension.lower() != 'png' or self.scatter_key is not None or self.use_frames:
+            return self._extract_lsb()
+
+        with self._open_carrier() as src:
+            info = Png_Rows.header(src)
+            if not Png_Rows.readable(info):
+                return self._extract_lsb()
+            row_values = info['width'] * Png_Rows.CHANNELS[info['color_type']]
+
+            def read_values(count):
+                src.seek(0)
+                return Png_Rows.read(src, -(-count // row_values)).reshape(-1)
+
+            with self.control.span('extract', partial=True) as span:
+                data = Lsb_Engine.extract_prefix(read_values, row_values * info['height'])
+                span.set(bytes=len(data))
+        return data
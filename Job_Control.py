@@ -0,0 +1,130 @@
+import threading
+import subprocess
+from Tracer import NULL_SPAN
+
+
+class Job_Cancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class Job_Control:
+    """Progress reporting and cancellation shared by Runner and the hiders.
+
+    A progress callback receives one dict per event:
+        {'stage': str, 'fraction': float | None, 'carrier': str | None,
+         'carrier_index': int, 'carrier_total': int, ...details}
+
+    The callback is invoked on the thread doing the work, so GUI callers
+    should hand events over to their own thread (e.g. through a queue).
+
+    If a Tracer is given, every stage opened with span() is also timed.
+    """
+
+    def __init__(self, progress=None, tracer=None):
+        """
+        Args:
+            progress: Optional callable receiving progress event dicts
+            tracer: Optional Tracer recording a timing span per stage
+        """
+        self.progress = progress
+        self.tracer = tracer
+        self.carrier = None
+        self.carrier_index = 0
+        self.carrier_total = 0
+        self._cancelled = threading.Event()
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def for_carrier(self, index, total, carrier):
+        """Return a control for one carrier that shares cancellation and the callback."""
+        child = Job_Control.__new__(Job_Control)
+        child.__dict__.update(self.__dict__)
+        child.carrier = carrier
+        child.carrier_index = index
+        child.carrier_total = total
+        return child
+
+    def report(self, stage, fraction=None, **details):
+        """Send a progress event for the current carrier."""
+        if self.progress is None:
+            return
+        event = {
+            'stage': stage,
+            'fraction': fraction,
+            'carrier': self.carrier,
+            'carrier_index': self.carrier_index,
+            'carrier_total': self.carrier_total,
+        }
+        event.update(details)
+        self.progress(event)
+
+    def trace(self, stage, **attrs):
+        """Time a stage without sending a progress event.
+
+        Returns:
+            A context manager whose set(**attrs) adds attributes (e.g. bytes)
+        """
+        if self.tracer is None:
+            return NULL_SPAN
+        return self.tracer.span(stage, carrier=self.carrier, carrier_index=self.carrier_index, **attrs)
+
+    def span(self, stage, **attrs):
+        """Report a stage as progress and time it (see trace())."""
+        self.report(stage)
+        return self.trace(stage, **attrs)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Request cancellation and kill any subprocess the job is waiting on."""
+        self._cancelled.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def check(self):
+        """Raise Job_Cancelled if the job has been cancelled."""
+        if self._cancelled.is_set():
+            raise Job_Cancelled("Job was cancelled")
+
+    def run_subprocess(self, command, check=True, input=None):
+        """
+        Run a command so that cancel() can kill it.
+
+        Args:
+            command: Program and arguments
+            check: Raise if the command exits with a non-zero status
+            input: Optional bytes fed to the command's stdin
+
+        Returns:
+            subprocess.CompletedProcess: With captured stdout and stderr
+
+        Raises:
+            Job_Cancelled: If the job was cancelled before or while running
+            subprocess.CalledProcessError: If check is True and the command fails
+        """
+        self.check()
+        with self.trace('subprocess', command=list(command)) as span:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE if input is not None else None,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with self._lock:
+                self._processes.add(process)
+            try:
+                # Close the race where cancel() ran before the process was registered
+                if self._cancelled.is_set():
+                    process.kill()
+                stdout, stderr = process.communicate(input)
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+            span.set(returncode=process.returncode)
+        self.check()
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
@@ -0,0 +1,183 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+
+
+class Job_Journal:
+    """Checkpoint file that lets an interrupted hide job be resumed.
+
+    Lives at root/<name>.json next to a root/<name>/ directory of
+    checkpoints. The journal records the job's plan (hidden file, carriers,
+    settings), the chunk job id, the output path and SHA-256 of every
+    finished carrier, and the stage each unfinished carrier last reached.
+    The serialized chunks are kept in the checkpoint directory so a resumed
+    job embeds exactly the same bytes (encrypted chunks included), and
+    hiders may keep finished intermediate files there (see Video_Hider's
+    checkpoint_dir).
+
+    Every update is written to a temp file and renamed over the journal, so
+    a crash at any point leaves the previous consistent state.
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, root, name):
+        """
+        Args:
+            root: Directory holding journals
+            name: Job name chosen by the caller; reusing it resumes the job
+        """
+        if not name or os.path.basename(name) != name or name.startswith('.'):
+            raise ValueError(f"Invalid job name: {name!r}")
+        self.root = root
+        self.name = name
+        self.path = os.path.join(root, name + '.json')
+        self.checkpoint_dir = os.path.join(root, name)
+        self.state = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def file_hash(cls, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(cls.BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def open(self, plan):
+        """
+        Load the journal, or start a new one for plan.
+
+        Args:
+            plan: JSON-serializable description of the job; a resumed job
+                must have the same plan
+
+        Returns:
+            bool: True if an unfinished or finished earlier run was found
+
+        Raises:
+            ValueError: If a journal with this name exists for a different plan
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        if state is not None:
+            if state['plan'] != plan:
+                raise ValueError(f"Job {self.name} was started with different files or settings")
+            self.state = state
+            return True
+        self.state = {'plan': plan, 'job_id': os.urandom(16).hex(), 'carriers': {}, 'done': False}
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self._save()
+        return False
+
+    @property
+    def job_id(self):
+        """Chunk job id (bytes) shared by every run of this job."""
+        return bytes.fromhex(self.state['job_id'])
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        staging = os.path.join(self.root, f".{self.name}.{uuid.uuid4().hex}.part")
+        with open(staging, 'w') as f:
+            json.dump(self.state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, self.path)
+
+    def _carrier(self, index):
+        return self.state['carriers'].setdefault(str(index), {})
+
+    def load_chunks(self):
+        """Return the chunks stored by an earlier run, or None if there are none (or any is missing)."""
+        count = self.state.get('chunk_count')
+        if count is None:
+            return None
+        chunks = []
+        for i in range(count):
+            try:
+                with open(os.path.join(self.checkpoint_dir, f"chunk-{i}.bin"), 'rb') as f:
+                    chunks.append(f.read())
+            except FileNotFoundError:
+                return None
+        return chunks
+
+    def store_chunks(self, chunks):
+        """Keep the serialized chunks so that a resumed run embeds the same bytes."""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        for i, chunk in enumerate(chunks):
+            path = os.path.join(self.checkpoint_dir, f"chunk-{i}.bin")
+            with open(path + '.part', 'wb') as f:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.part', path)
+        with self._lock:
+            self.state['chunk_count'] = len(chunks)
+            self._save()
+
+    def carrier_dir(self, index):
+        """Checkpoint directory for one carrier's intermediate files."""
+        path = os.path.join(self.checkpoint_dir, f"carrier-{index}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def completed(self, index):
+        """
+        Output of a carrier finished by an earlier run.
+
+        Returns:
+            str | None: The output path, if it still exists with the recorded hash
+        """
+        entry = self.state['carriers'].get(str(index), {})
+        output = entry.get('output')
+        if output is None or not os.path.exists(output):
+            return None
+        if self.file_hash(output) != entry.get('sha256'):
+            print(f"Warning: {output} changed since it was written, embedding it again")
+            return None
+        return output
+
+    def record_stage(self, index, stage):
+        """Note the stage a carrier has reached."""
+        with self._lock:
+            entry = self._carrier(index)
+            if entry.get('stage') == stage:
+                return
+            entry['stage'] = stage
+            self._save()
+
+    def record_output(self, index, output_path):
+        """Mark a carrier finished and drop its intermediate files."""
+        sha256 = self.file_hash(output_path)
+        with self._lock:
+            entry = self._carrier(index)
+            entry.update(stage='done', output=output_path, sha256=sha256)
+            self._save()
+        shutil.rmtree(os.path.join(self.checkpoint_dir, f"carrier-{index}"), ignore_errors=True)
+
+    def finish(self):
+        """Mark the job done and remove its checkpoints; the journal itself is kept."""
+        with self._lock:
+            self.state['done'] = True
+            self._save()
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def recorder(self, index, progress=None):
+        """
+        Progress callback that records each carrier stage, then forwards the event.
+
+        Args:
+            index: Carrier index
+            progress: Callback to forward events to, if any
+        """
+        def record(event):
+            self.record_stage(index, event['stage'])
+            if progress is not None:
+                progress(event)
+        return record
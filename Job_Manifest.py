@@ -0,0 +1,166 @@
+import os
+import hmac
+import json
+import uuid
+import hashlib
+from Job_Journal import Job_Journal
+
+
+class Job_Manifest:
+    """Record of how a hidden file was split over its carriers.
+
+    Written by Runner.run() when it is given a manifest path. For every
+    carrier it keeps the slice of the hidden file it holds (offset and
+    length), a digest of that slice and the output file with its SHA-256.
+    Hiding an updated version of the file with the same manifest keeps the
+    earlier slice boundaries (the last carrier takes whatever follows), so
+    only carriers whose slice changed are embedded again; for a file that
+    was only appended to, that is the last carrier.
+
+    Slice digests of encrypted jobs are HMACs under the job key, so the
+    manifest does not reveal anything about the plaintext. The key salt is
+    kept in the manifest so every update derives the same key.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Manifest file (created on the first run)
+        """
+        self.path = path
+        self.state = None
+
+    def open(self, settings):
+        """
+        Load the manifest, or start a new one if it is missing or was written
+        for other carriers or settings.
+
+        Args:
+            settings: JSON-serializable carriers and settings of the job
+
+        Returns:
+            bool: True if an earlier compatible run was found
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        if state is not None and state.get('version') == self.VERSION and state['settings'] == settings:
+            self.state = state
+            return True
+        if state is not None:
+            print(f"Warning: {self.path} was written for other carriers or settings, embedding everything again")
+        self.state = {'version': self.VERSION, 'settings': settings, 'job_id': os.urandom(16).hex(), 'chunks': []}
+        return False
+
+    @property
+    def job_id(self):
+        return bytes.fromhex(self.state['job_id'])
+
+    def make_encrypter(self, password, kdf_params=None):
+        """
+        Encrypter for this job: the key of the earlier runs, or a new one.
+
+        Raises:
+            ValueError: If password is not the one the manifest was written with
+        """
+        from Encrypter import Encrypter
+        if self.state.get('salt'):
+            encrypter = Encrypter(password, salt=bytes.fromhex(self.state['salt']),
+                                  kdf_params=tuple(self.state['kdf_params']))
+            if not hmac.compare_digest(self._key_check(encrypter.key), self.state['key_check']):
+                raise ValueError(f"Password does not match the one {self.path} was written with")
+            return encrypter
+        encrypter = Encrypter(password, kdf_params=kdf_params)
+        self.state.update(salt=encrypter.salt.hex(), kdf_params=list(encrypter.kdf_params),
+                          key_check=self._key_check(encrypter.key))
+        return encrypter
+
+    @staticmethod
+    def _key_check(key):
+        return hmac.new(key, b'manifest key check', hashlib.sha256).hexdigest()
+
+    def chunk_sizes(self, content_length):
+        """
+        Slice sizes that keep the earlier boundaries for content_length bytes.
+
+        Returns:
+            list[int] | None: Sizes per carrier, or None if there was no
+                earlier run or the file no longer reaches the last boundary
+        """
+        chunks = self.state['chunks']
+        if not chunks:
+            return None
+        fixed = [chunk['length'] for chunk in chunks[:-1]]
+        if sum(fixed) > content_length:
+            return None
+        return fixed + [content_length - sum(fixed)]
+
+    @staticmethod
+    def digest(content_slice, offset, file_name, is_last, key=None):
+        """Digest of a chunk's plaintext and identity (an HMAC when key is given)."""
+        identity = json.dumps([offset, len(content_slice), file_name, is_last]).encode()
+        if key is None:
+            digest = hashlib.sha256(identity)
+        else:
+            digest = hmac.new(key, identity, hashlib.sha256)
+        digest.update(content_slice)
+        return digest.hexdigest()
+
+    @classmethod
+    def digests(cls, content, chunk_sizes, file_name, key=None):
+        """Digest (see digest()) of every chunk of content split into chunk_sizes."""
+        view = memoryview(content)
+        digests = []
+        offset = 0
+        for i, size in enumerate(chunk_sizes):
+            digests.append(cls.digest(view[offset:offset + size], offset, file_name if i == 0 else '',
+                                      i == len(chunk_sizes) - 1, key))
+            offset += size
+        return digests
+
+    def unchanged(self, index, digest):
+        """
+        Output of an earlier run that already holds this chunk.
+
+        Returns:
+            str | None: The output path, if the chunk digest matches and the
+                output still exists with its recorded hash
+        """
+        chunks = self.state['chunks']
+        if index >= len(chunks) or chunks[index]['digest'] != digest:
+            return None
+        output = chunks[index].get('output')
+        if output is None or not os.path.exists(output):
+            return None
+        if Job_Journal.file_hash(output) != chunks[index]['sha256']:
+            print(f"Warning: {output} changed since it was written, embedding it again")
+            return None
+        return output
+
+    def recorded_hash(self, index):
+        """SHA-256 recorded for the output of carrier index."""
+        return self.state['chunks'][index]['sha256']
+
+    def stale_outputs(self, chunk_count):
+        """Outputs of carriers that held chunks earlier but get none now (the file shrank)."""
+        return [chunk['output'] for chunk in self.state['chunks'][chunk_count:]
+                if chunk.get('output') and os.path.exists(chunk['output'])]
+
+    def save(self, chunks):
+        """
+        Write the manifest.
+
+        Args:
+            chunks: One dict per chunk with offset, length, digest, output and sha256
+        """
+        self.state['chunks'] = chunks
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        staging = os.path.join(directory, f".{os.path.basename(self.path)}.{uuid.uuid4().hex}.part")
+        with open(staging, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(staging, self.path)
@@ -0,0 +1,167 @@
+import struct
+import numpy as np
+
+
+class Lsb_Engine:
+    """Vectorized least-significant-bit embedding shared by the hiders.
+
+    Payloads are framed with a 4-byte big-endian length so that arbitrary
+    binary data (including null bytes) survives the round trip.
+
+    By default the frame occupies the first carrier values in order. The
+    embed and extract methods also take positions (e.g. from
+    Scatter_Index.positions()): symbol i then goes to values[positions[i]].
+    """
+
+    LENGTH = struct.Struct('>I')
+
+    @classmethod
+    def capacity(cls, value_count: int, bits_per_value: int = 1) -> int:
+        """Number of payload bytes that fit into value_count carrier values."""
+        return max(0, (value_count * bits_per_value) // 8 - cls.LENGTH.size)
+
+    @classmethod
+    def frame(cls, data) -> bytes:
+        """Prefix data with its length."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return cls.LENGTH.pack(len(data)) + bytes(data)
+
+    @staticmethod
+    def _bits_to_values(bits: np.ndarray, bits_per_value: int) -> np.ndarray:
+        pad = (-len(bits)) % bits_per_value
+        if pad:
+            bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+        groups = bits.reshape(-1, bits_per_value)
+        weights = (1 << np.arange(bits_per_value - 1, -1, -1)).astype(np.uint8)
+        return (groups * weights).sum(axis=1, dtype=np.uint8)
+
+    @staticmethod
+    def _values_to_bits(values: np.ndarray, bits_per_value: int) -> np.ndarray:
+        mask = (1 << bits_per_value) - 1
+        lsb = (values & mask).astype(np.uint8)
+        shifts = np.arange(bits_per_value - 1, -1, -1, dtype=np.uint8)
+        return ((lsb[:, None] >> shifts) & 1).reshape(-1)
+
+    @classmethod
+    def embed(cls, values: np.ndarray, data, bits_per_value: int = 1, positions: np.ndarray = None) -> int:
+        """
+        Embed framed data into the low bits of a flat array, in place.
+
+        Args:
+            values: 1-D integer array (usually a view of pixel or sample data)
+            data: Payload as bytes or str
+            bits_per_value: Number of low bits used in each value
+            positions: Optional order in which values are used (indices into values)
+
+        Returns:
+            int: Number of carrier values that were modified
+
+        Raises:
+            ValueError: If the carrier is too small for the payload
+        """
+        framed = cls.frame(data)
+        bits = np.unpackbits(np.frombuffer(framed, dtype=np.uint8))
+        symbols = cls._bits_to_values(bits, bits_per_value)
+        if len(symbols) > len(values):
+            raise ValueError(f"Carrier too small to hide the data. "
+                             f"Needed: {len(framed)} bytes, "
+                             f"Available: {cls.capacity(len(values), bits_per_value) + cls.LENGTH.size} bytes")
+        mask = (1 << bits_per_value) - 1
+        if positions is not None:
+            index = positions[:len(symbols)]
+            values[index] = (values[index] & ~np.array(mask, dtype=values.dtype)) | symbols.astype(values.dtype)
+            return len(symbols)
+        target = values[:len(symbols)]
+        target &= ~np.array(mask, dtype=values.dtype)
+        target |= symbols.astype(values.dtype)
+        return len(symbols)
+
+    @classmethod
+    def embed_at(cls, values: np.ndarray, framed: bytes, first_bit: int, positions: np.ndarray = None) -> int:
+        """
+        Write part of a framed payload into the least significant bit of values, in place.
+
+        Lets independent slices of a carrier (e.g. row bands of an image) be
+        embedded separately: values receive bits first_bit onwards of framed.
+
+        Args:
+            values: 1-D integer array for the slice, one bit per value
+            framed: Payload already passed through frame()
+            first_bit: Index of the first payload bit that goes into values[0]
+            positions: Optional indices into values for bits first_bit onwards
+                (bit first_bit + i then goes to values[positions[i]])
+
+        Returns:
+            int: Number of values that were modified
+        """
+        slots = len(values) if positions is None else len(positions)
+        count = max(0, min(slots, len(framed) * 8 - first_bit))
+        if not count:
+            return 0
+        start = first_bit // 8
+        end = -(-(first_bit + count) // 8)
+        bits = np.unpackbits(np.frombuffer(framed, dtype=np.uint8, count=end - start, offset=start))
+        bits = bits[first_bit - start * 8:first_bit - start * 8 + count]
+        if positions is not None:
+            index = positions[:count]
+            values[index] = (values[index] & ~np.array(1, dtype=values.dtype)) | bits.astype(values.dtype)
+            return count
+        target = values[:count]
+        target &= ~np.array(1, dtype=values.dtype)
+        target |= bits.astype(values.dtype)
+        return count
+
+    @classmethod
+    def read_bytes(cls, values: np.ndarray, start_byte: int, byte_count: int,
+                   bits_per_value: int = 1) -> bytes:
+        """Read byte_count raw bytes starting at start_byte of the embedded stream."""
+        first_bit = start_byte * 8
+        last_bit = (start_byte + byte_count) * 8
+        first = first_bit // bits_per_value
+        last = -(-last_bit // bits_per_value)
+        if last > len(values):
+            raise ValueError("Carrier does not hold that many bytes")
+        bits = cls._values_to_bits(values[first:last], bits_per_value)
+        skip = first_bit - first * bits_per_value
+        return np.packbits(bits[skip:skip + byte_count * 8]).tobytes()
+
+    @classmethod
+    def extract(cls, values: np.ndarray, bits_per_value: int = 1, positions: np.ndarray = None) -> bytes:
+        """
+        Extract framed data embedded with embed().
+
+        Args:
+            positions: The positions the data was embedded with, if any; only
+                the values the frame occupies are gathered
+
+        Returns:
+            bytes: The payload, or b'' if no valid frame is present
+        """
+        if positions is not None:
+            return cls.extract_prefix(lambda count: values[positions[:count]], len(positions), bits_per_value)
+        return cls.extract_prefix(lambda count: values, len(values), bits_per_value)
+
+    @classmethod
+    def extract_prefix(cls, read_values, value_count: int, bits_per_value: int = 1) -> bytes:
+        """
+        Extract framed data, fetching only the carrier values it occupies.
+
+        Args:
+            read_values: Callable taking a count n and returning a 1-D array of
+                at least the first n carrier values
+            value_count: Total number of values in the carrier
+            bits_per_value: Number of low bits used in each value
+
+        Returns:
+            bytes: The payload, or b'' if no valid frame is present
+        """
+        header_values = -(-cls.LENGTH.size * 8 // bits_per_value)
+        if value_count < header_values:
+            return b''
+        (length,) = cls.LENGTH.unpack(cls.read_bytes(read_values(header_values), 0, cls.LENGTH.size,
+                                                     bits_per_value))
+        if length > cls.capacity(value_count, bits_per_value):
+            return b''
+        needed = -(-(cls.LENGTH.size + length) * 8 // bits_per_value)
+        return cls.read_bytes(read_values(needed), cls.LENGTH.size, length, bits_per_value)
@@ -0,0 +1,33 @@
+import io
+from objects.File import File
+
+
+class Memory_File(File):
+    """A carrier held in memory instead of on disk.
+
+    Has the same attributes as File, with file_path set to None, so it can be
+    handed to any hider; the hiders then read it through BytesIO rather than
+    opening a path.
+    """
+
+    def __init__(self, content, extension, file_name=None):
+        """
+        Args:
+            content: bytes, bytearray, memoryview or a readable binary file object
+            extension: Carrier format, e.g. 'png' or '.wav'
+            file_name: Name used for the category and in messages (default: carrier.<extension>)
+        """
+        if hasattr(content, 'read'):
+            content = content.read()
+        extension = extension.lower().lstrip('.')
+        self.file_path = None
+        self.file_name = file_name or f"carrier.{extension}"
+        self.file_extension = extension
+        self.file_content = bytes(content)
+        self.file_size = len(self.file_content)
+        self.category = None
+        self.categorize()
+
+    def open(self):
+        """Return a new BytesIO over the content."""
+        return io.BytesIO(self.file_content)
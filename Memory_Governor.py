@@ -0,0 +1,46 @@
+class Memory_Governor:
+    """Fits the carriers of a job into a memory budget.
+
+    Each hider estimates its peak memory for its in-memory path and for its
+    streaming path (see the hiders' memory_estimate()). A carrier keeps the
+    faster in-memory path if that fits in its share of the budget (the
+    budget divided by the carriers processed at once), otherwise it is
+    streamed. The number of carriers processed at once is then lowered
+    until the largest peaks that could run together fit in the budget.
+    """
+
+    def __init__(self, budget):
+        """
+        Args:
+            budget: Memory available to the job, in bytes
+        """
+        if budget <= 0:
+            raise ValueError("Memory budget must be positive")
+        self.budget = budget
+
+    def plan(self, estimates, max_workers, names=None):
+        """
+        Choose a path per carrier and a worker count.
+
+        Args:
+            estimates: (in-memory peak, streaming peak) in bytes per carrier
+            max_workers: Upper bound on carriers processed at once
+            names: Carrier names for warnings (default: indices)
+
+        Returns:
+            tuple: (list of streaming flags, workers)
+        """
+        names = names or [str(i) for i in range(len(estimates))]
+        workers = max(1, min(max_workers, len(estimates)))
+        share = self.budget / workers
+        streaming = [in_memory > share for in_memory, _ in estimates]
+        peaks = sorted((estimate[1] if stream else estimate[0] for estimate, stream in zip(estimates, streaming)),
+                       reverse=True)
+        # Any carriers may end up running together, so size for the largest ones
+        while workers > 1 and sum(peaks[:workers]) > self.budget:
+            workers -= 1
+        for (_, streamed), name in zip(estimates, names):
+            if streamed > self.budget:
+                print(f"Warning: {name} needs about {streamed // 2 ** 20} MB even when streamed, "
+                      f"more than the {self.budget // 2 ** 20} MB budget")
+        return streaming, workers
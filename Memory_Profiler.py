@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import tracemalloc
+import resource
+from Tracer import Tracer, _Span
+
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc(frames):
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _maxrss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return _maxrss()
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes.
+
+    Prefers VmHWM from /proc: on Linux ru_maxrss survives execve, so a freshly
+    spawned process would otherwise report its parent's peak.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return _maxrss()
+
+
+class _Memory_Span(_Span):
+    __slots__ = ('start_traced', 'peak_traced', 'peak_rss', 'snapshot_size', 'top')
+
+    def __enter__(self):
+        self.tracer._open(self)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._close(self)
+        return super().__exit__(exc_type, exc, tb)
+
+
+class Memory_Profiler(Tracer):
+    """Tracer that also attributes peak memory to every span.
+
+    Each finished span gains:
+        alloc_peak_bytes: Highest Python heap use during the span, above what
+            was allocated when it started (from tracemalloc)
+        rss_peak_bytes: Highest sampled resident set size during the span
+        top_allocations: Lines holding the most memory at the span's largest
+            sampled heap size, as [{'line': 'file:lineno', 'size_bytes', 'count'}]
+
+    tracemalloc is process-wide, so allocations made by other threads while
+    a span is open count towards it; run carriers one at a time (Runner
+    max_workers=1) for exact per-stage figures. Profiling slows jobs down
+    considerably and is meant for sizing and regression hunting, not for
+    production runs.
+
+    Usage:
+        with Memory_Profiler() as profiler:
+            runner.run(..., control=Job_Control(tracer=profiler))
+        report = profiler.report()
+    """
+
+    def __init__(self, sink=None, keep=True, interval=0.01, top=5, frames=1):
+        """
+        Args:
+            sink: Optional path or writable text file for JSON lines (see Tracer)
+            keep: Also keep finished spans in memory (needed for report())
+            interval: Seconds between RSS / heap samples
+            top: Number of allocating lines reported per span
+            frames: Traceback depth stored by tracemalloc
+        """
+        super().__init__(sink=sink, keep=keep)
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.traced_peak = 0
+        self.rss_peak = 0
+        self.top_allocations = []
+        self._snapshot_size = 0
+        self._open_spans = []
+        self._memory_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def span(self, name, **attrs):
+        return _Memory_Span(self, name, attrs)
+
+    def start(self):
+        """Start tracemalloc and the sampling thread."""
+        if self._sampler is not None:
+            return self
+        _start_tracemalloc(self.frames)
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is None:
+            return
+        self._stopped.set()
+        self._sampler.join()
+        self._sampler = None
+        with self._memory_lock:
+            self._update_peaks()
+        _stop_tracemalloc()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def close(self):
+        self.stop()
+        super().close()
+
+    def _update_peaks(self):
+        """Fold the heap peak since the last call into every open span. Caller holds _memory_lock."""
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for span in self._open_spans:
+            span.peak_traced = max(span.peak_traced, peak)
+        self.traced_peak = max(self.traced_peak, peak)
+        # Peaks of nested and later spans are measured from here on
+        tracemalloc.reset_peak()
+        return current
+
+    def _top_lines(self, snapshot):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, sys.modules[_Span.__module__].__file__),
+            # Module imports (hider modules are imported lazily, inside jobs)
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        return [
+            {'line': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             'size_bytes': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:self.top]
+        ]
+
+    def _sample(self, closing=None):
+        """Record RSS and, when the heap has grown noticeably, which lines hold it.
+
+        Args:
+            closing: Span about to finish; it gets a snapshot if it has none yet,
+                so that short stages the sampler never saw still name a line
+        """
+        rss = current_rss()
+        with self._memory_lock:
+            self.rss_peak = max(self.rss_peak, rss)
+            for span in self._open_spans:
+                span.peak_rss = max(span.peak_rss, rss)
+            if not tracemalloc.is_tracing():
+                return
+            current = tracemalloc.get_traced_memory()[0]
+            # Snapshots are expensive; only take one when some span reaches a new high
+            grown = [span for span in self._open_spans
+                     if current > span.snapshot_size * 1.1 or (span is closing and not span.top)]
+            if not grown and current <= self._snapshot_size * 1.1:
+                return
+            top = self._top_lines(tracemalloc.take_snapshot())
+            for span in grown:
+                span.snapshot_size = current
+                span.top = top
+            if current > self._snapshot_size:
+                self._snapshot_size = current
+                self.top_allocations = top
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def _open(self, span):
+        rss = current_rss()
+        with self._memory_lock:
+            current = self._update_peaks()
+            span.start_traced = current
+            span.peak_traced = current
+            span.peak_rss = rss
+            span.snapshot_size = current
+            span.top = []
+            self._open_spans.append(span)
+
+    def _close(self, span):
+        self._sample(closing=span)
+        with self._memory_lock:
+            self._update_peaks()
+            self._open_spans.remove(span)
+        span.record.update(
+            alloc_peak_bytes=max(0, span.peak_traced - span.start_traced),
+            rss_peak_bytes=span.peak_rss,
+            top_allocations=span.top,
+        )
+
+    def report(self):
+        """
+        Per-job memory report.
+
+        Returns:
+            dict: 'traced_peak_bytes' and 'rss_peak_bytes' for the whole run,
+                'top_allocations' at the largest sampled heap, and 'stages'
+                mapping each stage name to its count, largest alloc_peak_bytes
+                and rss_peak_bytes, and the allocating lines of that worst span
+        """
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for record in spans:
+            if 'alloc_peak_bytes' not in record:
+                continue
+            stage = stages.setdefault(record['name'], {
+                'count': 0, 'alloc_peak_bytes': -1, 'rss_peak_bytes': 0, 'top_allocations': []
+            })
+            stage['count'] += 1
+            stage['rss_peak_bytes'] = max(stage['rss_peak_bytes'], record['rss_peak_bytes'])
+            if record['alloc_peak_bytes'] > stage['alloc_peak_bytes']:
+                stage['alloc_peak_bytes'] = record['alloc_peak_bytes']
+                stage['worst_carrier'] = record.get('carrier')
+                stage['top_allocations'] = record['top_allocations']
+        return {
+            'traced_peak_bytes': self.traced_peak,
+            'rss_peak_bytes': self.rss_peak,
+            'top_allocations': self.top_allocations,
+            'stages': stages,
+        }
@@ -0,0 +1,210 @@
+import os
+import sys
+import ast
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+import importlib.util
+
+
+class Output_Cache:
+    """Content-addressed store of finished stego files.
+
+    An entry is keyed by a SHA-256 over the carrier bytes, the chunk bytes,
+    the hider parameters and a hash of the source of the modules that
+    produce the output (the hider and every repo module it imports,
+    directly or not), so a changed carrier, payload, setting or hider
+    version can never be served a stale file. Entries live in
+    root/<key[:2]>/<key>/<output name>; a hit is hardlinked (or copied,
+    across filesystems) into the output directory.
+
+    Entries are evicted least recently used first once their total size
+    exceeds max_bytes. Several processes can share one cache directory.
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+    # Modules under this directory count towards the code version
+    SOURCE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+    _versions = {}
+
+    def __init__(self, root, max_bytes=1024 ** 3):
+        """
+        Args:
+            root: Cache directory (created on first store)
+            max_bytes: Total size above which old entries are evicted
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _source_path(cls, module_name):
+        """Source file of a module if it belongs to this repo, else None (nothing is imported)."""
+        paths = []
+        for name in (module_name.split('.')[0], module_name):
+            module = sys.modules.get(name)
+            path = getattr(module, '__file__', None)
+            if path is None:
+                try:
+                    spec = importlib.util.find_spec(name)
+                except (ImportError, ValueError):
+                    return None
+                path = spec.origin if spec is not None else None
+            if path is None or not os.path.abspath(path).startswith(cls.SOURCE_ROOT + os.sep) \
+                    or 'site-packages' in path:
+                return None
+            paths.append(path)
+        return paths[-1] if paths[-1].endswith('.py') else None
+
+    @classmethod
+    def source_modules(cls, module_name):
+        """
+        Repo modules a module is built from: itself and everything it imports,
+        directly or through other repo modules (lazy imports included).
+
+        Returns:
+            dict: module name -> source path
+        """
+        found = {}
+        pending = [module_name]
+        while pending:
+            name = pending.pop()
+            if name in found:
+                continue
+            path = cls._source_path(name)
+            if path is None:
+                continue
+            found[name] = path
+            with open(path, 'rb') as f:
+                tree = ast.parse(f.read(), path)
+            for node in ast.walk(tree):
+                if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    pending.append(node.module)
+                elif isinstance(node, ast.Import):
+                    pending.extend(alias.name for alias in node.names)
+        return found
+
+    @classmethod
+    def code_version(cls, module_name):
+        """Hash of the source of a hider module and every repo module it imports."""
+        version = cls._versions.get(module_name)
+        if version is None:
+            digest = hashlib.sha256()
+            for name, path in sorted(cls.source_modules(module_name).items()):
+                with open(path, 'rb') as f:
+                    digest.update(name.encode() + b'\0' + hashlib.sha256(f.read()).digest())
+            version = cls._versions[module_name] = digest.hexdigest()
+        return version
+
+    def key(self, carrier_path, chunk, params):
+        """
+        Cache key for embedding a chunk in a carrier.
+
+        Args:
+            carrier_path: Path of the carrier file (its bytes are hashed)
+            chunk: Serialized chunk bytes
+            params: JSON-serializable dict of everything else that affects the
+                output (hider module, encoder profile, output name...)
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(self.code_version(params['hider']).encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(len(chunk).to_bytes(8, 'big'))
+        digest.update(chunk)
+        with open(carrier_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        """Return the cached output path for key (marking it recently used), or None."""
+        entry_dir = self._entry_dir(key)
+        try:
+            names = os.listdir(entry_dir)
+            if len(names) != 1:
+                raise FileNotFoundError(entry_dir)
+            os.utime(entry_dir)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return os.path.join(entry_dir, names[0])
+
+    @staticmethod
+    def link_or_copy(source, destination):
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def put(self, key, output_path):
+        """Store a finished output under key and evict old entries if over the size cap."""
+        size = os.path.getsize(output_path)
+        if size > self.max_bytes:
+            return
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        # Build the entry next to its final place, then rename it in
+        staging = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.part")
+        os.makedirs(staging)
+        try:
+            self.link_or_copy(output_path, os.path.join(staging, os.path.basename(output_path)))
+            try:
+                os.rename(staging, entry_dir)
+            except OSError:
+                # Stored concurrently by another job; keep that one
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def _entries(self):
+        """Return [(last use, size, entry dir)] for every entry."""
+        entries = []
+        try:
+            prefixes = os.listdir(self.root)
+        except OSError:
+            return entries
+        for prefix in prefixes:
+            prefix_dir = os.path.join(self.root, prefix)
+            if prefix.startswith('.') or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+                    entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+                except OSError:
+                    continue
+        return entries
+
+    def size(self):
+        """Total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_dir in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,64 @@
+import numpy as np
+from PIL import Image
+
+
+class Pixel_Modes:
+    """Pixel arrays in the image's own mode, for LSB embedding.
+
+    Grayscale, grayscale+alpha, RGB, RGBA and 16-bit grayscale images are
+    embedded in as they are, in every channel (alpha included), one bit per
+    channel value. Arrays are always (height, width, channels), so a flat
+    view of them covers every usable value. Other modes (palette, bilevel,
+    CMYK...) are converted to RGB, or RGBA if they have transparency.
+
+    Pillow reads 16-bit-per-channel colour PNG/TIFF as 8-bit RGB(A); such
+    images are decoded and encoded with OpenCV instead (see is_wide()).
+    """
+
+    # Pillow modes whose values are written to directly
+    NATIVE_MODES = ('L', 'LA', 'RGB', 'RGBA', 'I;16', 'I;16B')
+
+    @classmethod
+    def native_mode(cls, image):
+        """Mode the pixels of an image are embedded in."""
+        if image.mode in cls.NATIVE_MODES:
+            return image.mode
+        return 'RGBA' if cls.has_transparency(image) else 'RGB'
+
+    @staticmethod
+    def has_transparency(image):
+        """Whether an image carries transparency (Image.has_transparency_data needs Pillow 10.1)."""
+        if hasattr(image, 'has_transparency_data'):
+            return image.has_transparency_data
+        return 'transparency' in image.info or image.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La')
+
+    @classmethod
+    def channels(cls, image):
+        """Values per pixel that take payload bits."""
+        return Image.getmodebands(cls.native_mode(image))
+
+    @classmethod
+    def to_array(cls, image):
+        """Decode an image to a (height, width, channels) array in its native mode."""
+        mode = cls.native_mode(image)
+        pixels = np.array(image if image.mode == mode else image.convert(mode))
+        return pixels.reshape(pixels.shape[:2] + (-1,))
+
+    @staticmethod
+    def to_image(pixels):
+        """Pillow image of a (height, width, channels) array (mode from its dtype and channels)."""
+        return Image.fromarray(pixels[..., 0] if pixels.shape[2] == 1 else pixels)
+
+    @staticmethod
+    def is_wide(image):
+        """
+        Whether an image has 16 bits per colour channel, which Pillow would reduce to 8.
+
+        Only valid before the image is loaded (it reads the decoder's raw mode).
+        """
+        if image.mode not in ('RGB', 'RGBA') or not image.tile:
+            return False
+        rawmode = image.tile[0][3]
+        if not isinstance(rawmode, str):
+            rawmode = rawmode[0]
+        return ';16' in rawmode
@@ -0,0 +1,113 @@
+import io
+import zlib
+import struct
+import numpy as np
+
+
+class Png_Rows:
+    """Decode only the top rows of a PNG.
+
+    Inflates just enough of the IDAT stream to cover the requested rows,
+    then hands those rows to Pillow as a short PNG (stored, uncompressed
+    deflate blocks) so that unfiltering still runs in C. Reading the first
+    rows costs time proportional to those rows, not to the whole image.
+
+    Only non-interlaced 8-bit grayscale, grayscale+alpha, RGB and RGBA and
+    16-bit grayscale PNGs are handled (the modes Image_Hider embeds in as
+    Pillow decodes them); read() returns None for anything else.
+    """
+
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}  # PNG colour type -> channels
+    READ_BLOCK = 64 * 1024
+
+    @classmethod
+    def _chunk(cls, chunk_type, data):
+        crc = zlib.crc32(data, zlib.crc32(chunk_type))
+        return struct.pack('>I4s', len(data), chunk_type) + data + struct.pack('>I', crc)
+
+    @classmethod
+    def header(cls, src):
+        """
+        Read the IHDR of a PNG.
+
+        Returns:
+            dict: width, height, bit_depth, color_type, interlace and the raw IHDR data
+
+        Raises:
+            ValueError: If src is not a PNG
+        """
+        if src.read(8) != cls.SIGNATURE:
+            raise ValueError("Not a PNG file")
+        length, chunk_type = struct.unpack('>I4s', src.read(8))
+        if chunk_type != b'IHDR' or length != 13:
+            raise ValueError("Malformed PNG: IHDR must come first")
+        data = src.read(13)
+        src.read(4)
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data)
+        return {'width': width, 'height': height, 'bit_depth': bit_depth,
+                'color_type': color_type, 'interlace': interlace, 'ihdr': data}
+
+    @classmethod
+    def readable(cls, info):
+        """Whether read() can decode a PNG with this header (see header())."""
+        bit_depths = (8, 16) if info['color_type'] == 0 else (8,)
+        return info['color_type'] in cls.CHANNELS and info['bit_depth'] in bit_depths and not info['interlace']
+
+    @classmethod
+    def read(cls, src, row_count):
+        """
+        Decode the first row_count rows.
+
+        Args:
+            src: Readable binary file object positioned at the start of the PNG
+            row_count: Rows wanted (clamped to the image height)
+
+        Returns:
+            np.ndarray | None: Array of shape (rows, width, channels) (uint16
+                for 16-bit grayscale, uint8 otherwise), or None if the PNG
+                is not one readable() accepts
+
+        Raises:
+            ValueError: If the PNG is malformed or its image data is truncated
+        """
+        from PIL import Image
+
+        info = cls.header(src)
+        if not cls.readable(info):
+            return None
+        channels = cls.CHANNELS[info['color_type']]
+        row_count = max(1, min(row_count, info['height']))
+        # Every row is prefixed with its filter type byte
+        needed = row_count * (1 + info['width'] * channels * info['bit_depth'] // 8)
+
+        inflater = zlib.decompressobj()
+        raw = bytearray()
+        while len(raw) < needed:
+            header = src.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type == b'IEND':
+                break
+            if chunk_type != b'IDAT':
+                src.seek(length + 4, io.SEEK_CUR)
+                continue
+            remaining = length
+            while remaining and len(raw) < needed:
+                data = src.read(min(remaining, cls.READ_BLOCK))
+                if not data:
+                    raise ValueError("Truncated PNG image data")
+                remaining -= len(data)
+                while data and len(raw) < needed:
+                    raw += inflater.decompress(data, needed - len(raw))
+                    data = inflater.unconsumed_tail
+            src.seek(remaining + 4, io.SEEK_CUR)
+        if len(raw) < needed:
+            raise ValueError("Truncated PNG image data")
+
+        ihdr = struct.pack('>II', info['width'], row_count) + info['ihdr'][8:]
+        png = (cls.SIGNATURE + cls._chunk(b'IHDR', ihdr)
+               + cls._chunk(b'IDAT', zlib.compress(bytes(raw), 0)) + cls._chunk(b'IEND', b''))
+        rows = np.array(Image.open(io.BytesIO(png)))
+        return rows.reshape(rows.shape[:2] + (channels,))
@@ -1,25 +1,202 @@
+import os
+import hashlib
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from objects.File import File
-from Audio_Hider import Audio_Hider
-from Image_Hider import Image_Hider
-from Video_Hider import Video_Hider
 from File_Handeler import File_Handeler
+from Chunk import Chunk
+from Job_Control import Job_Control, Job_Cancelled
+from Workspace import Workspace
+from Stream_Assembler import Stream_Assembler
 
 class Runner:
+    # Hider modules are imported on first use so that a job only pays for
+    # the libraries its carriers need (cv2 is slow to import).
+    HIDER_MODULES = {
+        "audio": "Audio_Hider",
+        "image": "Image_Hider",
+        "video": "Video_Hider",
+    }
+    # Trade output size for encoding speed; each hider maps the profile to
+    # concrete encoder settings (PNG compress level, AAC coder). Audio is
+    # always written as WAV, which no profile affects
+    ENCODER_PROFILES = ("fast", "balanced", "smallest")
+
     def __init__(self):
         self.output_path = "output_files/"
-        # Salt for key derivation - should be the same for encryption and decryption
-        self.salt = b'salt_'  # In production, this should be randomly generated and stored securely
+        # scrypt (log2 n, r, p) for new jobs, None uses Encrypter's default.
+        # A random salt is generated per job and stored with these parameters
+        # in every chunk header.
+        self.kdf_params = None
+        # Carriers processed at once; every job gets its own Workspace, so
+        # carriers (and concurrent jobs) never share scratch files
+        self.max_workers = os.cpu_count() or 1
+        self.encoder_profile = "balanced"
+        # "lsb" or "container": lossless images can also take their chunk as
+        # a private PNG chunk instead of in the pixels (no decode/re-encode).
+        # JPEG and WebP always use the container.
+        self.image_embedding = "lsb"
+        # Optional Output_Cache: re-embedding the same chunk in the same
+        # carrier with the same settings is then served from the cache.
+        # Unencrypted jobs get a job id derived from their content so that a
+        # repeated run produces the same chunks; encrypted chunks are unique
+        # per run (fresh salt) and bypass the cache.
+        self.output_cache = None
+        # Optional Decode_Cache for sessions that reuse carriers (GUI, worker
+        # service): decoded pixels/PCM are shared between jobs and processes
+        self.decode_cache = None
+        # Check the outputs with verify() at the end of run() and raise if a
+        # chunk cannot be read back (e.g. a lossy codec destroyed the LSBs)
+        self.verify_outputs = False
+        # Where run() keeps the journals of named (resumable) jobs
+        self.journal_dir = "journals/"
+        # Bytes of memory a job may use, None for no limit. Carriers whose
+        # in-memory path would not fit are streamed instead, and fewer
+        # carriers are processed at once (see Memory_Governor)
+        self.memory_budget = None
+        # Spread each chunk over the whole carrier in a password-keyed order
+        # (see Scatter_Index) instead of filling it from the start. Needs a
+        # password, and the same setting and password to extract or verify
+        self.scatter = False
+        # Bits each sample of an audio channel takes, one budget (0 or 1) per
+        # channel, e.g. [1, 1, 1, 0, 1, 1] to leave the LFE of 5.1 audio
+        # untouched (see Audio_Hider). None uses every channel; extracting
+        # and verifying need the same budgets
+        self.channel_bits = None
 
+    def get_hider_class(self, category):
+        """Return the hider class for a carrier category, or None if unsupported."""
+        module_name = self.HIDER_MODULES.get(category)
+        if module_name is None:
+            return None
+        return getattr(importlib.import_module(module_name), module_name)
 
-    def proccess_hidden_file(self, hidden_file, carrier_files, carrier_percentages=None):
-        # Convert content to string
-        content = str(hidden_file.file_content)
-        
-        # Prepare chunks
-        content_chunks = []
-        carrier_count = len(carrier_files)
-        content_length = len(content)
-        
+    def make_hider(self, carrier_file, hidden_data, control=None, workspace=None, checkpoint_dir=None,
+                   streaming=False, scatter_key=None):
+        """Create the hider for a carrier file, or None if its category is unsupported.
+
+        checkpoint_dir is handed to hiders that can keep finished intermediate
+        files for a resumed run (video), streaming to hiders that have a
+        low-memory path (image, audio), scatter_key (see _scatter_key()) to
+        every hider.
+        """
+        hider_class = self.get_hider_class(carrier_file.category)
+        if hider_class is None:
+            return None
+        if self.encoder_profile not in self.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {self.encoder_profile}")
+        options = {}
+        if carrier_file.category == "image":
+            options['embedding'] = self.image_embedding
+        if carrier_file.category in ("image", "audio"):
+            options['decode_cache'] = self.decode_cache
+            options['streaming'] = streaming
+        if carrier_file.category == "audio" and self.channel_bits is not None:
+            options['channel_bits'] = self.channel_bits
+        if carrier_file.category == "video" and checkpoint_dir is not None:
+            options['checkpoint_dir'] = checkpoint_dir
+        if scatter_key is not None:
+            options['scatter_key'] = scatter_key
+        return hider_class(carrier_file, hidden_data, control=control, workspace=workspace,
+                           encoder_profile=self.encoder_profile, **options)
+
+    def _map_carriers(self, func, count, max_workers=None):
+        """Call func(i) for every carrier index, in parallel, and return results in order.
+
+        All carriers are allowed to finish before the first error is raised, so
+        no hider is still writing into the workspace when it gets cleaned up.
+
+        Args:
+            max_workers: Lower limit than self.max_workers for this call (see _memory_plan())
+        """
+        max_workers = min(self.max_workers, max_workers or self.max_workers)
+        if max_workers <= 1 or count <= 1:
+            return [func(i) for i in range(count)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, count)) as pool:
+            futures = [pool.submit(func, i) for i in range(count)]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+        return [future.result() for future in futures]
+
+    def _memory_plan(self, carrier_files, payloads, control, scatter_key=None):
+        """
+        Choose between in-memory and streaming paths so the job fits in memory_budget.
+
+        Args:
+            carrier_files: Carrier File objects
+            payloads: Data each carrier will hold (b'' when extracting)
+            control: Job_Control; each carrier's estimate is a 'probe' span
+            scatter_key: Scatter key of the job, if any (scattered carriers
+                are never streamed)
+
+        Returns:
+            tuple: (streaming flag per carrier, carriers to process at once)
+        """
+        if not self.memory_budget:
+            return [False] * len(carrier_files), self.max_workers
+        from Memory_Governor import Memory_Governor
+
+        def estimate(i):
+            carrier_control = control.for_carrier(i, len(carrier_files), carrier_files[i].file_path)
+            with carrier_control.span('probe') as span:
+                try:
+                    hider = self.make_hider(carrier_files[i], payloads[i], scatter_key=scatter_key)
+                    peaks = hider.memory_estimate() if hider is not None else (0, 0)
+                except Exception as e:
+                    # The hide or extract step reports the actual problem
+                    print(f"Warning: Could not estimate the memory needed for {carrier_files[i].file_path}: {e}")
+                    peaks = (0, 0)
+                span.set(memory=list(peaks))
+            return peaks
+
+        estimates = self._map_carriers(estimate, len(carrier_files))
+        return Memory_Governor(self.memory_budget).plan(estimates, self.max_workers,
+                                                        [f.file_path for f in carrier_files])
+
+    def _scatter_key(self, password):
+        """
+        Key for scatter embedding, or None if scatter is off.
+
+        Raises:
+            ValueError: If scatter is on but no password was given
+        """
+        if not self.scatter:
+            return None
+        if not password:
+            raise ValueError("Scatter embedding needs a password")
+        from Scatter_Index import Scatter_Index
+        return Scatter_Index.key_for(password)
+
+    def _cache_key(self, carrier_file, chunk):
+        params = {
+            'hider': self.HIDER_MODULES[carrier_file.category],
+            'file_name': carrier_file.file_name,
+            'encoder_profile': self.encoder_profile,
+        }
+        if carrier_file.category == "image":
+            params['image_embedding'] = self.image_embedding
+        if carrier_file.category == "audio" and self.channel_bits is not None:
+            params['channel_bits'] = list(self.channel_bits)
+        return self.output_cache.key(carrier_file.file_path, chunk, params)
+
+    @staticmethod
+    def _content_job_id(hidden_file, carrier_files, carrier_percentages):
+        """Job id that is the same whenever the same file is split over the same carriers."""
+        digest = hashlib.sha256(hidden_file.file_content)
+        digest.update(repr((hidden_file.file_name, [os.path.abspath(f.file_path) for f in carrier_files],
+                            carrier_percentages)).encode())
+        return digest.digest()[:16]
+
+    def _make_encrypter(self, password):
+        from Encrypter import Encrypter
+        return Encrypter(password, kdf_params=self.kdf_params)
+
+
+    @staticmethod
+    def _chunk_sizes(content_length, carrier_count, carrier_percentages=None):
+        """Split content_length bytes by percentage; the last chunk gets the rest."""
         # If no percentages provided, distribute evenly
         if carrier_percentages is None:
             carrier_percentages = [100.0 / carrier_count] * carrier_count
@@ -41,99 +218,101 @@ class Runner:
         
         # Last chunk gets all remaining content
         chunk_sizes.append(remaining)
+        return chunk_sizes
+
+    def proccess_hidden_file(self, hidden_file, carrier_files, carrier_percentages=None, encrypter=None,
+                             job_id=None, chunk_sizes=None):
+        """Split the hidden file into binary chunks, one per carrier.
+
+        Args:
+            hidden_file: File object whose file_content holds the raw bytes
+            carrier_files: Carrier File objects
+            carrier_percentages: Share of the content per carrier (defaults to even)
+            encrypter: Optional Encrypter; when given every chunk payload is sealed
+            job_id: 16-byte job id (default: random)
+            chunk_sizes: Explicit slice size per chunk, overriding carrier_percentages
+
+        Returns:
+            list[bytes]: Serialized chunks
+        """
+        content = hidden_file.file_content or b''
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        
+        # Prepare chunks
+        content_chunks = []
+        job_id = job_id or os.urandom(16)
+        if chunk_sizes is None:
+            chunk_sizes = self._chunk_sizes(len(content), len(carrier_files), carrier_percentages)
+        carrier_count = len(chunk_sizes)
         
         # Create chunks
+        view = memoryview(content)
         last_index = 0
         
         for i in range(carrier_count):
             size = chunk_sizes[i]
-            
-            # Get content slice
-            content_slice = content[last_index:last_index + size] if i != carrier_count - 1 else content[last_index:]
-            
-            # Prepare chunk data
-            chunk_data = {
-                'chunk_id': i,
-                'file_name': hidden_file.file_name if i == 0 else '',  # Only include filename in first chunk
-                'content': content_slice,
-                'is_last': (i == carrier_count - 1)
-            }
-            
-            # Convert to string and add to chunks with delimiters
-            chunk_str = str(chunk_data)
-            delimited_chunk = f"####{chunk_str}####"
-            content_chunks.append(delimited_chunk)
+            content_slice = bytes(view[last_index:last_index + size])
+
+            chunk = Chunk(
+                job_id, i, last_index, content_slice,
+                file_name=hidden_file.file_name if i == 0 else '',  # Only include filename in first chunk
+                is_last=(i == carrier_count - 1)
+            )
+            if encrypter is not None:
+                params, ciphertext = encrypter.encrypt(content_slice, chunk.associated_data())
+                chunk = Chunk(
+                    job_id, i, last_index, ciphertext, file_name=chunk.file_name,
+                    is_last=chunk.is_last, length=size, params=params
+                )
+
+            content_chunks.append(chunk.to_bytes())
             last_index += size
 
         return content_chunks
 
-    def process_content_chunks(self, content_chunks):
-        # Sort chunks by their ID
-        sorted_chunks = []
-        file_name = "extracted_file.txt"  # Default filename
-        
-        for chunk in content_chunks:
-            # Skip empty chunks
-            if not chunk.strip():
-                continue
-                
-            try:
-                # Extract content between delimiters if they exist
-                chunk = chunk.strip()
-                if chunk.startswith('####') and chunk.endswith('####'):
-                    chunk = chunk[4:-4]  # Remove delimiters
-                
-                # Parse the chunk data
-                try:
-                    chunk_data = eval(chunk)  # Be careful with eval in production!
-                    if not isinstance(chunk_data, dict):
-                        continue
-                except:
-                    continue
-                
-                # Get chunk data
-                chunk_id = chunk_data.get('chunk_id')
-                content = chunk_data.get('content', '')
-                
-                # Handle byte string representation if present
-                if isinstance(content, str) and content.startswith("b'"):
-                    try:
-                        # Safely evaluate the string representation of bytes
-                        content = eval(content)
-                        if isinstance(content, bytes):
-                            content = content.decode('utf-8', errors='replace')
-                    except:
-                        # If evaluation fails, clean up the string
-                        if content.startswith("b'"):
-                            content = content[2:-1]  # Remove b' and '
-                        content = content.replace('\\n', '\n')  # Convert escaped newlines
-                
-                # Get filename from first chunk
-                if chunk_id == 0 and 'file_name' in chunk_data:
-                    file_name = chunk_data['file_name']
-                
-                sorted_chunks.append((chunk_id, str(content)))  # Ensure content is string
-                
-                # If this is the last chunk, we can stop processing
-                if chunk_data.get('is_last', False):
-                    break
-                    
-            except Exception as e:
-                print(f"Error processing chunk: {e}")
-                continue
-        
-        if not sorted_chunks:
-            return None, None
-            
-        # Sort chunks by ID
-        sorted_chunks.sort(key=lambda x: x[0])
-        
-        # Combine chunks
-        full_content = "".join([content for _, content in sorted_chunks])
-        
-        return file_name, full_content
+    def _decrypt_chunk(self, chunk, password, encrypters):
+        """Decrypt a chunk payload in place, reusing encrypters per parameter set."""
+        if password is None:
+            raise ValueError("Chunk is encrypted but no password was given")
+        from Encrypter import Encrypter
+        fields = Encrypter.unpack_params(chunk.params)
+        key = (fields['cipher'], fields['kdf'], fields['kdf_params'], fields['salt'], fields['segment_size'])
+        if key not in encrypters:
+            encrypters[key] = Encrypter.from_params(password, chunk.params)
+        plaintext = encrypters[key].decrypt(chunk.params, chunk.payload, chunk.associated_data())
+        if len(plaintext) != chunk.length:
+            raise ValueError(f"Chunk {chunk.chunk_id} decrypted to an unexpected length")
+        chunk.payload = plaintext
+
+    def run(self, hidden_file_path: str, carrier_files_data: list[tuple[str, int]], password: str = None,
+            control: Job_Control = None, job_name: str = None, manifest_path: str = None):
+        """Hide a file across the given carriers.
 
-    def run(self, hidden_file_path: str, carrier_files_data: list[tuple[str, int]]):
+        Args:
+            hidden_file_path: Path of the file to hide
+            carrier_files_data: (carrier path, percentage) pairs
+            password: If given, chunk payloads are encrypted before embedding
+            control: Optional Job_Control for progress events and cancellation
+            job_name: Makes the job resumable: progress is journaled under
+                this name in journal_dir (see Job_Journal), and running the
+                same job again with the same name skips the carriers that
+                were finished
+            manifest_path: Record the split in this Job_Manifest; hiding an
+                updated version of the file with the same manifest (and the
+                same carriers and settings) only embeds the carriers whose
+                slice of the file changed
+
+        Returns:
+            list[str]: Paths of the produced stego files
+
+        Raises:
+            RuntimeError: If verify_outputs is set and an output does not hold
+                its chunk intact
+            ValueError: If job_name belongs to a job with different files or
+                settings, password differs from the one the manifest was
+                written with, or scatter is on without a password
+        """
         hidden_file = File(hidden_file_path)
         hidden_file.add_content(open(hidden_file_path, 'rb').read())
 
@@ -145,155 +324,394 @@ class Runner:
             carrier_files.append(carrier_file)
             carrier_percentages.append(percentage)
 
-        content_chunks = self.proccess_hidden_file(
-            hidden_file, 
-            carrier_files, 
-            carrier_percentages=carrier_percentages
-        )
-
-        for i in range(len(carrier_files)):
-            if carrier_files[i].category == "audio":
-                audio_hider = Audio_Hider(carrier_files[i], content_chunks[i])
-                audio_hider.hide_data()
-            elif carrier_files[i].category == "image":
-                image_hider = Image_Hider(carrier_files[i], content_chunks[i])
-                image_hider.hide_data()
-            elif carrier_files[i].category == "video":
-                video_hider = Video_Hider(carrier_files[i], content_chunks[i])
-                video_hider.hide_data()
-            else:
-                print(f"Unsupported file type: {carrier_files[i].category}")
-
-    def extract(self, carrier_path):
+        control = control or Job_Control()
+        with control.trace('job', operation='hide', bytes=len(hidden_file.file_content)) as job_span:
+            scatter_key = self._scatter_key(password)
+            journal = None
+            if job_name is not None:
+                from Job_Journal import Job_Journal
+                journal = Job_Journal(self.journal_dir, job_name)
+                job_span.set(resumed=journal.open(self._journal_plan(hidden_file, carrier_files,
+                                                                     carrier_percentages, password)))
+
+            manifest = None
+            if manifest_path is not None:
+                from Job_Manifest import Job_Manifest
+                manifest = Job_Manifest(manifest_path)
+                manifest.open(self._job_settings(carrier_files, carrier_percentages, password))
+
+            with control.span('prepare', bytes=len(hidden_file.file_content)):
+                content_chunks = journal.load_chunks() if journal is not None else None
+                use_cache = self.output_cache is not None and not password
+                encrypter = None
+                chunk_sizes = None
+                if manifest is not None:
+                    # Same key and slice boundaries as the earlier runs
+                    encrypter = manifest.make_encrypter(password, self.kdf_params) if password else None
+                    chunk_sizes = (manifest.chunk_sizes(len(hidden_file.file_content))
+                                   or self._chunk_sizes(len(hidden_file.file_content), len(carrier_files),
+                                                        carrier_percentages))
+                    digests = manifest.digests(hidden_file.file_content, chunk_sizes, hidden_file.file_name,
+                                               key=encrypter.key if encrypter else None)
+                if content_chunks is None:
+                    # One encrypter (and so one key derivation) per job
+                    if password and encrypter is None:
+                        encrypter = self._make_encrypter(password)
+                    if manifest is not None:
+                        job_id = manifest.job_id
+                    elif journal is not None:
+                        job_id = journal.job_id
+                    elif use_cache:
+                        job_id = self._content_job_id(hidden_file, carrier_files, carrier_percentages)
+                    else:
+                        job_id = None
+                    content_chunks = self.proccess_hidden_file(
+                        hidden_file,
+                        carrier_files,
+                        carrier_percentages=carrier_percentages,
+                        encrypter=encrypter,
+                        job_id=job_id,
+                        chunk_sizes=chunk_sizes
+                    )
+                    if journal is not None:
+                        journal.store_chunks(content_chunks)
+
+            streaming, workers = self._memory_plan(carrier_files[:len(content_chunks)], content_chunks, control,
+                                                   scatter_key)
+
+            with Workspace(self.output_path) as workspace:
+                def hide_chunk(i):
+                    control.check()
+                    carrier_control = control.for_carrier(i, len(content_chunks), carrier_files[i].file_path)
+                    if manifest is not None:
+                        output_file = manifest.unchanged(i, digests[i])
+                        if output_file is not None:
+                            output_hashes[i] = manifest.recorded_hash(i)
+                            carrier_control.report('done', 1.0, output=output_file, unchanged=True)
+                            return output_file
+                    checkpoint_dir = None
+                    if journal is not None:
+                        output_file = journal.completed(i)
+                        if output_file is not None:
+                            carrier_control.report('done', 1.0, output=output_file, resumed=True)
+                            return output_file
+                        carrier_control.progress = journal.recorder(i, carrier_control.progress)
+                        checkpoint_dir = journal.carrier_dir(i)
+                    hider = self.make_hider(carrier_files[i], content_chunks[i], control=carrier_control,
+                                            workspace=workspace, checkpoint_dir=checkpoint_dir,
+                                            streaming=streaming[i], scatter_key=scatter_key)
+                    if hider is None:
+                        print(f"Unsupported file type: {carrier_files[i].category}")
+                        return None
+                    cache_key = None
+                    if use_cache:
+                        with carrier_control.trace('cache') as span:
+                            cache_key = self._cache_key(carrier_files[i], content_chunks[i])
+                            cached = self.output_cache.get(cache_key)
+                            span.set(hit=cached is not None)
+                            if cached is not None:
+                                output_file = workspace.commit_copy(cached, os.path.basename(cached))
+                                span.set(bytes=os.path.getsize(output_file))
+                        if cached is not None:
+                            if journal is not None:
+                                journal.record_output(i, output_file)
+                            carrier_control.report('done', 1.0, output=output_file, cached=True)
+                            return output_file
+                    output_file = hider.hide_data()
+                    if cache_key is not None:
+                        self.output_cache.put(cache_key, output_file)
+                    if journal is not None:
+                        journal.record_output(i, output_file)
+                    carrier_control.report('done', 1.0, output=output_file)
+                    return output_file
+
+                output_hashes = {}
+                output_files = self._map_carriers(hide_chunk, len(content_chunks), max_workers=workers)
+            if manifest is not None:
+                self._save_manifest(manifest, chunk_sizes, digests, output_files, output_hashes)
+            output_files = [output_file for output_file in output_files if output_file is not None]
+            if self.verify_outputs:
+                result = self.verify(output_files, control=control, password=password)
+                errors = {path: error for path, error in result['files'].items() if error}
+                if errors or not result['complete']:
+                    raise RuntimeError(f"Output verification failed: {errors or 'chunks are missing'}")
+            if journal is not None:
+                journal.finish()
+            return output_files
+
+    def _job_settings(self, carrier_files, carrier_percentages, password):
+        """Carriers (as they are on disk) and settings that determine a job's outputs."""
+        stats = [os.stat(f.file_path) for f in carrier_files]
+        settings = {
+            'carriers': [[os.path.abspath(f.file_path), percentage, stat.st_size, stat.st_mtime_ns]
+                         for f, percentage, stat in zip(carrier_files, carrier_percentages, stats)],
+            'output_path': os.path.abspath(self.output_path),
+            'encoder_profile': self.encoder_profile,
+            'image_embedding': self.image_embedding,
+            'encrypted': bool(password),
+            'scatter': self.scatter,
+        }
+        if self.channel_bits is not None:
+            # Only recorded when set, so manifests and journals of jobs without
+            # budgets stay valid
+            settings['channel_bits'] = list(self.channel_bits)
+        return settings
+
+    def _journal_plan(self, hidden_file, carrier_files, carrier_percentages, password):
+        """Everything a resumed job has to share with the run that started it."""
+        plan = self._job_settings(carrier_files, carrier_percentages, password)
+        plan['hidden_file'] = os.path.abspath(hidden_file.file_path)
+        plan['sha256'] = hashlib.sha256(hidden_file.file_content).hexdigest()
+        return plan
+
+    @staticmethod
+    def _save_manifest(manifest, chunk_sizes, digests, output_files, output_hashes):
+        """Record this run's chunks in the manifest and drop outputs that no longer hold one."""
+        from Job_Journal import Job_Journal
+        for path in manifest.stale_outputs(len(output_files)):
+            if path not in output_files:
+                print(f"Removing {path}: the hidden file no longer reaches its carrier")
+                os.remove(path)
+        chunks = []
+        offset = 0
+        for i, output_file in enumerate(output_files):
+            chunks.append({
+                'offset': offset,
+                'length': chunk_sizes[i],
+                'digest': digests[i],
+                'output': output_file,
+                'sha256': output_hashes.get(i) or (Job_Journal.file_hash(output_file) if output_file else None),
+            })
+            offset += chunk_sizes[i]
+        manifest.save(chunks)
+
+    def plan(self, hidden_file_path: str, carrier_files_data: list[tuple[str, int]], password: str = None,
+             control: Job_Control = None):
+        """Work out how a hidden file would be split, without embedding anything.
+
+        Args:
+            hidden_file_path: Path of the file to hide
+            carrier_files_data: (carrier path, percentage) pairs
+            password: Whether the job would be encrypted affects the chunk sizes
+            control: Optional Job_Control; each carrier's capacity probe is a 'probe' span
+
+        Returns:
+            list[dict]: One entry per carrier with its chunk size, capacity and
+                whether the chunk fits. A capacity of None means no fixed limit.
+        """
+        from Encrypter import Encrypter
+        carrier_files = [File(path) for path, _ in carrier_files_data]
+        percentages = [percentage for _, percentage in carrier_files_data]
+
+        # Chunk sizes don't depend on the key, so they are computed without
+        # deriving one or encrypting anything
+        file_name = os.path.basename(hidden_file_path)
+        slice_sizes = self._chunk_sizes(os.path.getsize(hidden_file_path), len(carrier_files), percentages)
+        chunk_sizes = [
+            Chunk.overhead(file_name if i == 0 else '', Encrypter.PARAMS.size if password else 0)
+            + (Encrypter.sealed_size(size, Encrypter.DEFAULT_SEGMENT_SIZE) if password else size)
+            for i, size in enumerate(slice_sizes)
+        ]
+
+        control = control or Job_Control()
+        plan = []
+        for i, carrier_file in enumerate(carrier_files):
+            chunk_size = chunk_sizes[i] if i < len(chunk_sizes) else 0
+            with control.for_carrier(i, len(carrier_files), carrier_file.file_path).span('probe') as span:
+                hider = self.make_hider(carrier_file, b'')
+                capacity = hider.capacity() if hider is not None else 0
+                span.set(bytes=capacity)
+            plan.append({
+                'carrier': carrier_file.file_path,
+                'category': carrier_file.category,
+                'chunk_bytes': chunk_size,
+                'capacity_bytes': capacity,
+                'fits': hider is not None and (capacity is None or chunk_size <= capacity),
+            })
+        return plan
+
+    def verify(self, stego_paths: list[str], control: Job_Control = None, password: str = None):
+        """Check that stego files hold intact chunks that together form complete jobs.
+
+        Only the part of each file that holds the chunk is read (see the
+        hiders' peek_data()), and files are checked in parallel. Every chunk's
+        CRC is checked; no password is needed to decrypt, as the CRC covers
+        the payload as stored.
+
+        Args:
+            stego_paths: Paths of the files produced by run()
+            control: Optional Job_Control; each file is checked in a 'verify' span
+            password: Only needed to locate scattered chunks (see scatter)
+
+        Returns:
+            dict: 'files' maps each path to an error string (None if its chunks
+                are intact) and 'complete' is True if every job found has all
+                of its chunks
+        """
+        control = control or Job_Control()
+        scatter_key = self._scatter_key(password)
+
+        def verify_file(i):
+            path = stego_paths[i]
+            carrier_control = control.for_carrier(i, len(stego_paths), path)
+            try:
+                with carrier_control.span('verify') as span:
+                    carrier_file = File(path)
+                    hider = self.make_hider(carrier_file, b'', control=carrier_control, scatter_key=scatter_key)
+                    if hider is None:
+                        raise ValueError(f"Unsupported file type: {carrier_file.category}")
+                    data = hider.peek_data()
+                    if isinstance(data, str):
+                        data = data.encode('utf-8')
+                    span.set(bytes=len(data))
+                    return Chunk.parse_all(data), None
+            except Job_Cancelled:
+                raise
+            except Exception as e:
+                return [], str(e)
+
+        files = {}
+        jobs = {}
+        for path, (chunks, error) in zip(stego_paths, self._map_carriers(verify_file, len(stego_paths))):
+            files[path] = error
+            for chunk in chunks:
+                jobs.setdefault(chunk.job_id, []).append(chunk)
+
+        complete = bool(jobs)
+        for chunks in jobs.values():
+            ids = sorted(chunk.chunk_id for chunk in chunks)
+            last = [chunk for chunk in chunks if chunk.is_last]
+            if not last or ids != list(range(last[0].chunk_id + 1)):
+                complete = False
+        return {'files': files, 'complete': complete}
+
+    def extract(self, carrier_path, password: str = None, control: Job_Control = None):
+        """Recover the hidden file from a directory of stego files.
+
+        Chunks are checked (CRC), decrypted and written straight to their
+        offset in the output as each carrier finishes (see Stream_Assembler),
+        so memory use does not grow with the size of the hidden file.
+
+        Returns:
+            str | None: Path of the recovered file, or None if nothing was found
+        """
+        control = control or Job_Control()
+        try:
+            scatter_key = self._scatter_key(password)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
         print(f"\n=== Starting extraction from: {carrier_path} ===")
         file_handler = File_Handeler(carrier_path)
-        file_handler.load_files()
+        file_handler.load_files(load_content=False)
         
         print(f"Found {len(file_handler.files)} carrier files")
         if not file_handler.files:
             print("Error: No carrier files found in the specified directory")
             return
 
-        content_chunks = []
-        for i, file in enumerate(file_handler.files, 1):
-            print(f"\nProcessing carrier file {i}/{len(file_handler.files)}: {file.file_path}")
+        workspace = Workspace(self.output_path)
+        # One assembler per job id found in the carriers
+        assemblers = {}
+        assemblers_lock = threading.Lock()
+        encrypters = {}
+
+        def store_chunks(raw, carrier_control):
+            """Parse, decrypt and write the chunks extracted from one carrier; return how many were usable."""
+            try:
+                chunks = Chunk.parse_all(raw)
+            except ValueError as e:
+                print(f"Error processing chunk: {e}")
+                return 0
+            stored = 0
+            for chunk in chunks:
+                try:
+                    if chunk.is_encrypted:
+                        self._decrypt_chunk(chunk, password, encrypters)
+                except ValueError as e:
+                    print(f"Error processing chunk: {e}")
+                    continue
+                with assemblers_lock:
+                    assembler = assemblers.get(chunk.job_id)
+                    if assembler is None:
+                        assembler = assemblers[chunk.job_id] = Stream_Assembler(workspace.temp_path('extracted'))
+                with carrier_control.span('write', bytes=chunk.length, chunk_id=chunk.chunk_id):
+                    if not assembler.add(chunk):
+                        print(f"Skipping duplicate chunk {chunk.chunk_id}")
+                stored += 1
+            return stored
+
+        def extract_chunk(index):
+            file = file_handler.files[index]
+            print(f"\nProcessing carrier file {index + 1}/{len(file_handler.files)}: {file.file_path}")
             print(f"File type: {file.category}")
             try:
                 chunk = None
-                if file.category == "audio":
-                    audio_hider = Audio_Hider(file, "")
-                    print("Extracting from audio file...")
-                    chunk = audio_hider.extract_data()
-                    print(f"Raw audio chunk type: {type(chunk)}, length: {len(chunk) if chunk else 0}")
-                    if chunk:
-                        print(f"First 50 chars of audio chunk: {str(chunk)[:50]}")
-                elif file.category == "image":
-                    image_hider = Image_Hider(file, "")
-                    print("Extracting from image file...")
-                    chunk = image_hider.extract_data()
-                    print(f"Raw image chunk type: {type(chunk)}, length: {len(chunk) if chunk else 0}")
-                    if chunk:
-                        print(f"First 50 chars of image chunk: {str(chunk)[:50]}")
-                elif file.category == "video":
-                    video_hider = Video_Hider(file, "")
-                    print("Extracting from video file...")
-                    chunk = video_hider.extract_data()
-                    print(f"Raw video chunk type: {type(chunk)}, length: {len(chunk) if chunk else 0}")
-                    if chunk:
-                        print(f"First 50 chars of video chunk: {str(chunk)[:50]}")
+                control.check()
+                carrier_control = control.for_carrier(index, len(file_handler.files), file.file_path)
+                hider = self.make_hider(file, "", control=carrier_control, workspace=workspace,
+                                        streaming=streaming[index], scatter_key=scatter_key)
+                if hider is not None:
+                    print(f"Extracting from {file.category} file...")
+                    chunk = hider.extract_data()
+                    print(f"Raw {file.category} chunk length: {len(chunk) if chunk else 0}")
                 else:
                     print(f"Skipping unsupported file type: {file.category}")
                 
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                stored = 0
                 if chunk:
                     print(f"Successfully extracted chunk of length: {len(chunk)}")
-                    content_chunks.append(chunk)
+                    stored = store_chunks(chunk, carrier_control)
                 else:
                     print("No data extracted from this file")
+                carrier_control.report('done', 1.0)
+                return stored
                     
+            except Job_Cancelled:
+                raise
             except Exception as e:
                 print(f"Error extracting data from {file.file_path}: {str(e)}")
                 import traceback
                 traceback.print_exc()
-                continue
+                return 0
 
-        print(f"\nExtraction complete. Found {len(content_chunks)} valid chunks.")
-        
-        if not content_chunks:
-            print("Error: No valid data could be extracted from any carrier files")
-            return
+        with workspace, control.trace('job', operation='extract'):
+            streaming, workers = self._memory_plan(file_handler.files, [b''] * len(file_handler.files), control,
+                                                   scatter_key)
+            try:
+                found = sum(self._map_carriers(extract_chunk, len(file_handler.files), max_workers=workers))
+            finally:
+                for assembler in assemblers.values():
+                    assembler.close()
+            return self._commit_extracted(found, assemblers, control, workspace)
 
-        print("\nProcessing content chunks...")
-        print(f"Number of chunks to process: {len(content_chunks)}")
-        for i, chunk in enumerate(content_chunks):
-            print(f"Chunk {i} type: {type(chunk)}, length: {len(chunk) if chunk else 0}")
-            if chunk:
-                print(f"First 50 chars of chunk {i}: {str(chunk)[:50]}")
-        
-        file_name, extracted_content = self.process_content_chunks(content_chunks)
+    def _commit_extracted(self, found, assemblers, control, workspace):
+        print(f"\nExtraction complete. Found {found} valid chunks.")
         
-        if extracted_content is None:
-            print("Error: Failed to process chunks - extracted content is None")
-            return
-            
-        print(f"Successfully processed chunks. Extracted content length: {len(extracted_content)}")
-        print(f"First 100 chars of extracted content: {str(extracted_content)[:100]}")
-        
-        print("\nCleaning extracted content...")
-        cleaned_content = self.clean_mixed_output(extracted_content)
-        
-        if not cleaned_content:
-            print("Error: No valid content after cleaning")
+        if not assemblers:
+            print("Error: No valid data could be extracted from any carrier files")
             return
-            
-        print(f"Cleaned content length: {len(cleaned_content)}")
-        print(f"First 100 chars of cleaned content: {cleaned_content[:100]}")
-        
-        output_file_path = f"{self.output_path}{file_name}"
-        print(f"\nSaving to: {output_file_path}")
-
-        import os
-        os.makedirs(self.output_path, exist_ok=True)
 
-        try:
-            with open(output_file_path, "w", encoding="utf-8") as f:
-                f.write(cleaned_content)
-            print(f"\n=== Extraction successful! File saved to: {output_file_path} ===")
-            return output_file_path
-        except Exception as e:
-            print(f"Error writing output file: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
-    def clean_mixed_output(self, raw: str) -> str:
-        # If the input is already a string representation of bytes, clean it
-        if isinstance(raw, str) and raw.startswith("b'"):
+        # The job with the most chunks is the result; others are saved too
+        ordered = sorted(assemblers.values(), key=lambda a: len(a.chunk_ids), reverse=True)
+        if len(ordered) > 1:
+            print(f"Warning: Carriers hold chunks of {len(ordered)} different jobs, saving each")
+        output_paths = []
+        for assembler in ordered:
+            if not assembler.complete:
+                print(f"Warning: Some chunks are missing ({assembler.missing() or 'last chunk'}), "
+                      f"the extracted file will be incomplete")
+            file_name = assembler.file_name or "extracted_file.txt"  # Default filename
+            output_file_path = workspace.output_file(file_name)
+            print(f"\nSaving to: {output_file_path}")
             try:
-                # Safely evaluate the string representation of bytes
-                raw = eval(raw)
-                if isinstance(raw, bytes):
-                    raw = raw.decode('utf-8', errors='replace')
-            except:
-                # If evaluation fails, clean up the string manually
-                if raw.startswith("b'"):
-                    raw = raw[2:-1]  # Remove b' and '
-                raw = raw.replace('\\n', '\n')  # Convert escaped newlines
-        
-        # Clean up any remaining byte string markers or special characters
-        if isinstance(raw, str):
-            # Remove any remaining byte string markers
-            raw = raw.replace("b'", "").replace("'", "")
-            # Convert any remaining escaped characters
-            raw = raw.encode().decode('unicode_escape')
-            # Split into lines and preserve empty lines
-            lines = raw.splitlines()
-            # Clean up each line while preserving empty lines
-            cleaned_lines = []
-            for line in lines:
-                if line.strip() == '':  # Preserve empty lines
-                    cleaned_lines.append('')
-                else:
-                    cleaned_lines.append(line.strip())
-            # Join lines back together with newlines
-            return '\n'.join(cleaned_lines)
-        
-        return str(raw)
+                with control.span('reassemble', bytes=os.path.getsize(assembler.path), chunks=len(assembler.chunk_ids)):
+                    output_paths.append(workspace.commit(assembler.path, file_name))
+                print(f"\n=== Extraction successful! File saved to: {output_paths[-1]} ===")
+            except Exception as e:
+                print(f"Error writing output file: {str(e)}")
+                import traceback
+                traceback.print_exc()
+        return output_paths[0] if output_paths else None
@@ -0,0 +1,97 @@
+import hashlib
+import numpy as np
+
+
+class Scatter_Index:
+    """Keyed orderings of carrier positions for scatter embedding.
+
+    Sequential embedding fills a carrier from its first value on, so the
+    data sits in one block at the start of the image, PCM or frame. In
+    scatter mode bit i of the framed payload goes to value order(i)
+    instead, where order is a keyed bijection of the carrier's positions:
+    a balanced Feistel network over the smallest even-width bit range that
+    covers them, cycle-walked back into range, with round keys derived
+    from a password-derived key and the carrier shape.
+
+    order(i) is computed for each i on its own (vectorized over a range of
+    slots), so embedding and extraction only evaluate the positions the
+    frame occupies: the cost grows with the payload, not the carrier.
+    """
+
+    # The key has to be derived before anything is read from the carrier,
+    # so it cannot use the per-job salt stored in the chunk headers
+    SALT = b'Lsb_Engine scatter index'
+    ROUNDS = 4
+    # Round function per lane type: xorshift-multiply finalizers (murmur3
+    # fmix32, splitmix64) as (shift, multiplier, shift, multiplier, shift)
+    MIXERS = {
+        np.uint32: (16, 0x85EBCA6B, 13, 0xC2B2AE35, 16),
+        np.uint64: (30, 0xBF58476D1CE4E5B9, 27, 0x94D049BB133111EB, 31),
+    }
+
+    @classmethod
+    def key_for(cls, password: str) -> bytes:
+        """Derive the scatter key for a password (scrypt, shared with Encrypter's key cache)."""
+        from Encrypter import Encrypter
+        return Encrypter.derive_key(password, cls.SALT)
+
+    @classmethod
+    def _round_keys(cls, shape, key: bytes, lane) -> np.ndarray:
+        digest = hashlib.shake_256(key + repr(shape).encode()).digest(8 * cls.ROUNDS)
+        return np.frombuffer(digest, dtype='<u8').astype(lane)
+
+    @classmethod
+    def _feistel(cls, values: np.ndarray, half_bits: int, round_keys: np.ndarray) -> np.ndarray:
+        """Keyed bijection of [0, 4 ** half_bits) applied to every value (in lanes of round_keys' type)."""
+        lane = round_keys.dtype.type
+        shift1, multiplier1, shift2, multiplier2, shift3 = cls.MIXERS[lane]
+        half, mask = lane(half_bits), lane((1 << half_bits) - 1)
+        left, right = values >> half, values & mask
+        for round_key in round_keys:
+            mixed = right ^ round_key
+            mixed ^= mixed >> lane(shift1)
+            mixed *= lane(multiplier1)
+            mixed ^= mixed >> lane(shift2)
+            mixed *= lane(multiplier2)
+            mixed ^= mixed >> lane(shift3)
+            mixed &= mask
+            mixed ^= left
+            left, right = right, mixed
+        return (left << half) | right
+
+    @classmethod
+    def positions(cls, shape, key: bytes, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        Keyed positions of slots start to stop of a carrier.
+
+        Args:
+            shape: Shape of the carrier's value array; positions index its
+                flattened (row-major) form
+            key: Key from key_for()
+            start: First slot (payload bit or symbol index)
+            stop: End of the slot range (default: every position)
+
+        Returns:
+            np.ndarray: int64 array of distinct indices below prod(shape);
+                the same slot always maps to the same index for a given
+                shape and key, and distinct slots to distinct indices
+        """
+        shape = tuple(int(n) for n in shape)
+        count = int(np.prod(shape, dtype=np.int64))
+        stop = count if stop is None else min(int(stop), count)
+        start = min(int(start), stop)
+        if count <= 1:
+            return np.arange(start, stop, dtype=np.int64)
+
+        half_bits = ((count - 1).bit_length() + 1) // 2
+        # 32-bit lanes whenever the cipher's range fits, they are twice as fast
+        lane = np.uint32 if half_bits <= 16 else np.uint64
+        round_keys = cls._round_keys(shape, key, lane)
+        order = cls._feistel(np.arange(start, stop, dtype=lane), half_bits, round_keys)
+        # The cipher's range is under 4 * count, so a few walks bring every
+        # value back below count; walking a cycle keeps the map a bijection
+        pending = np.flatnonzero(order >= count)
+        while len(pending):
+            order[pending] = cls._feistel(order[pending], half_bits, round_keys)
+            pending = pending[order[pending] >= count]
+        return order.astype(np.int64)
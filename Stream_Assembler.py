@@ -0,0 +1,84 @@
+import os
+import threading
+
+
+class Stream_Assembler:
+    """Reassembles one job's hidden file directly on disk.
+
+    Each chunk is written at its offset in a scratch file as soon as it has
+    been extracted and checked, in whatever order the carriers finish, so
+    at most the chunks currently in flight are held in memory. The file is
+    preallocated to its full size once the last chunk (which fixes the
+    size) has arrived.
+
+    add() may be called from several threads at once. Where os.pwrite is
+    missing (Windows), chunks are written with a seek and a write under the
+    assembler's lock instead.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Scratch file to assemble into (e.g. from Workspace.temp_path)
+        """
+        self.path = path
+        self.file_name = None
+        self.size = None
+        self.last_id = None
+        self.chunk_ids = set()
+        # O_BINARY (Windows only) keeps newline bytes from being translated
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        self._lock = threading.Lock()
+
+    def add(self, chunk):
+        """
+        Write a parsed (CRC-checked and, if needed, decrypted) chunk in place.
+
+        Returns:
+            bool: False if a chunk with the same id was already written
+        """
+        with self._lock:
+            if chunk.chunk_id in self.chunk_ids:
+                return False
+            self.chunk_ids.add(chunk.chunk_id)
+            if chunk.chunk_id == 0 and chunk.file_name:
+                self.file_name = os.path.basename(chunk.file_name)
+            if chunk.is_last:
+                self.last_id = chunk.chunk_id
+                self.size = chunk.offset + chunk.length
+                if hasattr(os, 'posix_fallocate') and self.size:
+                    os.posix_fallocate(self._fd, 0, self.size)
+        if hasattr(os, 'pwrite'):
+            self._write(chunk.payload, chunk.offset, os.pwrite)
+        else:
+            with self._lock:
+                os.lseek(self._fd, chunk.offset, os.SEEK_SET)
+                self._write(chunk.payload, chunk.offset, lambda fd, data, _: os.write(fd, data))
+        return True
+
+    def _write(self, payload, position, write):
+        """Write all of payload at position with write(fd, data, position), which may write partially."""
+        view = memoryview(payload)
+        while view:
+            written = write(self._fd, view, position)
+            view = view[written:]
+            position += written
+
+    @property
+    def complete(self):
+        """Whether every chunk from 0 to the last one has been written."""
+        return self.last_id is not None and self.chunk_ids == set(range(self.last_id + 1))
+
+    def missing(self):
+        """Chunk ids known to be missing (all ids below the highest one seen that never arrived)."""
+        highest = self.last_id if self.last_id is not None else max(self.chunk_ids, default=-1)
+        return sorted(set(range(highest + 1)) - self.chunk_ids)
+
+    def close(self):
+        """Trim the file to its final size (if known) and close it."""
+        if self._fd is None:
+            return
+        if self.size is not None:
+            os.ftruncate(self._fd, self.size)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,126 @@
+import json
+import time
+import uuid
+import threading
+
+
+class _Span:
+    """One timed stage. Created by Tracer.span(); use as a context manager."""
+
+    __slots__ = ('tracer', 'record', '_wall', '_cpu')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.record = {'name': name, 'id': uuid.uuid4().hex[:16], 'parent': None, 'bytes': None}
+        self.record.update(attrs)
+
+    def set(self, **attrs):
+        """Add attributes (e.g. bytes=...) once they are known."""
+        self.record.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.record['parent'] = stack[-1].record['id']
+        stack.append(self)
+        self.record['start'] = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record['wall_s'] = round(time.perf_counter() - self._wall, 6)
+        # CPU time of this thread only; subprocesses are recorded as their own spans
+        self.record['cpu_s'] = round(time.thread_time() - self._cpu, 6)
+        if exc_type is not None:
+            self.record['error'] = exc_type.__name__
+        self.tracer._stack().pop()
+        self.tracer._emit(self.record)
+        return False
+
+
+class _Null_Span:
+    """Stand-in returned while tracing is off, so call sites need no checks."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _Null_Span()
+
+
+class Tracer:
+    """Collects timing spans for the stages of a job.
+
+    Stages used by Runner and the hiders: probe, decode, embed, extract,
+    encode, mux, write, verify, plus 'subprocess' for every external command,
+    'prepare'/'reassemble' for chunking and 'cache' for Output_Cache
+    lookups. Each finished span is a dict:
+
+        {'name', 'id', 'parent', 'start', 'wall_s', 'cpu_s', 'bytes',
+         'carrier', 'carrier_index', ...attributes, 'error' (if it raised)}
+
+    Spans are kept in memory (spans, summary()) and, if a sink is given,
+    written to it as JSON lines as they finish. Tracing is enabled by passing
+    a Tracer to Job_Control; without one, spans cost a method call.
+    """
+
+    def __init__(self, sink=None, keep=True):
+        """
+        Args:
+            sink: Optional path or writable text file for JSON lines
+            keep: Also keep finished spans in memory
+        """
+        self.spans = []
+        self.keep = keep
+        self._owns_sink = isinstance(sink, str)
+        self.sink = open(sink, 'a') if self._owns_sink else sink
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **attrs):
+        """Return a context manager timing one stage."""
+        return _Span(self, name, attrs)
+
+    def _emit(self, record):
+        with self._lock:
+            if self.keep:
+                self.spans.append(record)
+            if self.sink is not None:
+                self.sink.write(json.dumps(record, default=str) + '\n')
+                self.sink.flush()
+
+    def summary(self):
+        """Total wall time, CPU time, bytes and count per stage name."""
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for record in spans:
+            stage = stages.setdefault(record['name'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'bytes': 0})
+            stage['count'] += 1
+            stage['wall_s'] += record['wall_s']
+            stage['cpu_s'] += record['cpu_s']
+            stage['bytes'] += record['bytes'] or 0
+        for stage in stages.values():
+            stage['wall_s'] = round(stage['wall_s'], 6)
+            stage['cpu_s'] = round(stage['cpu_s'], 6)
+        return stages
+
+    def close(self):
+        if self._owns_sink and self.sink is not None:
+            self.sink.close()
+            self.sink = None
@@ -1,22 +1,133 @@
 import os
+import io
 import cv2
 import numpy as np
-import tempfile
-from mutagen.mp4 import MP4
+import shutil
+import subprocess
+from mutagen.mp4 import MP4, MP4FreeForm
 from mutagen import File as MutagenFile  # General purpose Mutagen file handler
+from Lsb_Engine import Lsb_Engine
+from Scatter_Index import Scatter_Index
+from Job_Control import Job_Control, Job_Cancelled
+from Workspace import Workspace
+from Memory_File import Memory_File
 
 class Video_Hider:
     # Define which formats support metadata (only MP4/MOV for now)
     METADATA_FORMATS = {'mp4', 'm4v', 'mov'}
     METADATA_TAG = 'steganography_data'
+    # Frames between progress reports / cancellation checks while re-encoding
+    PROGRESS_INTERVAL = 30
+    # Freeform MP4 atom, stores raw bytes without any text encoding
+    MP4_FREEFORM_KEY = '----:com.steganography:data'
+    LSB_BITS = 2
+    # ffmpeg options per encoder profile. Frames are re-encoded by OpenCV with
+    # the source FOURCC, which has no speed/size setting, so the profile only
+    # sets the AAC encoding used when the audio is muxed back in: 'fast'
+    # skips the rate search of ffmpeg's default 'twoloop' coder, 'balanced'
+    # keeps ffmpeg's default bitrate and 'smallest' lowers it (the LSB data
+    # is in the frames, so the audio bitrate never affects it)
+    ENCODER_PROFILES = {
+        'fast': ['-aac_coder', 'fast'],
+        'balanced': ['-aac_coder', 'twoloop'],
+        'smallest': ['-aac_coder', 'twoloop', '-b:a', '96k'],
+    }
+    # Keep muxer output reproducible (no encoder version strings, random
+    # segment UIDs or timestamps), so a cached output equals a fresh one
+    BITEXACT = ['-fflags', '+bitexact']
     
-    def __init__(self, host_file, hidden_data=None):
+    def __init__(self, host_file, hidden_data=None, control=None, workspace=None, encoder_profile='balanced',
+                 output=None, checkpoint_dir=None, scatter_key=None):
+        if encoder_profile not in self.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {encoder_profile}")
         self.host_file = host_file
         self.hidden_data = hidden_data
-        self.output_path = "output_files/"
-        
-        # Create output directory if it doesn't exist
-        os.makedirs(self.output_path, exist_ok=True)
+        self.control = control or Job_Control()
+        self.encoder_profile = encoder_profile
+        # Scratch files and outputs go through the workspace; a private one
+        # is created (and cleaned up after each call) if none is given
+        self.workspace = workspace or Workspace()
+        self._owns_workspace = workspace is None
+        self.output_path = self.workspace.output_path
+        # Writable binary file object; when set, hide_data() writes the stego
+        # video there instead of committing it to the output directory
+        self.output = output
+        self._spilled_path = None
+        # Directory (see Job_Journal) where the extracted audio, the
+        # re-encoded frames and the muxed video are kept once finished, so a
+        # resumed job restarts after the last finished stage
+        self.checkpoint_dir = checkpoint_dir
+        # Key from Scatter_Index.key_for(): the data is spread over the whole
+        # first frame in a keyed order instead of filling its top rows
+        self.scatter_key = scatter_key
+
+    @classmethod
+    def hide_bytes(cls, carrier, hidden_data, extension, output=None, **options):
+        """
+        Hide data in a video held in memory.
+
+        MP4 metadata is rewritten in memory. OpenCV can only read and write
+        video files by path, so LSB carriers are spilled to the (tmpfs)
+        workspace while they are re-encoded.
+
+        Args:
+            carrier: Video as bytes, memoryview or a readable binary file object
+            hidden_data: Data to hide
+            extension: Video format, e.g. 'mp4' or 'avi'
+            output: Optional writable binary file object for the stego video
+            **options: Passed to the constructor (control, workspace, encoder_profile...)
+
+        Returns:
+            bytes: The stego video, or output itself if one was given
+        """
+        sink = output if output is not None else io.BytesIO()
+        cls(Memory_File(carrier, extension), hidden_data, output=sink, **options).hide_data()
+        return output if output is not None else sink.getvalue()
+
+    @classmethod
+    def extract_bytes(cls, carrier, extension, **options):
+        """Extract hidden data from a video held in memory (see hide_bytes())."""
+        return cls(Memory_File(carrier, extension), b'', **options).extract_data()
+
+    def _carrier_path(self):
+        """Path of the carrier; an in-memory carrier is written to the workspace on first use."""
+        if self.host_file.file_path is not None:
+            return self.host_file.file_path
+        if self._spilled_path is None:
+            path = self.workspace.temp_path('carrier', '.' + self.host_file.file_extension)
+            with open(path, 'wb') as f:
+                f.write(self.host_file.file_content)
+            self._spilled_path = path
+        return self._spilled_path
+
+    def _stage_path(self, name, extension):
+        """Path to write an intermediate file to: a checkpoint staging file, or a scratch file."""
+        if self.checkpoint_dir is None:
+            return self.workspace.temp_path(name, extension)
+        return os.path.join(self.checkpoint_dir, f".{name}.part{extension}")
+
+    def _finish_stage(self, path, name, extension):
+        """Keep a finished intermediate file as a checkpoint; return its path."""
+        if self.checkpoint_dir is None:
+            return path
+        finished = os.path.join(self.checkpoint_dir, name + extension)
+        os.replace(path, finished)
+        return finished
+
+    def _finished_stage(self, name, extension):
+        """Intermediate file kept by an earlier, interrupted run, or None."""
+        if self.checkpoint_dir is None:
+            return None
+        finished = os.path.join(self.checkpoint_dir, name + extension)
+        return finished if os.path.exists(finished) else None
+
+    def _commit(self, temp_path, name):
+        """Move a finished scratch file to the output directory, or copy it into the output stream."""
+        if self.output is None:
+            return self.workspace.commit(temp_path, name)
+        with open(temp_path, 'rb') as f:
+            shutil.copyfileobj(f, self.output)
+        return self.output
 
     def _get_metadata_handler(self, file_path):
         """Get the appropriate metadata handler for the file type."""
@@ -33,257 +144,345 @@ class Video_Hider:
             print(f"Warning: Could not create metadata handler: {e}")
             return None
             
+    def capacity(self):
+        """Number of payload bytes this carrier can hold, or None if there is no fixed limit."""
+        if self.host_file.file_extension.lower() in self.METADATA_FORMATS:
+            return None
+        video = cv2.VideoCapture(self._carrier_path())
+        width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        video.release()
+        return Lsb_Engine.capacity(width * height * 3, self.LSB_BITS)
+
+    def memory_estimate(self):
+        """
+        Estimated peak memory of hiding in (or extracting from) this carrier.
+
+        Frames are streamed on every path, so both estimates are the same.
+
+        Returns:
+            tuple: (in-memory path, streaming path) in bytes
+        """
+        if self.host_file.file_extension.lower() in self.METADATA_FORMATS:
+            data_size = len(self._data_bytes()) if self.hidden_data else 0
+            return 2 * data_size, 2 * data_size
+        video = cv2.VideoCapture(self._carrier_path())
+        frame = int(video.get(cv2.CAP_PROP_FRAME_WIDTH)) * int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)) * 3
+        video.release()
+        # Decoded frame, its flattened copy, the embedded frame and the writer's
+        # buffer, plus the positions of the symbols a frame takes when
+        # scattering (8 bytes each, twice while generated)
+        estimate = 4 * frame
+        if self.scatter_key is not None:
+            symbols = frame // self.LSB_BITS
+            if self.hidden_data:
+                symbols = min(symbols, -(-len(Lsb_Engine.frame(self._data_bytes())) * 8 // self.LSB_BITS))
+            estimate += 16 * symbols
+        return estimate, estimate
+
+    def _data_bytes(self):
+        """Return the hidden data as bytes."""
+        if isinstance(self.hidden_data, str):
+            return self.hidden_data.encode('utf-8')
+        return bytes(self.hidden_data)
+
+    def _positions(self, frame, count):
+        """Scatter positions of the first count symbols of a frame, or None for sequential embedding."""
+        if self.scatter_key is None:
+            return None
+        return Scatter_Index.positions(frame.shape, self.scatter_key, 0, count)
+
     def _encode_lsb(self, frame, data):
         """Encode data into the least significant bits of the frame (for lossless formats)."""
-        # Convert data to binary and add termination marker
-        binary_data = ''.join(format(byte, '08b') for byte in data) + '00000000'  # Null terminator
-        
-        # Flatten the frame and ensure we have enough space
-        flat_frame = frame.flatten()
-        max_bits = len(flat_frame) * 2  # Using 2 LSBs per channel
-        
-        if len(binary_data) > max_bits:
-            raise ValueError(f"Data too large for video frame. Max: {max_bits//8} bytes")
-        
-        # Encode data in the frame
-        for i in range(len(binary_data) // 2):
-            # Get the next 2 bits of data
-            bits = binary_data[i*2:(i+1)*2].ljust(2, '0')
-            
-            # Clear the 2 LSBs and set them to our data bits
-            flat_frame[i] = (flat_frame[i] & 0xFC) | int(bits, 2)
-        
+        flat_frame = frame.reshape(-1).copy()
+        symbols = -(-len(Lsb_Engine.frame(data)) * 8 // self.LSB_BITS)
+        try:
+            Lsb_Engine.embed(flat_frame, data, bits_per_value=self.LSB_BITS,
+                             positions=self._positions(frame, symbols))
+        except ValueError as e:
+            raise ValueError(f"Data too large for video frame. "
+                             f"Max: {Lsb_Engine.capacity(flat_frame.size, self.LSB_BITS)} bytes") from e
         return flat_frame.reshape(frame.shape)
     
     def _decode_lsb(self, frame):
         """Extract data from the least significant bits of the frame."""
-        flat_frame = frame.flatten()
-        binary_data = ''
-        
-        # Read 2 LSBs from each channel until we find the null terminator
-        for i in range(0, len(flat_frame), 2):
-            # Get 2 LSBs and convert to binary string
-            lsb = flat_frame[i] & 0x03  # Get last 2 bits
-            binary_data += f"{lsb:02b}"
-            
-            # Check for null terminator (8 consecutive zeros)
-            if len(binary_data) >= 8 and binary_data[-8:] == '00000000':
-                break
-        
-        # Convert binary data to bytes
-        data = bytearray()
-        for i in range(0, len(binary_data)-8, 8):  # Skip the null terminator
-            byte = binary_data[i:i+8]
-            data.append(int(byte, 2))
-        
-        return bytes(data) if data else b''
+        flat_frame = frame.reshape(-1)
+        if self.scatter_key is None:
+            return Lsb_Engine.extract(flat_frame, bits_per_value=self.LSB_BITS)
+        # Only the positions the frame's data occupies are generated
+        return Lsb_Engine.extract_prefix(lambda count: flat_frame[self._positions(frame, count)],
+                                         flat_frame.size, self.LSB_BITS)
 
     def hide_data(self):
         """Hide data in the video, using metadata for lossy formats and LSB for lossless."""
         if not self.hidden_data:
             raise ValueError("No data provided to hide")
-            
+        try:
+            return self._hide_data()
+        finally:
+            if self._owns_workspace:
+                self.workspace.cleanup()
+
+    def _hide_data(self):
         # Create output filename with _stego suffix
-        base_name = os.path.splitext(self.host_file.file_name)[0]
-        output_file = os.path.join(self.output_path, f"{base_name}_stego{os.path.splitext(self.host_file.file_name)[1]}")
+        base_name, extension = os.path.splitext(self.host_file.file_name)
+        output_name = f"{base_name}_stego{extension}"
         
         # For formats that support metadata
         if self.host_file.file_extension.lower() in self.METADATA_FORMATS:
-            # First, copy the file to the output location
-            import shutil
-            shutil.copy2(self.host_file.file_path, output_file)
+            # First, copy the file to a scratch location (or a buffer, for in-memory outputs)
+            with self.control.span('write', bytes=self.host_file.file_size):
+                if self.output is not None:
+                    temp_copy = io.BytesIO()
+                    if self.host_file.file_path is None:
+                        temp_copy.write(self.host_file.file_content)
+                    else:
+                        with open(self.host_file.file_path, 'rb') as f:
+                            shutil.copyfileobj(f, temp_copy)
+                    temp_copy.seek(0)
+                else:
+                    temp_copy = self.workspace.temp_path('metadata', extension)
+                    shutil.copy2(self._carrier_path(), temp_copy)
             
             # Now add metadata
             try:
-                handler = self._get_metadata_handler(output_file)
+                handler = self._get_metadata_handler(temp_copy)
                 if not handler:
                     raise ValueError(f"Unsupported video format for metadata: {self.host_file.file_extension}")
                 
-                # Convert data to string if it's bytes
-                data_str = self.hidden_data if isinstance(self.hidden_data, str) else self.hidden_data.decode('utf-8', errors='replace')
-                
-                # For MP4 files, use the '\xa9xyz' format for custom tags
-                if isinstance(handler, MP4):
-                    handler.tags['\xa9cmt'] = data_str  # Using comment field for storage
-                else:
-                    # For other formats, try to use our custom tag
-                    try:
-                        handler.tags[self.METADATA_TAG] = data_str
-                    except Exception:
-                        # If custom tag fails, use a standard field
-                        handler.tags['comment'] = data_str
-                
-                handler.save()
-                return output_file
+                data_bytes = self._data_bytes()
+                with self.control.span('embed', bytes=len(data_bytes)):
+                    if handler.tags is None:
+                        handler.add_tags()
+
+                    # For MP4 files, store the raw bytes in a freeform atom
+                    if isinstance(handler, MP4):
+                        handler.tags[self.MP4_FREEFORM_KEY] = [MP4FreeForm(data_bytes)]
+                    else:
+                        data_str = data_bytes.decode('utf-8', errors='replace')
+                        # For other formats, try to use our custom tag
+                        try:
+                            handler.tags[self.METADATA_TAG] = data_str
+                        except Exception:
+                            # If custom tag fails, use a standard field
+                            handler.tags['comment'] = data_str
+
+                    handler.save(temp_copy)
+                with self.control.trace('write'):
+                    if self.output is not None:
+                        self.output.write(temp_copy.getvalue())
+                        return self.output
+                    return self.workspace.commit(temp_copy, output_name)
                 
+            except Job_Cancelled:
+                raise
             except Exception as e:
                 # If metadata fails, try LSB as fallback
                 print(f"Warning: Metadata storage failed, falling back to LSB: {e}")
                 self.is_lossy = False
         
         # For lossless formats or if metadata failed, use LSB
-        video = cv2.VideoCapture(self.host_file.file_path)
+        video = cv2.VideoCapture(self._carrier_path())
+        try:
+            final_output = self._encode_video(video, extension)
+        finally:
+            video.release()
         
+        # Copy original file metadata if possible
+        if shutil.which('ffmpeg'):
+            # Use ffmpeg to copy metadata if available
+            temp_meta = self.workspace.temp_path('with_metadata', extension)
+            try:
+                with self.control.span('mux'):
+                    self.control.run_subprocess([
+                        'ffmpeg', '-y',
+                        '-i', self._carrier_path(),      # Source for metadata
+                        '-i', final_output,              # Source for content
+                        '-map', '1',                    # Use all streams from second input
+                        '-map_metadata', '0',           # Copy metadata from first input
+                        '-c', 'copy',                   # Stream copy (no re-encoding)
+                        *self.BITEXACT,
+                        temp_meta
+                    ])
+                final_output = temp_meta
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                print(f"Warning: Could not copy metadata: {e}")
+        
+        # Move the finished file to the final location
+        self.control.check()
+        with self.control.span('write', bytes=os.path.getsize(final_output)):
+            return self._commit(final_output, output_name)
+
+    def _encode_video(self, video, extension):
+        """Re-encode the video with the data in its first frame.
+
+        Returns:
+            str: Scratch (or checkpoint) path of the encoded video, with audio if it had any
+        """
         # Get video properties
         fps = video.get(cv2.CAP_PROP_FPS)
         width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
-        # Get audio stream information
-        has_audio = False
-        audio_stream = None
-        
-        # Try to extract audio using ffmpeg if available
-        if shutil.which('ffmpeg'):
-            try:
-                import subprocess
-                temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_audio.close()
-                
-                # Extract audio using ffmpeg
-                subprocess.run([
-                    'ffmpeg', '-y', '-i', self.host_file.file_path,
-                    '-vn', '-acodec', 'pcm_s16le', '-ar', '44100', '-ac', '2',
-                    temp_audio.name
-                ], check=True, capture_output=True)
-                
-                if os.path.exists(temp_audio.name) and os.path.getsize(temp_audio.name) > 0:
-                    has_audio = True
-                    audio_stream = temp_audio.name
-            except Exception as e:
-                print(f"Warning: Could not extract audio: {e}")
-                if os.path.exists(temp_audio.name):
-                    os.remove(temp_audio.name)
-        
-        # Read the first frame
-        ret, frame = video.read()
-        if not ret:
-            raise ValueError("Could not read video file")
-        
-        # Convert data to bytes if it's a string
-        data_bytes = self.hidden_data if isinstance(self.hidden_data, bytes) else self.hidden_data.encode('utf-8')
-        
+        # Frames and audio are only decoded for the stages not already
+        # finished by an interrupted run
+        temp_output = self._finished_stage('video', extension)
+        with self.control.span('decode') as span:
+            audio_stream = self._finished_stage('audio', '.wav')
+            span.set(resumed=temp_output is not None or audio_stream is not None)
+            if audio_stream is None and shutil.which('ffmpeg'):
+                temp_audio = self._stage_path('audio', '.wav')
+                try:
+                    # Extract audio using ffmpeg
+                    self.control.run_subprocess([
+                        'ffmpeg', '-y', '-i', self._carrier_path(),
+                        '-vn', '-acodec', 'pcm_s16le', '-ar', '44100', '-ac', '2',
+                        temp_audio
+                    ])
+
+                    if os.path.exists(temp_audio) and os.path.getsize(temp_audio) > 0:
+                        audio_stream = self._finish_stage(temp_audio, 'audio', '.wav')
+                except Job_Cancelled:
+                    raise
+                except Exception as e:
+                    print(f"Warning: Could not extract audio: {e}")
+
+            if temp_output is None:
+                # Read the first frame
+                ret, frame = video.read()
+                if not ret:
+                    raise ValueError("Could not read video file")
+                span.set(bytes=frame.nbytes)
+
+        if temp_output is None:
+            temp_output = self._encode_frames(video, frame, extension, fps, width, height)
+
+        # If we have audio, merge it with the video
+        if audio_stream is None:
+            return temp_output
+        muxed = self._finished_stage('muxed', extension)
+        if muxed is not None:
+            return muxed
+        temp_with_audio = self._stage_path('muxed', extension)
+        try:
+            # Use ffmpeg to merge video and audio
+            with self.control.span('mux', profile=self.encoder_profile):
+                self.control.run_subprocess([
+                    'ffmpeg', '-y',
+                    '-i', temp_output,       # Video input
+                    '-i', audio_stream,      # Audio input
+                    '-c:v', 'copy',          # Copy video stream
+                    '-c:a', 'aac',           # Encode audio as AAC
+                    *self.ENCODER_PROFILES[self.encoder_profile],
+                    '-strict', 'experimental',
+                    '-map', '0:v:0',         # Use video from first input
+                    '-map', '1:a:0',         # Use audio from second input
+                    '-shortest',             # Match the shorter of the inputs
+                    *self.BITEXACT, '-flags:a', '+bitexact',
+                    temp_with_audio
+                ])
+            return self._finish_stage(temp_with_audio, 'muxed', extension)
+        except Job_Cancelled:
+            raise
+        except Exception as e:
+            print(f"Warning: Could not merge audio: {e}")
+            return temp_output
+
+    def _encode_frames(self, video, frame, extension, fps, width, height):
+        """Write the video again with the data in its first frame (frame), without audio.
+
+        Returns:
+            str: Path of the encoded video
+        """
         # Encode data in the first frame
-        frame_with_data = self._encode_lsb(frame, data_bytes)
+        with self.control.span('embed', bytes=len(self._data_bytes())):
+            frame_with_data = self._encode_lsb(frame, self._data_bytes())
         
-        # Create a temporary file for the output video
-        temp_output = tempfile.NamedTemporaryFile(suffix=os.path.splitext(self.host_file.file_name)[1], delete=False)
-        temp_output.close()
+        # Scratch file for the output video
+        temp_output = self._stage_path('video', extension)
         
         # Get the original codec and create VideoWriter with the same properties
         fourcc = int(video.get(cv2.CAP_PROP_FOURCC))
         is_color = len(frame.shape) == 3 and frame.shape[2] > 1
         out = cv2.VideoWriter(
-            temp_output.name,
+            temp_output,
             fourcc,
             fps,
             (width, height),
             is_color
         )
         
-        out.write(frame_with_data)
-        
-        # Write the rest of the frames
-        while True:
-            ret, frame = video.read()
-            if not ret:
-                break
-            out.write(frame)
-        
-        # Release resources
-        video.release()
-        out.release()
-        
-        # If we have audio, merge it with the video
-        final_output = temp_output.name
-        if has_audio and audio_stream:
+        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        with self.control.trace('encode') as span:
             try:
-                temp_with_audio = tempfile.NamedTemporaryFile(suffix=os.path.splitext(self.host_file.file_name)[1], delete=False)
-                temp_with_audio.close()
-                
-                # Use ffmpeg to merge video and audio
-                subprocess.run([
-                    'ffmpeg', '-y',
-                    '-i', temp_output.name,  # Video input
-                    '-i', audio_stream,      # Audio input
-                    '-c:v', 'copy',          # Copy video stream
-                    '-c:a', 'aac',           # Encode audio as AAC
-                    '-strict', 'experimental',
-                    '-map', '0:v:0',         # Use video from first input
-                    '-map', '1:a:0',         # Use audio from second input
-                    '-shortest',             # Match the shorter of the inputs
-                    temp_with_audio.name
-                ], check=True, capture_output=True)
-                
-                final_output = temp_with_audio.name
-            except Exception as e:
-                print(f"Warning: Could not merge audio: {e}")
-        
-        # Move the temporary file to the final location
-        if os.path.exists(output_file):
-            os.remove(output_file)  # Remove if output file already exists
-        shutil.move(final_output, output_file)
-        
-        # Clean up temporary files
-        if has_audio and audio_stream and os.path.exists(audio_stream):
-            os.remove(audio_stream)
-        if os.path.exists(temp_output.name):
-            os.remove(temp_output.name)
-        
-        # Copy original file metadata if possible
-        try:
-            if shutil.which('ffmpeg'):
-                # Use ffmpeg to copy metadata if available
-                temp_meta = tempfile.NamedTemporaryFile(suffix=os.path.splitext(self.host_file.file_name)[1], delete=False)
-                temp_meta.close()
-                try:
-                    subprocess.run([
-                        'ffmpeg', '-y',
-                        '-i', self.host_file.file_path,  # Source for metadata
-                        '-i', output_file,               # Source for content
-                        '-map', '1',                    # Use all streams from second input
-                        '-map_metadata', '0',           # Copy metadata from first input
-                        '-c', 'copy',                   # Stream copy (no re-encoding)
-                        temp_meta.name
-                    ], check=True, capture_output=True)
-                    shutil.move(temp_meta.name, output_file)
-                except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                    if os.path.exists(temp_meta.name):
-                        os.remove(temp_meta.name)
-                    print(f"Warning: Could not copy metadata: {e}")
-        except Exception as e:
-            print(f"Warning: Error during metadata copy: {e}")
-        
-        return output_file
+                self.control.report('encode', 0.0)
+                out.write(frame_with_data)
+
+                # Write the rest of the frames
+                written = 1
+                while True:
+                    ret, frame = video.read()
+                    if not ret:
+                        break
+                    out.write(frame)
+                    written += 1
+                    if written % self.PROGRESS_INTERVAL == 0:
+                        self.control.check()
+                        self.control.report('encode', written / total_frames if total_frames else None)
+            finally:
+                out.release()
+            span.set(bytes=written * frame_with_data.nbytes, frames=written)
+        return self._finish_stage(temp_output, 'video', extension)
 
     def extract_data(self):
         """Extract data from the video, checking metadata first, then LSB."""
+        try:
+            return self._extract_data()
+        finally:
+            if self._owns_workspace:
+                self.workspace.cleanup()
+
+    def peek_data(self):
+        """Extract hidden data for verification.
+
+        extract_data() already reads only the metadata atoms or the first
+        frame, so there is nothing cheaper to do.
+        """
+        return self.extract_data()
+
+    def _extract_data(self):
         # First try metadata for supported formats
         if self.host_file.file_extension.lower() in self.METADATA_FORMATS:
             try:
-                handler = self._get_metadata_handler(self.host_file.file_path)
+                source = self.host_file.file_path or self.host_file.open()
+                handler = self._get_metadata_handler(source)
                 if handler:
+                    tags = handler.tags or {}
                     # Check the same fields we might have used to store the data
-                    if isinstance(handler, MP4) and '\xa9cmt' in handler.tags:
-                        return handler.tags['\xa9cmt'][0]  # Return first comment
-                    elif hasattr(handler, 'tags') and self.METADATA_TAG in handler.tags:
-                        return handler.tags[self.METADATA_TAG]
-                    elif hasattr(handler, 'tags') and 'comment' in handler.tags:
-                        return handler.tags['comment']
+                    if isinstance(handler, MP4) and self.MP4_FREEFORM_KEY in tags:
+                        return bytes(tags[self.MP4_FREEFORM_KEY][0])
+                    elif self.METADATA_TAG in tags:
+                        return str(tags[self.METADATA_TAG]).encode('utf-8')
+                    elif 'comment' in tags:
+                        return str(tags['comment']).encode('utf-8')
             except Exception as e:
                 print(f"Warning: Metadata extraction failed, trying LSB: {e}")
         
         # If metadata not found or failed, try LSB
-        video = cv2.VideoCapture(self.host_file.file_path)
-        
-        # Read the first frame
-        ret, frame = video.read()
-        video.release()
-        
+        with self.control.span('decode'):
+            video = cv2.VideoCapture(self._carrier_path())
+
+            # Read the first frame
+            ret, frame = video.read()
+            video.release()
+
         if not ret:
-            return "(Error reading video file)"
-        
+            print("Warning: Could not read video file")
+            return b''
+
         # Extract data from the frame
-        data = self._decode_lsb(frame)
-        return data.decode('utf-8', errors='replace') if data else "(No hidden message found)"
+        with self.control.span('extract') as span:
+            data = self._decode_lsb(frame)
+            span.set(bytes=len(data))
+        return data
 
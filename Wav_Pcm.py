@@ -0,0 +1,140 @@
+import io
+import struct
+import numpy as np
+
+
+class Wav_Pcm:
+    """Sample format of a WAV file, and reading and writing of its samples.
+
+    The wave module only handles integer PCM, and before Python 3.12 not
+    WAVE_FORMAT_EXTENSIBLE, which 24-bit and multichannel files use. This
+    covers 8/16/24/32-bit integer and 32/64-bit float PCM, plain or
+    extensible. Stego files are written with the carrier's own fmt chunk,
+    so they keep its exact sample format; chunks other than fmt, fact and
+    data are not carried over.
+
+    Samples are interleaved, frame by frame and channel by channel.
+    lsb_view() maps them to the byte that holds each sample's least
+    significant bit: the low byte of little-endian integers (above any
+    padding bits of a wider container) and the low mantissa byte of floats.
+    """
+
+    WAVE_FORMAT_PCM = 0x0001
+    WAVE_FORMAT_IEEE_FLOAT = 0x0003
+    WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+    # Bytes per sample each encoding supports
+    SAMPLE_WIDTHS = {
+        WAVE_FORMAT_PCM: (1, 2, 3, 4),
+        WAVE_FORMAT_IEEE_FLOAT: (4, 8),
+    }
+    # Chunk header: id and size
+    CHUNK = struct.Struct('<4sI')
+
+    def __init__(self, fmt: bytes):
+        """
+        Args:
+            fmt: Body of the file's fmt chunk
+
+        Raises:
+            ValueError: If the sample encoding is not supported
+        """
+        if len(fmt) < 16:
+            raise ValueError("Malformed WAV: fmt chunk is too short")
+        self.fmt = bytes(fmt)
+        tag, self.channels, self.sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', self.fmt[:16])
+        self.valid_bits = bits
+        self.encoding = tag
+        if tag == self.WAVE_FORMAT_EXTENSIBLE and len(self.fmt) >= 40:
+            # The sub-format GUID starts with the actual format tag
+            self.valid_bits = struct.unpack('<H', self.fmt[18:20])[0] or bits
+            self.encoding = struct.unpack('<H', self.fmt[24:26])[0]
+        self.sample_width = block_align // self.channels if self.channels else 0
+        if (self.encoding not in self.SAMPLE_WIDTHS or self.sample_width not in self.SAMPLE_WIDTHS[self.encoding]
+                or block_align != self.channels * self.sample_width):
+            raise ValueError(f"Unsupported WAV encoding: format {tag:#06x}, {bits} bits, {self.channels} channels")
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def is_float(self) -> bool:
+        return self.encoding == self.WAVE_FORMAT_IEEE_FLOAT
+
+    @classmethod
+    def read_header(cls, src):
+        """
+        Read the headers of a WAV file up to its samples.
+
+        Args:
+            src: Readable, seekable binary file object positioned at the start of the WAV
+
+        Returns:
+            tuple: (Wav_Pcm, frame count); src is left at the first sample
+
+        Raises:
+            ValueError: If src is not a WAV file or its encoding is not supported
+        """
+        header = src.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:] != b'WAVE':
+            raise ValueError("Not a WAV file")
+        fmt = None
+        while True:
+            chunk = src.read(cls.CHUNK.size)
+            if len(chunk) < cls.CHUNK.size:
+                raise ValueError("Malformed WAV: no data chunk")
+            chunk_id, size = cls.CHUNK.unpack(chunk)
+            if chunk_id == b'data':
+                break
+            if chunk_id == b'fmt ':
+                fmt = src.read(size)
+                src.seek(size & 1, io.SEEK_CUR)
+            else:
+                src.seek(size + (size & 1), io.SEEK_CUR)
+        if fmt is None:
+            raise ValueError("Malformed WAV: data chunk before fmt chunk")
+        wav = cls(fmt)
+        # Streamed WAVs may give a placeholder size; never count past the end
+        start = src.tell()
+        size = min(size, src.seek(0, io.SEEK_END) - start)
+        src.seek(start)
+        return wav, size // wav.frame_bytes
+
+    def header(self, frame_count: int) -> bytes:
+        """Headers of a WAV file in this format holding frame_count frames (samples follow)."""
+        data_size = frame_count * self.frame_bytes
+        chunks = self.CHUNK.pack(b'fmt ', len(self.fmt)) + self.fmt + b'\0' * (len(self.fmt) & 1)
+        if struct.unpack('<H', self.fmt[:2])[0] != self.WAVE_FORMAT_PCM:
+            # Required for every format but plain PCM
+            chunks += self.CHUNK.pack(b'fact', 4) + struct.pack('<I', frame_count)
+        chunks += self.CHUNK.pack(b'data', data_size)
+        riff_size = 4 + len(chunks) + data_size + (data_size & 1)
+        return self.CHUNK.pack(b'RIFF', riff_size) + b'WAVE' + chunks
+
+    def padding(self, frame_count: int) -> bytes:
+        """Pad byte that ends the data chunk of frame_count frames, if it has an odd size."""
+        return b'\0' * (frame_count * self.frame_bytes & 1)
+
+    def write(self, dst, frames) -> None:
+        """Write a whole WAV file holding frames (sample bytes) to a binary file object."""
+        frame_count = len(frames) // self.frame_bytes
+        dst.write(self.header(frame_count))
+        dst.write(frames)
+        dst.write(self.padding(frame_count))
+
+    def lsb_view(self, frames) -> np.ndarray:
+        """
+        Map sample bytes to the bytes holding the sample LSBs.
+
+        Args:
+            frames: Sample bytes (bytes, bytearray or a uint8 array); whole
+                frames only are mapped
+
+        Returns:
+            np.ndarray: 1-D uint8 view with one entry per sample, in
+                interleaved order; writable if frames is
+        """
+        samples = frames if isinstance(frames, np.ndarray) else np.frombuffer(frames, dtype=np.uint8)
+        offset = 0 if self.is_float else max(0, self.sample_width * 8 - self.valid_bits) // 8
+        count = len(samples) // self.frame_bytes * self.channels
+        return samples[offset::self.sample_width][:count]
@@ -0,0 +1,459 @@
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import threading
+import http.client
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_decode_cache = None
+
+
+def _warm_worker(categories, decode_cache_bytes=0):
+    """Pool initializer: pay the heavy imports once per worker process."""
+    global _decode_cache
+    from Runner import Runner
+    if decode_cache_bytes:
+        from Decode_Cache import Decode_Cache
+        # Every worker maps the same files, so a carrier is decoded once per service
+        _decode_cache = Decode_Cache(max_bytes=decode_cache_bytes)
+    runner = Runner()
+    for category in categories:
+        try:
+            runner.get_hider_class(category)
+        except ImportError as e:
+            print(f"Warning: Could not preload {category} hider: {e}")
+
+
+def _execute_job(spec):
+    """Run one job inside a worker process and return a JSON-serializable result."""
+    from Runner import Runner
+    runner = Runner()
+    runner.decode_cache = _decode_cache
+    if spec.get('output_dir'):
+        runner.output_path = os.path.join(spec['output_dir'], '')
+    if spec.get('encoder_profile'):
+        runner.encoder_profile = spec['encoder_profile']
+    if spec.get('image_embedding'):
+        runner.image_embedding = spec['image_embedding']
+    if spec.get('verify'):
+        runner.verify_outputs = True
+    if spec.get('memory_budget'):
+        runner.memory_budget = spec['memory_budget']
+    if spec.get('scatter'):
+        runner.scatter = True
+    if spec.get('channel_bits'):
+        runner.channel_bits = list(spec['channel_bits'])
+    if spec.get('journal_dir'):
+        runner.journal_dir = spec['journal_dir']
+    if spec.get('cache_dir'):
+        from Output_Cache import Output_Cache
+        runner.output_cache = Output_Cache(spec['cache_dir'], max_bytes=spec.get('cache_max_bytes', 1024 ** 3))
+    password = spec.get('password')
+
+    if spec['type'] == 'hide':
+        carriers = [(path, percentage) for path, percentage in spec['carriers']]
+        return {'outputs': runner.run(spec['secret'], carriers, password=password,
+                                      job_name=spec.get('job_name'), manifest_path=spec.get('manifest_path'))}
+    if spec['type'] == 'extract':
+        output = runner.extract(spec['carrier_dir'], password=password)
+        if not output:
+            raise RuntimeError("Extraction failed")
+        return {'output': output}
+    if spec['type'] == 'plan':
+        carriers = [(path, percentage) for path, percentage in spec['carriers']]
+        return {'plan': runner.plan(spec['secret'], carriers, password=password)}
+    if spec['type'] == 'batch':
+        from Batch_Scheduler import Batch_Scheduler
+        return Batch_Scheduler(runner).run(spec['manifest'], spec['carrier_dir'], password=password,
+                                           plan_only=spec.get('plan_only', False))
+    if spec['type'] == 'verify':
+        return runner.verify(spec['stego_files'], password=password)
+    raise ValueError(f"Unknown job type: {spec['type']}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ('local', 0)
+
+
+class Worker_Service:
+    """Local daemon that runs Runner jobs on a pool of warm worker processes.
+
+    Jobs are submitted as JSON over HTTP, either on a localhost port or on a
+    Unix domain socket:
+
+        POST /jobs               submit {"type": "hide"|"extract"|"plan"|"verify"|"batch", ...}
+        GET  /jobs               list all jobs
+        GET  /jobs/<id>          job status and result
+        GET  /jobs/<id>/events   stream status changes as JSON lines until the job ends
+        GET  /health             pool and queue statistics
+
+    Finished jobs are kept for RETENTION_SECONDS, and at most MAX_FINISHED
+    of them; older ones are dropped as new jobs come in. If a worker process
+    dies, the jobs that were running on its pool fail and the pool is
+    replaced; a job that finds the pool already dead when it is handed over
+    never ran, so it goes to the new pool instead.
+    """
+
+    JOB_TYPES = {
+        'hide': ('secret', 'carriers'),
+        'extract': ('carrier_dir',),
+        'plan': ('secret', 'carriers'),
+        'verify': ('stego_files',),
+        'batch': ('manifest', 'carrier_dir'),
+    }
+    FINAL_STATES = ('done', 'failed')
+    # How long, and how many, finished jobs stay queryable
+    RETENTION_SECONDS = 3600
+    MAX_FINISHED = 1000
+    # Pools a job is handed to before it fails (each one found dead is replaced)
+    SUBMIT_ATTEMPTS = 3
+
+    def __init__(self, max_workers=None, max_queued=100, preload=('image', 'audio', 'video'),
+                 host='127.0.0.1', port=8765, socket_path=None, decode_cache_bytes=1024 ** 3):
+        """
+        Args:
+            max_workers: Worker processes, i.e. jobs running at once (default: CPU count)
+            max_queued: Jobs waiting for a worker before submissions are refused
+            preload: Carrier categories whose hider modules each worker imports up front
+            host, port: Address of the HTTP listener
+            socket_path: Listen on this Unix domain socket instead of host/port
+            decode_cache_bytes: Size of the Decode_Cache shared by the workers (0 disables it)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.preload = tuple(preload)
+        self.decode_cache_bytes = decode_cache_bytes
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.jobs = {}
+        self.changed = threading.Condition()
+        self.queue = queue.Queue()
+        self.slots = threading.Semaphore(self.max_workers)
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self.dispatcher = None
+        self.server = None
+
+    def _make_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_warm_worker,
+            initargs=(self.preload, self.decode_cache_bytes)
+        )
+
+    def _replace_pool(self, broken):
+        """Swap a broken pool for a new one (once, however many jobs noticed it)."""
+        with self._pool_lock:
+            if self.pool is not broken:
+                return
+            print("Warning: A worker process died, restarting the worker pool")
+            self.pool = self._make_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Start the worker pool and warm it up."""
+        self.pool = self._make_pool()
+        # Submitting no-ops forces every worker to start (and import) now
+        for future in [self.pool.submit(time.sleep, 0) for _ in range(self.max_workers)]:
+            future.result()
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.dispatcher is not None:
+            self.queue.put(None)
+            self.dispatcher.join()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _prune(self):
+        """Drop finished jobs past their retention (call with self.changed held)."""
+        finished = sorted((job['finished'], job_id) for job_id, job in self.jobs.items()
+                          if job['status'] in self.FINAL_STATES)
+        cutoff = time.time() - self.RETENTION_SECONDS
+        excess = len(finished) - self.MAX_FINISHED
+        for i, (finished_at, job_id) in enumerate(finished):
+            if finished_at >= cutoff and i >= excess:
+                break
+            del self.jobs[job_id]
+
+    def _counts(self):
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+        return counts
+
+    def _set_status(self, job_id, **fields):
+        with self.changed:
+            job = self.jobs[job_id]
+            job.update(fields)
+            job['version'] += 1
+            self.changed.notify_all()
+
+    def submit(self, spec):
+        """
+        Queue a job.
+
+        Returns:
+            str: The job id
+
+        Raises:
+            ValueError: If the job spec is invalid
+            OverflowError: If the queue is full
+        """
+        job_type = spec.get('type')
+        if job_type not in self.JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        missing = [field for field in self.JOB_TYPES[job_type] if field not in spec]
+        if missing:
+            raise ValueError(f"Missing fields for {job_type} job: {', '.join(missing)}")
+        from Runner import Runner
+        if spec.get('encoder_profile', 'balanced') not in Runner.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {spec['encoder_profile']}")
+        if spec.get('image_embedding', 'lsb') not in ('lsb', 'container'):
+            raise ValueError(f"Unknown image embedding: {spec['image_embedding']}")
+        channel_bits = spec.get('channel_bits')
+        if channel_bits is not None and (not isinstance(channel_bits, list) or not any(channel_bits)
+                                         or any(bits not in (0, 1) for bits in channel_bits)):
+            raise ValueError(f"Channel bit budgets must be a list of 0 or 1, with at least one 1: {channel_bits}")
+
+        with self.changed:
+            self._prune()
+            if self._counts()['queued'] >= self.max_queued:
+                raise OverflowError("Job queue is full")
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                'id': job_id, 'type': job_type, 'status': 'queued', 'version': 0,
+                'submitted': time.time(), 'started': None, 'finished': None,
+                'result': None, 'error': None,
+            }
+
+        self.queue.put((job_id, spec))
+        return job_id
+
+    def _dispatch(self):
+        """Hand queued jobs to the pool, never more than max_workers at once."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            job_id, spec = item
+            self.slots.acquire()
+            self._set_status(job_id, status='running', started=time.time())
+            for attempt in range(self.SUBMIT_ATTEMPTS):
+                pool = self.pool
+                try:
+                    future = pool.submit(_execute_job, spec)
+                    break
+                except BrokenProcessPool as e:
+                    # A worker died while idle: the job never ran, so hand it to a new pool
+                    self._replace_pool(pool)
+                    error = e
+            else:
+                self._set_status(job_id, status='failed', error=f"{type(error).__name__}: {error}",
+                                 finished=time.time())
+                self.slots.release()
+                continue
+            future.add_done_callback(lambda f, job_id=job_id, pool=pool: self._finish(job_id, f, pool))
+
+    def _finish(self, job_id, future, pool):
+        try:
+            result = future.result()
+            self._set_status(job_id, status='done', result=result, finished=time.time())
+        except Exception as e:
+            self._set_status(job_id, status='failed', error=f"{type(e).__name__}: {e}", finished=time.time())
+            if isinstance(e, BrokenProcessPool):
+                # Don't let the next jobs fail on the dead pool too
+                self._replace_pool(pool)
+        finally:
+            self.slots.release()
+
+    def get(self, job_id):
+        with self.changed:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def events(self, job_id, timeout=None):
+        """Yield a snapshot of the job every time it changes, until it finishes."""
+        seen = -1
+        while True:
+            with self.changed:
+                if job_id not in self.jobs:
+                    return
+                if not self.changed.wait_for(
+                        lambda: job_id not in self.jobs or self.jobs[job_id]['version'] != seen, timeout):
+                    return
+                if job_id not in self.jobs:
+                    return
+                job = dict(self.jobs[job_id])
+            seen = job['version']
+            yield job
+            if job['status'] in self.FINAL_STATES:
+                return
+
+    def health(self):
+        with self.changed:
+            return {'workers': self.max_workers, 'max_queued': self.max_queued, 'jobs': self._counts()}
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/jobs':
+                    return self._send_json(404, {'error': 'Not found'})
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    spec = json.loads(self.rfile.read(length) or b'{}')
+                    job_id = service.submit(spec)
+                except (ValueError, json.JSONDecodeError) as e:
+                    return self._send_json(400, {'error': str(e)})
+                except OverflowError as e:
+                    return self._send_json(503, {'error': str(e)})
+                self._send_json(202, {'id': job_id})
+
+            def do_GET(self):
+                parts = [part for part in self.path.split('/') if part]
+                if parts == ['health']:
+                    return self._send_json(200, service.health())
+                if parts == ['jobs']:
+                    with service.changed:
+                        return self._send_json(200, list(service.jobs.values()))
+                if len(parts) == 2 and parts[0] == 'jobs':
+                    job = service.get(parts[1])
+                    return self._send_json(200, job) if job else self._send_json(404, {'error': 'Unknown job'})
+                if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+                    if service.get(parts[1]) is None:
+                        return self._send_json(404, {'error': 'Unknown job'})
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.end_headers()
+                    self.close_connection = True
+                    for job in service.events(parts[1]):
+                        self.wfile.write(json.dumps(job).encode('utf-8') + b'\n')
+                        self.wfile.flush()
+                    return
+                self._send_json(404, {'error': 'Not found'})
+
+        return Handler
+
+    def serve_forever(self):
+        """Start the pool (if needed) and serve requests until interrupted."""
+        if self.pool is None:
+            self.start()
+        handler = self._make_handler()
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.server = _UnixHTTPServer(self.socket_path, handler)
+            address = self.socket_path
+        else:
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            address = f"http://{self.host}:{self.server.server_address[1]}"
+        print(f"Worker service listening on {address} with {self.max_workers} workers")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class Worker_Client:
+    """Small client for Worker_Service."""
+
+    def __init__(self, host='127.0.0.1', port=8765, socket_path=None, timeout=None):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.socket_path:
+            return _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method, path, body=None):
+        connection = self._connection()
+        try:
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = {'Content-Type': 'application/json'} if payload else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = json.loads(response.read() or b'null')
+            if response.status >= 400:
+                raise RuntimeError(f"{response.status}: {data.get('error') if data else ''}")
+            return data
+        finally:
+            connection.close()
+
+    def submit(self, spec):
+        """Submit a job spec and return its id."""
+        return self._request('POST', '/jobs', spec)['id']
+
+    def status(self, job_id):
+        return self._request('GET', f'/jobs/{job_id}')
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def events(self, job_id):
+        """Yield job snapshots as the service streams them."""
+        connection = self._connection()
+        try:
+            connection.request('GET', f'/jobs/{job_id}/events')
+            response = connection.getresponse()
+            if response.status >= 400:
+                raise RuntimeError(f"{response.status}: {json.loads(response.read()).get('error')}")
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+
+    def wait(self, job_id):
+        """Block until the job finishes and return its final state."""
+        job = None
+        for job in self.events(job_id):
+            pass
+        return job
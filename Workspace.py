@@ -0,0 +1,118 @@
+import os
+import uuid
+import shutil
+import tempfile
+import threading
+
+
+class Workspace:
+    """Per-job scratch directory and output writer.
+
+    Every job (and every hider in it) gets its own temp paths, so concurrent
+    jobs and parallel carriers never share intermediates. Temp files live on
+    tmpfs when one is available. Outputs are written to a temp path first and
+    then renamed into place, so readers never see a half-written file.
+
+    Use as a context manager; the scratch directory is removed on exit,
+    whether the job succeeded or not.
+    """
+
+    TMPFS_ROOTS = ('/dev/shm',)
+
+    def __init__(self, output_path="output_files/", temp_root=None, job_id=None):
+        """
+        Args:
+            output_path: Directory final outputs are committed to
+            temp_root: Parent directory for scratch files (default: tmpfs if available)
+            job_id: Used in the scratch directory name (default: random)
+        """
+        self.output_path = output_path
+        self.job_id = job_id or uuid.uuid4().hex
+        self.temp_root = temp_root or self.default_temp_root()
+        self.temp_dir = None
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default_temp_root(cls):
+        """Pick a tmpfs mount if one is writable, otherwise the system temp dir."""
+        for root in cls.TMPFS_ROOTS:
+            if os.path.isdir(root) and os.access(root, os.W_OK):
+                return root
+        return tempfile.gettempdir()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def temp_path(self, name="temp", suffix=""):
+        """Return a fresh path inside the scratch directory (the file is not created)."""
+        with self._lock:
+            if self.temp_dir is None:
+                self.temp_dir = tempfile.mkdtemp(prefix=f"stego-{self.job_id}-", dir=self.temp_root)
+            self._counter += 1
+            return os.path.join(self.temp_dir, f"{self._counter}-{name}{suffix}")
+
+    def output_file(self, name):
+        """Final location of an output called name."""
+        return os.path.join(self.output_path, name)
+
+    def commit(self, temp_path, name):
+        """
+        Atomically move a finished temp file to the output directory.
+
+        If the scratch directory is on another filesystem the file is first
+        copied next to its destination, so the final step is always a rename.
+
+        Returns:
+            str: The final output path
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        final_path = self.output_file(name)
+        try:
+            os.replace(temp_path, final_path)
+        except OSError:
+            staging = os.path.join(self.output_path, f".{name}.{uuid.uuid4().hex}.part")
+            try:
+                shutil.copyfile(temp_path, staging)
+                os.replace(staging, final_path)
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
+            os.remove(temp_path)
+        return final_path
+
+    def commit_copy(self, source_path, name):
+        """
+        Atomically place a copy of an existing file in the output directory.
+
+        The copy is a hardlink when source and output directory share a
+        filesystem. Outputs are only ever replaced by rename, never rewritten
+        in place, so the two names never see each other's changes.
+
+        Returns:
+            str: The final output path
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        final_path = self.output_file(name)
+        staging = os.path.join(self.output_path, f".{name}.{uuid.uuid4().hex}.part")
+        try:
+            try:
+                os.link(source_path, staging)
+            except OSError:
+                shutil.copyfile(source_path, staging)
+            os.replace(staging, final_path)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        return final_path
+
+    def cleanup(self):
+        """Remove the scratch directory and everything in it."""
+        with self._lock:
+            temp_dir, self.temp_dir = self.temp_dir, None
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,50 @@
+"""Key derivation cost for a 100-carrier batch, with and without the key cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_kdf [--carriers 100] [--log2-n 15]
+"""
+import os
+import json
+import time
+import argparse
+from Encrypter import Encrypter
+
+
+def time_batch(password, params, carriers, use_cache):
+    """Build one decrypting Encrypter per carrier, as extraction does."""
+    start = time.perf_counter()
+    for _ in range(carriers):
+        if not use_cache:
+            Encrypter.clear_key_cache()
+        Encrypter.from_params(password, params)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--carriers', type=int, default=100)
+    parser.add_argument('--log2-n', type=int, default=Encrypter.DEFAULT_KDF_PARAMS[0])
+    args = parser.parse_args()
+
+    kdf_params = (args.log2_n,) + Encrypter.DEFAULT_KDF_PARAMS[1:]
+    password = 'benchmark-password'
+    Encrypter.clear_key_cache()
+    params, _ = Encrypter(password, kdf_params=kdf_params).encrypt(os.urandom(1024))
+
+    Encrypter.clear_key_cache()
+    uncached = time_batch(password, params, args.carriers, use_cache=False)
+    Encrypter.clear_key_cache()
+    cached = time_batch(password, params, args.carriers, use_cache=True)
+
+    print(json.dumps({
+        'carriers': args.carriers,
+        'kdf_params': kdf_params,
+        'uncached_total_s': round(uncached, 4),
+        'cached_total_s': round(cached, 4),
+        'cached_per_carrier_ms': round(cached / args.carriers * 1000, 3),
+        'speedup': round(uncached / cached, 1) if cached else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""Throughput, latency and memory benchmarks for the hiders and Runner.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite run [--output results.json] [--repeats 5]
+                                         [--payload-sizes 1024,65536,262144]
+                                         [--megapixels 1] [--wav-seconds 10]
+                                         [--video-seconds 2] [--baseline baseline.json]
+                                         [--memory] [--encoder fast|balanced|smallest]
+    python -m benchmarks.bench_suite compare results.json baseline.json [--threshold 0.1]
+
+Carriers are generated deterministically (see benchmarks.carriers). Every
+case runs in a fresh process so that its peak RSS is its own. Results are
+written as JSON, including time per stage (decode, embed, encode, write...)
+from Tracer spans; compare (or run --baseline) exits with status 1 if any case
+got slower or bigger than the baseline by more than the threshold.
+
+--memory profiles every operation with Memory_Profiler (tracemalloc + RSS
+sampling) and adds its per-stage peak report to the results. Profiling
+slows the hiders down, so compare memory runs only with memory runs.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from benchmarks import carriers
+
+CATEGORIES = ('image', 'audio', 'video', 'runner')
+HIDER_CASES = {
+    # case: (hider module, carrier file name, extra hider arguments)
+    'image_png': ('Image_Hider', 'carrier.png', {}),
+    'image_png_container': ('Image_Hider', 'carrier.png', {'embedding': 'container'}),
+    'image_jpeg': ('Image_Hider', 'carrier.jpg', {}),
+    'image_tiff': ('Image_Hider', 'carrier.tiff', {}),
+    'audio_wav': ('Audio_Hider', 'carrier.wav', {}),
+    'video_ffv1': ('Video_Hider', 'carrier.avi', {}),
+}
+
+
+def generate_carriers(directory, args):
+    """Write every synthetic carrier the suite uses into directory."""
+    carriers.ensure_dir(directory)
+    carriers.generate_image(os.path.join(directory, 'carrier.png'), args.megapixels, seed=1)
+    carriers.generate_image(os.path.join(directory, 'carrier.tiff'), args.megapixels, seed=2)
+    carriers.generate_image(os.path.join(directory, 'carrier.jpg'), args.megapixels, seed=5)
+    carriers.generate_wav(os.path.join(directory, 'carrier.wav'), args.wav_seconds,
+                          args.sample_rate, args.bit_depth, seed=3)
+    carriers.generate_video(os.path.join(directory, 'carrier.avi'), args.video_seconds, seed=4)
+
+
+def _peak_rss_mb():
+    from Memory_Profiler import peak_rss
+    return peak_rss() / 2 ** 20
+
+
+def _hider(module_name, path, data, workspace, control=None, encoder_profile='balanced', options=None):
+    import importlib
+    from objects.File import File
+    hider_class = getattr(importlib.import_module(module_name), module_name)
+    return hider_class(File(path), data, control=control, workspace=workspace, encoder_profile=encoder_profile,
+                       **(options or {}))
+
+
+def _controls(operations, memory=False):
+    """One traced Job_Control per operation, so stages can be reported separately."""
+    from Tracer import Tracer
+    from Job_Control import Job_Control
+    from Memory_Profiler import Memory_Profiler
+    tracer_class = Memory_Profiler if memory else Tracer
+    return {operation: Job_Control(tracer=tracer_class()) for operation in operations}
+
+
+def _profiling(control):
+    """Context in which a memory profiler (if that is the control's tracer) is running."""
+    return control.tracer if hasattr(control.tracer, 'report') else contextlib.nullcontext()
+
+
+def _stages(controls):
+    stages = {operation: {'time': control.tracer.summary()} for operation, control in controls.items()}
+    for operation, control in controls.items():
+        if hasattr(control.tracer, 'report'):
+            stages[operation]['memory'] = control.tracer.report()
+    return stages
+
+
+def _time_hider(case, carrier_dir, payload_size, repeats, scratch, memory=False, encoder_profile='balanced'):
+    """Time hide_data and extract_data of one hider on one carrier."""
+    from Workspace import Workspace
+    module_name, carrier_name, options = HIDER_CASES[case]
+    carrier_path = os.path.join(carrier_dir, carrier_name)
+    payload = carriers.make_payload(payload_size)
+
+    with Workspace(os.path.join(scratch, 'out', '')) as workspace:
+        capacity = _hider(module_name, carrier_path, b'', workspace, options=options).capacity()
+        if capacity is not None and payload_size > capacity:
+            return None, None, f"payload exceeds carrier capacity ({capacity} bytes)"
+
+        controls = _controls(('hide', 'extract'), memory)
+        hide, extract = [], []
+        for _ in range(repeats):
+            with _profiling(controls['hide']):
+                start = time.perf_counter()
+                output = _hider(module_name, carrier_path, payload, workspace, controls['hide'],
+                                encoder_profile, options).hide_data()
+                hide.append(time.perf_counter() - start)
+
+            with _profiling(controls['extract']):
+                start = time.perf_counter()
+                data = _hider(module_name, output, b'', workspace, controls['extract']).extract_data()
+                extract.append(time.perf_counter() - start)
+            if data != payload:
+                raise RuntimeError(f"{case}: extracted data does not match the payload")
+    return {'hide': hide, 'extract': extract}, _stages(controls), None
+
+
+def _time_runner(carrier_dir, payload_size, repeats, scratch, memory=False, encoder_profile='balanced'):
+    """Time Runner.run and Runner.extract on an image + audio carrier pair."""
+    from Runner import Runner
+    secret = carriers.generate_secret(os.path.join(scratch, 'secret.bin'), payload_size)
+    pair = [(os.path.join(carrier_dir, 'carrier.png'), 50.0), (os.path.join(carrier_dir, 'carrier.wav'), 50.0)]
+    runner = Runner()
+    runner.encoder_profile = encoder_profile
+    if memory:
+        # Peaks can only be attributed to stages when carriers run one at a time
+        runner.max_workers = 1
+
+    plan = runner.plan(secret, pair)
+    if not all(entry['fits'] for entry in plan):
+        return None, None, "payload exceeds carrier capacity"
+
+    controls = _controls(('run', 'extract'), memory)
+    run, extract = [], []
+    for i in range(repeats):
+        stego_dir = os.path.join(scratch, f'stego{i}', '')
+        runner.output_path = stego_dir
+        with _profiling(controls['run']):
+            start = time.perf_counter()
+            runner.run(secret, pair, control=controls['run'])
+            run.append(time.perf_counter() - start)
+
+        runner.output_path = os.path.join(scratch, f'extracted{i}', '')
+        with _profiling(controls['extract']):
+            start = time.perf_counter()
+            output = runner.extract(stego_dir, control=controls['extract'])
+            extract.append(time.perf_counter() - start)
+        with open(output, 'rb') as f, open(secret, 'rb') as original:
+            if f.read() != original.read():
+                raise RuntimeError("runner: extracted file does not match the secret")
+    return {'run': run, 'extract': extract}, _stages(controls), None
+
+
+def run_case(case, carrier_dir, payload_size, repeats, memory=False, encoder_profile='balanced'):
+    """Worker entry point: time one case in this (fresh) process.
+
+    Returns:
+        dict: {'timings': {operation: [seconds...]} | None,
+               'stages': {operation: {'time': Tracer.summary(),
+                                      'memory': Memory_Profiler.report() (memory mode)}} | None,
+               'skipped': str | None, 'peak_rss_mb': float}
+    """
+    scratch = tempfile.mkdtemp(prefix='stego-bench-')
+    try:
+        # The hiders and Runner are chatty; keep the benchmark output clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            if case == 'runner':
+                timings, stages, skipped = _time_runner(carrier_dir, payload_size, repeats, scratch,
+                                                        memory, encoder_profile)
+            else:
+                timings, stages, skipped = _time_hider(case, carrier_dir, payload_size, repeats, scratch,
+                                                       memory, encoder_profile)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {'timings': timings, 'stages': stages, 'skipped': skipped, 'peak_rss_mb': round(_peak_rss_mb(), 1)}
+
+
+def summarize(latencies, payload_size):
+    """Latency percentiles (seconds) and median throughput (MB/s) for one operation."""
+    values = np.array(latencies)
+    p50 = float(np.percentile(values, 50))
+    return {
+        'latency_s': {
+            'min': round(float(values.min()), 6),
+            'p50': round(p50, 6),
+            'p90': round(float(np.percentile(values, 90)), 6),
+            'p99': round(float(np.percentile(values, 99)), 6),
+            'max': round(float(values.max()), 6),
+            'mean': round(float(values.mean()), 6),
+        },
+        'throughput_mb_s': round(payload_size / 1e6 / p50, 3) if p50 > 0 else None,
+    }
+
+
+def run_suite(args):
+    cases = [case for case in HIDER_CASES if case.split('_')[0] in args.only]
+    if 'runner' in args.only:
+        cases.append('runner')
+
+    carrier_dir = args.carrier_dir or tempfile.mkdtemp(prefix='stego-carriers-')
+    generate_carriers(carrier_dir, args)
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    try:
+        for case in cases:
+            for payload_size in args.payload_sizes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    outcome = pool.submit(run_case, case, carrier_dir, payload_size, args.repeats,
+                                          args.memory, args.encoder).result()
+                if outcome['skipped']:
+                    print(f"{case} {payload_size}B: skipped, {outcome['skipped']}", file=sys.stderr)
+                    continue
+                for operation, latencies in outcome['timings'].items():
+                    entry = {
+                        'name': f"{case}.{operation}.{payload_size}",
+                        'case': case,
+                        'operation': operation,
+                        'payload_bytes': payload_size,
+                        'repeats': len(latencies),
+                        'peak_rss_mb': outcome['peak_rss_mb'],
+                    }
+                    entry.update(summarize(latencies, payload_size))
+                    # Stage totals over all repeats (see Tracer.summary)
+                    entry['stages'] = outcome['stages'][operation]['time']
+                    memory = outcome['stages'][operation].get('memory')
+                    if memory is not None:
+                        entry['traced_peak_mb'] = round(memory['traced_peak_bytes'] / 2 ** 20, 3)
+                        entry['memory'] = memory
+                    results.append(entry)
+                    traced = f", traced peak {entry['traced_peak_mb']} MB" if 'traced_peak_mb' in entry else ""
+                    print(f"{entry['name']}: p50 {entry['latency_s']['p50'] * 1000:.1f} ms, "
+                          f"{entry['throughput_mb_s']} MB/s, peak RSS {entry['peak_rss_mb']} MB{traced}",
+                          file=sys.stderr)
+    finally:
+        if not args.carrier_dir:
+            shutil.rmtree(carrier_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'config': {
+                'repeats': args.repeats,
+                'payload_sizes': args.payload_sizes,
+                'megapixels': args.megapixels,
+                'wav_seconds': args.wav_seconds,
+                'sample_rate': args.sample_rate,
+                'bit_depth': args.bit_depth,
+                'video_seconds': args.video_seconds,
+                'memory': args.memory,
+                'encoder_profile': args.encoder,
+            },
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=0.1, rss_threshold=0.2):
+    """
+    Compare two result sets case by case.
+
+    A case regresses if its median latency grew by more than threshold or
+    its peak RSS (or, for --memory runs, its traced heap peak) grew by more
+    than rss_threshold (both relative).
+
+    Returns:
+        dict: 'regressions', 'improvements' and 'missing' (names only in the baseline)
+    """
+    current = {entry['name']: entry for entry in results['results']}
+    report = {'regressions': [], 'improvements': [], 'missing': []}
+    for old in baseline['results']:
+        new = current.get(old['name'])
+        if new is None:
+            report['missing'].append(old['name'])
+            continue
+        latency_change = new['latency_s']['p50'] / old['latency_s']['p50'] - 1 if old['latency_s']['p50'] else 0.0
+        rss_change = new['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old['peak_rss_mb'] else 0.0
+        if old.get('traced_peak_mb') and new.get('traced_peak_mb') is not None:
+            rss_change = max(rss_change, new['traced_peak_mb'] / old['traced_peak_mb'] - 1)
+        entry = {
+            'name': old['name'],
+            'p50_s': [old['latency_s']['p50'], new['latency_s']['p50']],
+            'latency_change': round(latency_change, 3),
+            'peak_rss_mb': [old['peak_rss_mb'], new['peak_rss_mb']],
+            'traced_peak_mb': [old.get('traced_peak_mb'), new.get('traced_peak_mb')],
+            'rss_change': round(rss_change, 3),
+        }
+        if latency_change > threshold or rss_change > rss_threshold:
+            report['regressions'].append(entry)
+        elif latency_change < -threshold:
+            report['improvements'].append(entry)
+    return report
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_suite', description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_thresholds(sub):
+        sub.add_argument('--threshold', type=float, default=0.1, help='Allowed relative p50 latency growth')
+        sub.add_argument('--rss-threshold', type=float, default=0.2, help='Allowed relative peak RSS growth')
+
+    run = subparsers.add_parser('run', help='Run the benchmarks')
+    run.add_argument('--output', default=None, help='Write results JSON here (default: stdout)')
+    run.add_argument('--repeats', type=int, default=5)
+    run.add_argument('--payload-sizes', default='1024,65536,262144',
+                     type=lambda value: [int(size) for size in value.split(',')])
+    run.add_argument('--only', default=','.join(CATEGORIES), type=lambda value: value.split(','),
+                     help=f"Comma-separated subset of {', '.join(CATEGORIES)}")
+    run.add_argument('--megapixels', type=float, default=1.0)
+    run.add_argument('--wav-seconds', type=float, default=10.0)
+    run.add_argument('--sample-rate', type=int, default=44100)
+    run.add_argument('--bit-depth', type=int, default=16, choices=(8, 16, 24, 32))
+    run.add_argument('--video-seconds', type=float, default=2.0)
+    run.add_argument('--carrier-dir', default=None, help='Keep generated carriers here instead of a temp dir')
+    run.add_argument('--baseline', default=None, help='Compare against this saved results file')
+    run.add_argument('--encoder', choices=('fast', 'balanced', 'smallest'), default='balanced',
+                     help='Encoder profile passed to the hiders and Runner')
+    run.add_argument('--memory', action='store_true',
+                     help='Profile peak memory per stage (tracemalloc + RSS); slows the run down')
+    add_thresholds(run)
+
+    cmp = subparsers.add_parser('compare', help='Compare a results file against a baseline')
+    cmp.add_argument('results')
+    cmp.add_argument('baseline')
+    add_thresholds(cmp)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'run':
+        results = run_suite(args)
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text)
+        else:
+            print(text)
+        if not args.baseline:
+            return 0
+        baseline = _load(args.baseline)
+    else:
+        results, baseline = _load(args.results), _load(args.baseline)
+
+    report = compare(results, baseline, args.threshold, args.rss_threshold)
+    print(json.dumps(report, indent=2), file=sys.stderr if args.command == 'run' and not args.output else sys.stdout)
+    for entry in report['regressions']:
+        print(f"REGRESSION {entry['name']}: latency {entry['latency_change']:+.0%}, "
+              f"peak RSS {entry['rss_change']:+.0%}", file=sys.stderr)
+    return 1 if report['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Deterministic synthetic carriers for benchmarks.
+
+Every generator is seeded, so the same arguments always produce the same
+file (byte for byte for images and WAV; pixel for pixel for video).
+"""
+import os
+import wave
+import numpy as np
+
+
+def make_payload(size, seed=0):
+    """Return size pseudo-random bytes."""
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+
+
+def _image_shape(megapixels):
+    """Square-ish (height, width) for a pixel count, rounded to multiples of 8."""
+    side = max(8, int((megapixels * 1_000_000) ** 0.5) // 8 * 8)
+    return side, side
+
+
+def generate_image(path, megapixels=1.0, mode='RGB', seed=0):
+    """
+    Write a noise image. The format follows the extension (PNG, TIFF, BMP...).
+
+    Args:
+        path: Output path
+        megapixels: Image size in millions of pixels
+        mode: 'RGB' or 'RGBA'
+        seed: RNG seed
+
+    Returns:
+        str: The path written
+    """
+    from PIL import Image
+
+    height, width = _image_shape(megapixels)
+    channels = len(mode)
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, channels), dtype=np.uint8)
+    Image.fromarray(pixels, mode).save(path)
+    return path
+
+
+def generate_wav(path, duration=10.0, sample_rate=44100, bit_depth=16, channels=2, seed=0):
+    """
+    Write a WAV file of band-limited noise.
+
+    Args:
+        path: Output path
+        duration: Length in seconds
+        sample_rate: Samples per second
+        bit_depth: 8, 16, 24 or 32
+        channels: Channel count
+        seed: RNG seed
+
+    Returns:
+        str: The path written
+    """
+    if bit_depth not in (8, 16, 24, 32):
+        raise ValueError(f"Unsupported bit depth: {bit_depth}")
+    frames = int(duration * sample_rate)
+    noise = np.random.default_rng(seed).standard_normal((frames, channels)) * 0.25
+    noise = np.clip(noise, -1.0, 1.0)
+
+    if bit_depth == 8:
+        # 8-bit WAV is unsigned
+        data = ((noise + 1.0) * 127.5).astype(np.uint8).tobytes()
+    elif bit_depth == 24:
+        samples = (noise * (2 ** 23 - 1)).astype('<i4')
+        data = samples.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    else:
+        dtype = '<i2' if bit_depth == 16 else '<i4'
+        data = (noise * (2 ** (bit_depth - 1) - 1)).astype(dtype).tobytes()
+
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(bit_depth // 8)
+        out.setframerate(sample_rate)
+        out.writeframes(data)
+    return path
+
+
+def generate_video(path, seconds=2.0, fps=25, width=320, height=240, seed=0, fourcc='FFV1'):
+    """
+    Write a short losslessly encoded noise video (FFV1 in AVI by default).
+
+    Args:
+        path: Output path
+        seconds: Clip length
+        fps: Frames per second
+        width, height: Frame size
+        seed: RNG seed
+        fourcc: Codec; must be lossless for the LSB hider to round-trip
+
+    Returns:
+        str: The path written
+
+    Raises:
+        RuntimeError: If OpenCV cannot open a writer for the codec
+    """
+    import cv2
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height), True)
+    if not writer.isOpened():
+        raise RuntimeError(f"OpenCV cannot write {fourcc} video to {path}")
+    rng = np.random.default_rng(seed)
+    try:
+        for _ in range(max(1, int(seconds * fps))):
+            writer.write(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    finally:
+        writer.release()
+    return path
+
+
+def generate_secret(path, size, seed=0):
+    """Write a file of size pseudo-random bytes and return its path."""
+    with open(path, 'wb') as f:
+        f.write(make_payload(size, seed))
+    return path
+
+
+def ensure_dir(path):
+    os.makedirs(path, exist_ok=True)
+    return path
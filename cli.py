@@ -0,0 +1,298 @@
+"""Headless command line interface.
+
+Usage (from the repository root):
+    python -m cli hide SECRET CARRIER[:PERCENT] ... [--password PW] [--output-dir DIR]
+                       [--encoder fast|balanced|smallest] [--image-embedding lsb|container]
+                       [--cache-dir DIR [--cache-size MB]] [--verify] [--job-name NAME] [--manifest FILE]
+    python -m cli extract CARRIER_DIR [--password PW] [--output-dir DIR]
+    python -m cli plan SECRET CARRIER[:PERCENT] ... [--password PW]
+    python -m cli batch MANIFEST CARRIER_DIR [--password PW] [--output-dir DIR] [--plan-only]
+    python -m cli verify STEGO_FILE ... [--password PW]
+    python -m cli serve [--workers N] [--port PORT | --socket PATH] [--decode-cache MB]
+
+hide, extract, plan, batch and verify accept --trace FILE to append a timing span
+per stage (decode, embed, encode, mux, write, ...) to FILE as JSON lines,
+and --profile-memory FILE to write a per-stage peak memory report (carriers
+are then processed one at a time so that peaks can be attributed).
+
+hide, extract and batch accept --memory-budget MB: carriers whose in-memory
+path would not fit are streamed (top image rows only, WAV copied in blocks)
+and fewer carriers are processed at once.
+
+hide, extract, batch and verify accept --scatter: LSB payloads are spread
+over the whole carrier in an order derived from the password instead of
+filling it from the start. Extracting and verifying need the same flag and
+password.
+
+hide, extract, batch and verify accept --channel-bits 1,1,0,...: one bit
+budget per audio channel (0 leaves the channel untouched, e.g. the LFE of
+5.1 audio). Every audio carrier must have that many channels, and
+extracting and verifying need the same budgets.
+
+The password can also be given through the STEGO_PASSWORD environment
+variable. Hider modules (and with them Pillow, numpy, cv2, mutagen) are only
+imported once a carrier of their category is processed.
+"""
+import os
+import sys
+import json
+import argparse
+from Runner import Runner
+from Job_Control import Job_Control
+from Tracer import Tracer
+
+
+def parse_carriers(specs):
+    """Turn 'path[:percent]' arguments into (path, percent) pairs.
+
+    Carriers without a percentage share whatever the others leave over.
+    """
+    carriers = []
+    for spec in specs:
+        path, sep, percent = spec.rpartition(':')
+        if sep and percent.replace('.', '', 1).isdigit():
+            carriers.append((path, float(percent)))
+        else:
+            carriers.append((spec, None))
+
+    fixed = sum(percent for _, percent in carriers if percent is not None)
+    free = [i for i, (_, percent) in enumerate(carriers) if percent is None]
+    if fixed > 100:
+        raise ValueError("Carrier percentages add up to more than 100")
+    for i in free:
+        carriers[i] = (carriers[i][0], (100.0 - fixed) / len(free))
+    return carriers
+
+
+def parse_channel_bits(spec):
+    """Turn a '1,1,0,...' argument into a list of per-channel bit budgets."""
+    try:
+        budgets = [int(bits) for bits in spec.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated 0/1 budgets, got {spec!r}")
+    if any(bits not in (0, 1) for bits in budgets) or not any(budgets):
+        raise argparse.ArgumentTypeError(f"budgets must be 0 or 1, with at least one 1: {spec!r}")
+    return budgets
+
+
+def print_progress(event):
+    """Progress callback that writes one line per event to stderr."""
+    fraction = f" {event['fraction']:.0%}" if event.get('fraction') is not None else ""
+    if event.get('carrier') is not None:
+        where = f"[{event['carrier_index'] + 1}/{event['carrier_total']}] {event['carrier']}: "
+    else:
+        where = ""
+    print(f"{where}{event['stage']}{fraction}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description='Hide files in images, audio and video.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_password(sub):
+        sub.add_argument('--password', default=os.environ.get('STEGO_PASSWORD'),
+                         help='Encrypt/decrypt chunks (default: $STEGO_PASSWORD)')
+        add_trace(sub)
+
+    def add_memory_budget(sub):
+        sub.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                         help='Stream large carriers and run fewer at once to stay within this much memory')
+
+    def add_scatter(sub):
+        sub.add_argument('--scatter', action='store_true',
+                         help='Spread the data over the carriers in a password-keyed order (needs --password)')
+
+    def add_channel_bits(sub):
+        sub.add_argument('--channel-bits', type=parse_channel_bits, default=None, metavar='BITS',
+                         help='Per-channel bit budget of audio carriers, e.g. 1,1,1,0,1,1 to skip the LFE '
+                              'of 5.1 audio (default: every channel)')
+
+    def add_trace(sub):
+        sub.add_argument('--trace', default=None, metavar='FILE',
+                         help='Append per-stage timing spans to FILE as JSON lines')
+        sub.add_argument('--profile-memory', default=None, metavar='FILE',
+                         help='Write a peak memory report per stage (tracemalloc + RSS) to FILE')
+
+    hide = subparsers.add_parser('hide', help='Hide a file across carrier files')
+    hide.add_argument('secret')
+    hide.add_argument('carriers', nargs='+', metavar='CARRIER[:PERCENT]')
+    hide.add_argument('--output-dir', default=None)
+    hide.add_argument('--progress', action='store_true', help='Print progress events to stderr')
+    hide.add_argument('--encoder', choices=Runner.ENCODER_PROFILES, default='balanced',
+                      help='Output encoder profile: speed versus file size (default: balanced)')
+    hide.add_argument('--image-embedding', choices=('lsb', 'container'), default='lsb',
+                      help='Store PNG chunks in the pixels or in a private PNG chunk (JPEG/WebP always '
+                           'use a container segment)')
+    hide.add_argument('--verify', action='store_true',
+                      help='Read every chunk back from the outputs (header and payload only) before reporting success')
+    hide.add_argument('--cache-dir', default=None,
+                      help='Reuse outputs of identical earlier embeds (unencrypted jobs) from this directory')
+    hide.add_argument('--cache-size', type=float, default=1024, metavar='MB',
+                      help='Evict least recently used cache entries above this size (default: 1024)')
+    hide.add_argument('--job-name', default=None,
+                      help='Journal the job under NAME; running it again with the same NAME resumes it, '
+                           'skipping finished carriers')
+    hide.add_argument('--journal-dir', default=None, help='Where job journals are kept (default: journals/)')
+    hide.add_argument('--manifest', default=None, metavar='FILE',
+                      help='Record the split in FILE; hiding an updated file with the same manifest only '
+                           're-embeds the carriers whose part of the file changed')
+    add_memory_budget(hide)
+    add_scatter(hide)
+    add_channel_bits(hide)
+    add_password(hide)
+
+    extract = subparsers.add_parser('extract', help='Recover a hidden file from a directory of stego files')
+    extract.add_argument('carrier_dir')
+    extract.add_argument('--output-dir', default=None)
+    extract.add_argument('--progress', action='store_true', help='Print progress events to stderr')
+    add_memory_budget(extract)
+    add_scatter(extract)
+    add_channel_bits(extract)
+    add_password(extract)
+
+    plan = subparsers.add_parser('plan', help='Show how a file would be split, without embedding')
+    plan.add_argument('secret')
+    plan.add_argument('carriers', nargs='+', metavar='CARRIER[:PERCENT]')
+    add_password(plan)
+
+    batch = subparsers.add_parser('batch', help='Hide every file of a manifest in a directory of carriers, '
+                                                'one pass per carrier')
+    batch.add_argument('manifest', help='JSON list of the files to hide')
+    batch.add_argument('carrier_dir')
+    batch.add_argument('--output-dir', default=None)
+    batch.add_argument('--progress', action='store_true', help='Print progress events to stderr')
+    batch.add_argument('--encoder', choices=Runner.ENCODER_PROFILES, default='balanced',
+                       help='Output encoder profile: speed versus file size (default: balanced)')
+    batch.add_argument('--image-embedding', choices=('lsb', 'container'), default='lsb',
+                       help='Store PNG chunks in the pixels or in a private PNG chunk')
+    batch.add_argument('--verify', action='store_true', help='Read every chunk back from the outputs')
+    batch.add_argument('--plan-only', action='store_true', help='Print the packing plan without embedding')
+    add_memory_budget(batch)
+    add_scatter(batch)
+    add_channel_bits(batch)
+    add_password(batch)
+
+    verify = subparsers.add_parser('verify', help='Check that stego files hold complete, intact chunks')
+    verify.add_argument('stego_files', nargs='+')
+    add_scatter(verify)
+    add_channel_bits(verify)
+    add_password(verify)
+
+    serve = subparsers.add_parser('serve', help='Run the local worker service')
+    serve.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    serve.add_argument('--max-queued', type=int, default=100)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--socket', default=None, help='Listen on a Unix domain socket instead')
+    serve.add_argument('--decode-cache', type=float, default=1024, metavar='MB',
+                       help='Decoded carriers shared between jobs (0 disables, default: 1024)')
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'serve':
+        from Worker_Service import Worker_Service
+        Worker_Service(
+            max_workers=args.workers, max_queued=args.max_queued,
+            host=args.host, port=args.port, socket_path=args.socket,
+            decode_cache_bytes=int(args.decode_cache * 1024 * 1024)
+        ).serve_forever()
+        return 0
+
+    if args.profile_memory:
+        from Memory_Profiler import Memory_Profiler
+        # Import the hiders first: imports under tracemalloc are very slow and
+        # would otherwise dominate the report
+        for category in Runner.HIDER_MODULES:
+            try:
+                Runner().get_hider_class(category)
+            except ImportError:
+                pass
+        tracer = Memory_Profiler(args.trace).start()
+    else:
+        tracer = Tracer(args.trace, keep=False) if args.trace else None
+    try:
+        return run_command(args, tracer)
+    finally:
+        if tracer is not None:
+            tracer.close()
+        if args.profile_memory:
+            with open(args.profile_memory, 'w') as f:
+                json.dump(tracer.report(), f, indent=2)
+
+
+def run_command(args, tracer=None):
+    runner = Runner()
+    if args.profile_memory:
+        runner.max_workers = 1
+    control = Job_Control(progress=print_progress if getattr(args, 'progress', False) else None, tracer=tracer)
+    if getattr(args, 'output_dir', None):
+        runner.output_path = os.path.join(args.output_dir, '')
+    if getattr(args, 'encoder', None):
+        runner.encoder_profile = args.encoder
+    if getattr(args, 'image_embedding', None):
+        runner.image_embedding = args.image_embedding
+    if getattr(args, 'verify', False):
+        runner.verify_outputs = True
+    if getattr(args, 'memory_budget', None):
+        runner.memory_budget = int(args.memory_budget * 1024 * 1024)
+    if getattr(args, 'scatter', False):
+        runner.scatter = True
+    if getattr(args, 'channel_bits', None):
+        runner.channel_bits = args.channel_bits
+    if getattr(args, 'journal_dir', None):
+        runner.journal_dir = args.journal_dir
+    if getattr(args, 'cache_dir', None):
+        from Output_Cache import Output_Cache
+        runner.output_cache = Output_Cache(args.cache_dir, max_bytes=int(args.cache_size * 1024 * 1024))
+
+    if args.command == 'hide':
+        try:
+            outputs = runner.run(args.secret, parse_carriers(args.carriers), password=args.password,
+                                 control=control, job_name=args.job_name, manifest_path=args.manifest)
+        except (ValueError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps({'outputs': outputs}, indent=2))
+        return 0
+
+    if args.command == 'extract':
+        output = runner.extract(args.carrier_dir, password=args.password, control=control)
+        if not output:
+            return 1
+        print(json.dumps({'output': output}, indent=2))
+        return 0
+
+    if args.command == 'plan':
+        plan = runner.plan(args.secret, parse_carriers(args.carriers), password=args.password, control=control)
+        print(json.dumps(plan, indent=2))
+        return 0 if all(entry['fits'] for entry in plan) else 1
+
+    if args.command == 'batch':
+        from Batch_Scheduler import Batch_Scheduler
+        try:
+            result = Batch_Scheduler(runner).run(args.manifest, args.carrier_dir, password=args.password,
+                                                 control=control, plan_only=args.plan_only)
+        except (ValueError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=2))
+        return 0
+
+    if args.command == 'verify':
+        try:
+            result = runner.verify(args.stego_files, control=control, password=args.password)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=2))
+        return 0 if result['complete'] and not any(result['files'].values()) else 1
+
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,12 @@
 from GUI import GUI
 from Runner import Runner
+from Decode_Cache import Decode_Cache
 import tkinter as tk
 
 if __name__ == "__main__":
     runner = Runner()
+    # GUI sessions tend to reuse the same carriers across jobs
+    runner.decode_cache = Decode_Cache(max_bytes=256 * 1024 ** 2)
     root = tk.Tk()
     app = GUI(root, runner)
     root.mainloop()
\ No newline at end of file
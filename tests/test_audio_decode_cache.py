@@ -0,0 +1,50 @@
+"""Audio_Hider on a decode cache hit: the cached PCM is embedded and written as-is."""
+import struct
+import numpy as np
+import pytest
+from objects.File import File
+from Audio_Hider import Audio_Hider
+from Decode_Cache import Decode_Cache
+from Wav_Pcm import Wav_Pcm
+from Workspace import Workspace
+
+
+def _fmt(encoding, channels, sample_width, sample_rate=48000):
+    block_align = channels * sample_width
+    return struct.pack('<HHIIHH', encoding, channels, sample_rate, sample_rate * block_align,
+                       block_align, sample_width * 8)
+
+
+@pytest.mark.parametrize('encoding, channels, sample_width', [
+    (Wav_Pcm.WAVE_FORMAT_PCM, 6, 3),
+    (Wav_Pcm.WAVE_FORMAT_IEEE_FLOAT, 2, 4),
+])
+def test_cache_hit_keeps_sample_format(tmp_path, encoding, channels, sample_width):
+    wav = Wav_Pcm(_fmt(encoding, channels, sample_width))
+    frame_count = 8000
+    if wav.is_float:
+        samples = np.random.default_rng(0).uniform(-1, 1, frame_count * channels).astype('<f4')
+        frames = np.frombuffer(samples.tobytes(), dtype=np.uint8)
+    else:
+        frames = np.random.default_rng(0).integers(0, 256, frame_count * wav.frame_bytes, dtype=np.uint8)
+
+    # Never decoded on a hit, so its content does not matter
+    carrier = tmp_path / 'carrier.flac'
+    carrier.write_bytes(b'fLaC')
+    cache = Decode_Cache(str(tmp_path / 'cache'))
+    cache.put(str(carrier), 'wav', frames, {'fmt': wav.fmt.hex()})
+
+    data = bytes(range(256)) * 4
+    workspace = Workspace(str(tmp_path / 'out') + '/', temp_root=str(tmp_path))
+    output = Audio_Hider(File(str(carrier)), data, workspace=workspace, decode_cache=cache).hide_data()
+    assert cache.hits == 1
+
+    with open(output, 'rb') as f:
+        stego, stego_frames = Wav_Pcm.read_header(f)
+        stego_bytes = np.frombuffer(f.read(stego_frames * stego.frame_bytes), dtype=np.uint8)
+    assert stego.fmt == wav.fmt
+    assert stego_frames == frame_count
+    # Only sample LSBs changed
+    assert np.array_equal(stego_bytes & 0xFE, frames & 0xFE)
+
+    assert Audio_Hider(File(output), b'', workspace=workspace).extract_data() == data